@@ -0,0 +1,66 @@
+"""
+Benchmark AsyncAWSClient.fetch throughput in requests per second against a
+local Tornado stub server.
+
+Usage: python benchmarks/fetch.py [requests] [concurrency]
+
+"""
+import os
+import sys
+import time
+
+from tornado import gen, httpserver, ioloop, netutil, web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tornado_aws import client  # noqa: E402
+
+REQUESTS = 20000
+CONCURRENCY = 50
+
+
+class RequestHandler(web.RequestHandler):
+
+    def post(self):
+        self.write(b'{}')
+
+
+async def run(requests, concurrency):
+    sockets = netutil.bind_sockets(0, '127.0.0.1')
+    server = httpserver.HTTPServer(web.Application([(r'/', RequestHandler)]))
+    server.add_sockets(sockets)
+    port = sockets[0].getsockname()[1]
+
+    obj = client.AsyncAWSClient(
+        'dynamodb', region='us-east-1', max_clients=concurrency,
+        endpoint='http://127.0.0.1:{}'.format(port))
+    headers = {'Content-Type': 'application/x-amz-json-1.0',
+               'x-amz-target': 'DynamoDB_20120810.GetItem'}
+    body = b'{"TableName": "example", "Key": {"id": {"S": "1"}}}'
+    remaining = [requests]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            await obj.fetch('POST', '/', headers=headers, body=body)
+
+    start = time.time()
+    await gen.multi([worker() for _worker in range(concurrency)])
+    elapsed = time.time() - start
+    print('{} requests in {:.2f}s: {:.0f} requests/sec'.format(
+        requests, elapsed, requests / elapsed))
+    obj.close()
+    server.stop()
+
+
+def main():
+    os.environ['AWS_ACCESS_KEY_ID'] = 'AKIDEXAMPLE'
+    os.environ['AWS_SECRET_ACCESS_KEY'] = \
+        'wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY'
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else REQUESTS
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else CONCURRENCY
+    ioloop.IOLoop.current().run_sync(lambda: run(requests, concurrency))
+
+
+if __name__ == '__main__':
+    main()
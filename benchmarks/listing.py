@@ -0,0 +1,110 @@
+"""
+Benchmark listing a bucket with tornado_aws.s3.list_objects, compared to
+fetching each page and parsing it with txml.loads, measuring the time to
+the first key and the total time against a local Tornado stub server that
+sends each page in chunks with a fixed delay between them.
+
+Usage: python benchmarks/listing.py [pages] [delay_ms]
+
+"""
+import os
+import sys
+import time
+
+from tornado import gen, httpserver, ioloop, netutil, web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tornado_aws import client, s3, txml  # noqa: E402
+
+PAGES = 20
+DELAY_MS = 5
+CHUNKS = 10
+KEYS = 1000
+NAMESPACE = '{http://s3.amazonaws.com/doc/2006-03-01/}'
+
+CONTENTS = ('<Contents><Key>logs/2019/11/17/{:08d}.json.gz</Key>'
+            '<LastModified>2019-11-17T00:00:00.000Z</LastModified>'
+            '<ETag>&quot;d41d8cd98f00b204e9800998ecf8427e&quot;</ETag>'
+            '<Size>1048576</Size><StorageClass>STANDARD</StorageClass>'
+            '</Contents>')
+
+
+class RequestHandler(web.RequestHandler):
+
+    def initialize(self, pages, delay):
+        self.delay = delay
+        self.pages = pages
+
+    async def get(self, bucket):
+        page = int(self.get_argument('continuation-token', '0'))
+        self.write('<?xml version="1.0" encoding="UTF-8"?>\n<ListBucketResult '
+                   'xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                   '<Name>{}</Name><KeyCount>{}</KeyCount>'.format(
+                       bucket, KEYS))
+        if page + 1 < self.pages:
+            self.write('<NextContinuationToken>{}</NextContinuationToken>'
+                       '<IsTruncated>true</IsTruncated>'.format(page + 1))
+        else:
+            self.write('<IsTruncated>false</IsTruncated>')
+        for chunk in range(CHUNKS):
+            await gen.sleep(self.delay)
+            start = page * KEYS + chunk * KEYS // CHUNKS
+            self.write(''.join(CONTENTS.format(key) for key in range(
+                start, start + KEYS // CHUNKS)))
+            await self.flush()
+        self.finish('</ListBucketResult>')
+
+
+async def list_with_txml(obj):
+    query_args = {'list-type': '2'}
+    while True:
+        response = await obj.fetch('GET', '/bucket', query_args)
+        result = txml.loads(response.body.decode('utf-8'))[
+            NAMESPACE + 'ListBucketResult']
+        for entry in result[NAMESPACE + 'Contents']:
+            yield entry[NAMESPACE + 'Key']
+        token = result.get(NAMESPACE + 'NextContinuationToken')
+        if not token:
+            break
+        query_args['continuation-token'] = token
+
+
+async def measure(name, listing):
+    start, first, count = time.time(), None, 0
+    async for _entry in listing:
+        if first is None:
+            first = time.time() - start
+        count += 1
+    elapsed = time.time() - start
+    print('{:<14} {:>8} keys {:>10.1f}ms to first key {:>8.2f}s '
+          'total'.format(name, count, first * 1000, elapsed))
+
+
+async def run(pages, delay):
+    sockets = netutil.bind_sockets(0, '127.0.0.1')
+    server = httpserver.HTTPServer(web.Application([
+        (r'/([^/]+)', RequestHandler, {'pages': pages, 'delay': delay})]))
+    server.add_sockets(sockets)
+    port = sockets[0].getsockname()[1]
+
+    obj = client.AsyncAWSClient(
+        's3', region='us-east-1',
+        endpoint='http://127.0.0.1:{}'.format(port))
+    await measure('txml.loads', list_with_txml(obj))
+    await measure('list_objects', s3.list_objects(obj, 'bucket'))
+    obj.close()
+    server.stop()
+
+
+def main():
+    os.environ['AWS_ACCESS_KEY_ID'] = 'AKIDEXAMPLE'
+    os.environ['AWS_SECRET_ACCESS_KEY'] = \
+        'wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY'
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else PAGES
+    delay = int(sys.argv[2]) if len(sys.argv) > 2 else DELAY_MS
+    ioloop.IOLoop.current().run_sync(lambda: run(pages, delay / 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark MultipartUploader throughput in MB per second across part sizes
+and concurrency levels, against a local Tornado stub server that adds a
+fixed latency to each part upload, or the S3 endpoint in the
+``S3_ENDPOINT`` environment variable, such as the ``fake-s3`` container in
+``docker-compose.yml``.
+
+Usage: python benchmarks/multipart.py [size_mb] [latency_ms]
+
+"""
+import os
+import sys
+import time
+import uuid
+
+from tornado import gen, httpserver, ioloop, netutil, web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tornado_aws import client, s3  # noqa: E402
+
+SIZE_MB = 64
+LATENCY_MS = 20
+PART_SIZES_MB = [5, 8, 16]
+CONCURRENCY = [1, 4, 8, 16]
+
+
+class RequestHandler(web.RequestHandler):
+
+    def initialize(self, latency):
+        self.latency = latency
+
+    def post(self, path):
+        if 'uploads' in self.request.arguments:
+            self.write('<InitiateMultipartUploadResult><UploadId>{}'
+                       '</UploadId></InitiateMultipartUploadResult>'.format(
+                           uuid.uuid4().hex))
+        else:
+            self.write('<CompleteMultipartUploadResult><ETag>"etag"</ETag>'
+                       '</CompleteMultipartUploadResult>')
+
+    async def put(self, path):
+        await gen.sleep(self.latency)
+        self.set_header('ETag', '"{}"'.format(uuid.uuid4().hex))
+
+    def delete(self, path):
+        self.set_status(204)
+
+
+async def run(size, latency):
+    endpoint, server = os.getenv('S3_ENDPOINT'), None
+    if not endpoint:
+        sockets = netutil.bind_sockets(0, '127.0.0.1')
+        server = httpserver.HTTPServer(
+            web.Application([(r'/(.*)', RequestHandler,
+                              {'latency': latency})]),
+            max_body_size=max(PART_SIZES_MB) * 1048576)
+        server.add_sockets(sockets)
+        endpoint = 'http://127.0.0.1:{}'.format(sockets[0].getsockname()[1])
+
+    obj = client.AsyncAWSClient(
+        's3', region='us-east-1', max_clients=max(CONCURRENCY),
+        endpoint=endpoint, unsigned_payload=True)
+    if server is None:
+        await obj.fetch('PUT', '/benchmark', body=b'')
+    body = os.urandom(size)
+    print('{:>10} {:>12} {:>10} {:>10}'.format(
+        'part size', 'concurrency', 'seconds', 'MB/sec'))
+    for part_size in PART_SIZES_MB:
+        for concurrency in CONCURRENCY:
+            uploader = s3.MultipartUploader(
+                obj, part_size=part_size * 1048576, concurrency=concurrency)
+            start = time.time()
+            await uploader.upload('benchmark', 'object', body)
+            elapsed = time.time() - start
+            print('{:>8}MB {:>12} {:>10.2f} {:>10.1f}'.format(
+                part_size, concurrency, elapsed, size / 1048576 / elapsed))
+    obj.close()
+    if server is not None:
+        server.stop()
+
+
+def main():
+    os.environ['AWS_ACCESS_KEY_ID'] = 'AKIDEXAMPLE'
+    os.environ['AWS_SECRET_ACCESS_KEY'] = \
+        'wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY'
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else SIZE_MB
+    latency = int(sys.argv[2]) if len(sys.argv) > 2 else LATENCY_MS
+    ioloop.IOLoop.current().run_sync(
+        lambda: run(size * 1048576, latency / 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Benchmark the cost of signing requests with large bodies when the body is
+hashed, compared to sending ``UNSIGNED-PAYLOAD``.
+
+Usage: python benchmarks/payload.py
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tornado_aws import client  # noqa: E402
+
+SIZES = [1, 10, 100]
+
+
+def main():
+    os.environ['AWS_ACCESS_KEY_ID'] = 'AKIDEXAMPLE'
+    os.environ['AWS_SECRET_ACCESS_KEY'] = \
+        'wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY'
+    obj = client.AWSClient('s3', region='us-east-1')
+    print('{:>8} {:>12} {:>12}'.format('size', 'signed', 'unsigned'))
+    for size in SIZES:
+        body = os.urandom(size * 1024 * 1024)
+        number = max(1, 100 // size)
+        results = []
+        for unsigned in (False, True):
+            elapsed = min(timeit.repeat(
+                lambda: obj._create_request(
+                    'PUT', '/bucket/key', body=body,
+                    unsigned_payload=unsigned),
+                number=number, repeat=3))
+            results.append(elapsed / number * 1000)
+        print('{:>6}MB {:>10.3f}ms {:>10.3f}ms'.format(size, *results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Micro-benchmark for request signing, comparing a cold signing key cache,
+which derives the SigV4 signing key for every request, with a warm cache.
+
+Usage: python benchmarks/signing.py [iterations]
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tornado_aws import client  # noqa: E402
+
+ITERATIONS = 100000
+
+
+def main(iterations):
+    os.environ['AWS_ACCESS_KEY_ID'] = 'AKIDEXAMPLE'
+    os.environ['AWS_SECRET_ACCESS_KEY'] = \
+        'wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY'
+    obj = client.AWSClient('dynamodb', region='us-east-1')
+    headers = {'Content-Type': 'application/x-amz-json-1.0',
+               'x-amz-target': 'DynamoDB_20120810.GetItem'}
+    body = b'{"TableName": "example", "Key": {"id": {"S": "1"}}}'
+
+    def cold():
+        obj._auth_config._signing_keys.clear()
+        obj._signed_request('POST', '/', {}, dict(headers), body)
+
+    def warm():
+        obj._signed_request('POST', '/', {}, dict(headers), body)
+
+    for name, func in [('cold', cold), ('warm', warm)]:
+        elapsed = min(timeit.repeat(func, number=iterations, repeat=3))
+        print('{:>5}: {:8.2f} usec/request'.format(
+            name, elapsed / iterations * 1000000))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ITERATIONS)
@@ -0,0 +1,47 @@
+"""
+Benchmark txml.loads with each available parser against the recursive
+converter it replaced, using the real-world-sized S3, SQS, EC2 and STS
+responses in tests/xml_corpus.py.
+
+Usage: python benchmarks/xml_parsing.py [iterations]
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tests import xml_corpus  # noqa: E402
+from tests.xml_tests import reference_loads  # noqa: E402
+
+from tornado_aws import txml  # noqa: E402
+
+ITERATIONS = 20
+
+
+def measure(function, content, iterations):
+    return min(timeit.repeat(lambda: function(content),
+                             number=iterations, repeat=5)) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else ITERATIONS
+    parsers = sorted(txml.PARSERS)
+    print('Default parser: {}'.format(txml.PARSER))
+    print('{:<24} {:>9} {:>10}'.format('document', 'KB', 'recursive') +
+          ''.join(' {:>16}'.format(parser) for parser in parsers))
+    for name, content in sorted(xml_corpus.DOCUMENTS.items()):
+        baseline = measure(reference_loads, content, iterations)
+        line = '{:<24} {:>9.1f} {:>8.3f}ms'.format(
+            name, len(content) / 1024, baseline * 1000)
+        for parser in parsers:
+            duration = measure(lambda value: txml.loads(value, parser),
+                               content, iterations)
+            line += ' {:>8.3f}ms {:>4.1f}x'.format(
+                duration * 1000, baseline / duration)
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -48,7 +48,7 @@ setuptools.setup(
     package_data={'': ['LICENSE', 'README.rst', 'requires/installation.txt']},
     include_package_data=True,
     install_requires=read_requirements('requires/installation.txt'),
-    extras_require={'curl': ['pycurl']},
+    extras_require={'curl': ['pycurl'], 'lxml': ['lxml']},
     tests_require=read_requirements('requires/testing.txt'),
     license='BSD',
     classifiers=CLASSIFIERS,
@@ -1,12 +1,15 @@
 import datetime
+import json
 import logging
 import os
+from os import path
 import tempfile
+import time
 import unittest
 from unittest import mock
 import uuid
 
-from tornado import concurrent, httpclient, testing
+from tornado import concurrent, gen, httpclient, testing
 
 from tornado_aws import config, exceptions
 from . import utils
@@ -40,6 +43,41 @@ class ParseConfigFileTestCase(unittest.TestCase):
                               config._parse_file,
                               handle.name)
 
+    def test_parsed_file_is_cached(self):
+        expectation = {'default': {'region': uuid.uuid4().hex}}
+        with tempfile.NamedTemporaryFile() as handle:
+            handle.write(utils.build_ini(expectation))
+            handle.flush()
+            with mock.patch('configparser.RawConfigParser',
+                            wraps=config.configparser.RawConfigParser) as cls:
+                for _iteration in range(5):
+                    value = config._parse_file(handle.name)
+                    self.assertDictEqual(expectation, value)
+                self.assertEqual(cls.call_count, 1)
+
+    def test_modified_file_is_parsed(self):
+        with tempfile.NamedTemporaryFile() as handle:
+            handle.write(utils.build_ini({'default': {'region': 'a'}}))
+            handle.flush()
+            os.utime(handle.name, ns=(0, 0))
+            self.assertEqual(config._parse_file(handle.name),
+                             {'default': {'region': 'a'}})
+            handle.seek(0)
+            handle.write(utils.build_ini({'default': {'region': 'b'}}))
+            handle.flush()
+            self.assertEqual(config._parse_file(handle.name),
+                             {'default': {'region': 'b'}})
+
+    def test_removed_file_is_not_cached(self):
+        with tempfile.NamedTemporaryFile() as handle:
+            handle.write(utils.build_ini({'default': {'region': 'a'}}))
+            handle.flush()
+            config._parse_file(handle.name)
+            self.assertIn(handle.name, config._parsed_files)
+        with self.assertRaises(exceptions.ConfigNotFound):
+            config._parse_file(handle.name)
+        self.assertNotIn(handle.name, config._parsed_files)
+
 
 class GetRegionTestCase(unittest.TestCase):
     def test_parsing_file(self):
@@ -104,6 +142,55 @@ class CredentialsManagementTestCase(unittest.TestCase):
         self.assertIsNone(obj.security_token)
 
 
+class SigningKeyCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        super(SigningKeyCacheTestCase, self).setUp()
+        utils.clear_environment()
+        os.environ['AWS_ACCESS_KEY_ID'] = uuid.uuid4().hex
+        os.environ['AWS_SECRET_ACCESS_KEY'] = uuid.uuid4().hex
+        self.obj = config.Authorization(
+            'default', client=httpclient.HTTPClient())
+
+    def tearDown(self):
+        utils.clear_environment()
+        super(SigningKeyCacheTestCase, self).tearDown()
+
+    def test_cache_hit(self):
+        key = os.urandom(32)
+        self.obj.cache_signing_key('20191117', 'us-east-1', 's3', key)
+        self.assertEqual(
+            self.obj.cached_signing_key('20191117', 'us-east-1', 's3'), key)
+        self.assertIsNone(
+            self.obj.cached_signing_key('20191118', 'us-east-1', 's3'))
+        self.assertIsNone(
+            self.obj.cached_signing_key('20191117', 'us-east-1', 'sqs'))
+
+    def test_cache_is_bounded(self):
+        for offset in range(config.SIGNING_KEY_CACHE_SIZE + 5):
+            self.obj.cache_signing_key(
+                str(offset), 'us-east-1', 's3', os.urandom(32))
+        self.assertEqual(len(self.obj._signing_keys),
+                         config.SIGNING_KEY_CACHE_SIZE)
+        self.assertIsNone(self.obj.cached_signing_key('0', 'us-east-1', 's3'))
+
+    def test_reset_invalidates_cache(self):
+        self.obj.cache_signing_key('20191117', 'us-east-1', 's3', b'key')
+        self.obj.reset()
+        self.assertIsNone(
+            self.obj.cached_signing_key('20191117', 'us-east-1', 's3'))
+
+    def test_rotated_credentials_invalidate_cache(self):
+        self.obj.cache_signing_key('20191117', 'us-east-1', 's3', b'key')
+        self.obj._assign_credentials({
+            'AccessKeyId': uuid.uuid4().hex,
+            'SecretAccessKey': uuid.uuid4().hex,
+            'Expiration': datetime.datetime.now().isoformat(),
+            'Token': uuid.uuid4().hex
+        })
+        self.assertIsNone(
+            self.obj.cached_signing_key('20191117', 'us-east-1', 's3'))
+
+
 class ResolvCredentialsTestCase(unittest.TestCase):
     def test_error_case(self):
         ini_values = {'default': {'region': uuid.uuid4().hex}}
@@ -280,7 +367,8 @@ class FetchCredentialsTestCase(utils.AsyncHTTPTestCase):
                 role, role, access_key, secret_key, token))
         with mock.patch('tornado_aws.config.INSTANCE_ENDPOINT', url):
             obj = config.Authorization('default', client=client)
-            with mock.patch.object(obj, '_get_role_async') as get_role:
+            with mock.patch.object(obj, '_get_role_async',
+                                   new_callable=mock.Mock) as get_role:
                 role_future = concurrent.Future()
                 role_future.set_result(role)
                 get_role.return_value = role_future
@@ -302,7 +390,8 @@ class FetchCredentialsTestCase(utils.AsyncHTTPTestCase):
                 role, role, access_key, secret_key, token))
         with mock.patch('tornado_aws.config.INSTANCE_ENDPOINT', url):
             obj = config.Authorization('default', client=client)
-            with mock.patch.object(obj, '_get_role_async') as get_role:
+            with mock.patch.object(obj, '_get_role_async',
+                                   new_callable=mock.Mock) as get_role:
                 future = concurrent.Future()
                 future.set_exception(httpclient.HTTPError(599))
                 get_role.return_value = future
@@ -323,7 +412,8 @@ class FetchCredentialsTestCase(utils.AsyncHTTPTestCase):
         with mock.patch('tornado_aws.config.INSTANCE_ENDPOINT', url):
             obj = config.Authorization('default', client=client)
             with mock.patch.object(
-                    obj, '_get_instance_credentials_async') as get_creds:
+                    obj, '_get_instance_credentials_async',
+                    new_callable=mock.Mock) as get_creds:
                 future = concurrent.Future()
                 future.set_exception(httpclient.HTTPError(599))
                 get_creds.return_value = future
@@ -396,7 +486,8 @@ class RefreshTestCase(utils.AsyncHTTPTestCase):
                 role, role, access_key, secret_key, token))
         with mock.patch('tornado_aws.config.INSTANCE_ENDPOINT', url):
             obj = config.Authorization('default', client=client)
-            with mock.patch.object(obj, '_get_role_async') as get_role:
+            with mock.patch.object(obj, '_get_role_async',
+                                   new_callable=mock.Mock) as get_role:
                 role_future = concurrent.Future()
                 role_future.set_result(role)
                 get_role.return_value = role_future
@@ -418,7 +509,8 @@ class RefreshTestCase(utils.AsyncHTTPTestCase):
                 role, role, access_key, secret_key, token))
         with mock.patch('tornado_aws.config.INSTANCE_ENDPOINT', url):
             obj = config.Authorization('default', client=client)
-            with mock.patch.object(obj, '_get_role_async') as get_role:
+            with mock.patch.object(obj, '_get_role_async',
+                                   new_callable=mock.Mock) as get_role:
                 future = concurrent.Future()
                 future.set_exception(httpclient.HTTPError(599))
                 get_role.return_value = future
@@ -439,9 +531,664 @@ class RefreshTestCase(utils.AsyncHTTPTestCase):
         with mock.patch('tornado_aws.config.INSTANCE_ENDPOINT', url):
             obj = config.Authorization('default', client=client)
             with mock.patch.object(
-                    obj, '_get_instance_credentials_async') as get_creds:
+                    obj, '_get_instance_credentials_async',
+                    new_callable=mock.Mock) as get_creds:
                 future = concurrent.Future()
                 future.set_exception(httpclient.HTTPError(502))
                 get_creds.return_value = future
                 with self.assertRaises(httpclient.HTTPError):
                     yield obj.refresh()
+
+
+class SingleFlightRefreshTestCase(utils.AsyncHTTPTestCase):
+
+    def setUp(self):
+        super(SingleFlightRefreshTestCase, self).setUp()
+        utils.clear_environment()
+        self.obj = config.Authorization(
+            'default', client=httpclient.AsyncHTTPClient())
+        self.obj._local_credentials = False
+
+    def tearDown(self):
+        utils.clear_environment()
+        super(SingleFlightRefreshTestCase, self).tearDown()
+
+    @staticmethod
+    def credentials():
+        return {'AccessKeyId': uuid.uuid4().hex,
+                'SecretAccessKey': uuid.uuid4().hex,
+                'Expiration': datetime.datetime.now().isoformat(),
+                'Token': uuid.uuid4().hex}
+
+    @testing.gen_test
+    def test_concurrent_refreshes_share_future(self):
+        future = concurrent.Future()
+        with mock.patch.object(self.obj, '_fetch_credentials_async',
+                               new_callable=mock.Mock) as fetch:
+            fetch.return_value = future
+            futures = [self.obj.refresh() for _offset in range(10)]
+            self.assertTrue(all(f is futures[0] for f in futures))
+            credentials = self.credentials()
+            future.set_result(credentials)
+            results = yield futures
+            self.assertEqual(results, [True] * 10)
+            fetch.assert_called_once()
+        self.assertEqual(self.obj.access_key, credentials['AccessKeyId'])
+
+    @testing.gen_test
+    def test_refresh_after_completion_fetches_again(self):
+        with mock.patch.object(self.obj, '_fetch_credentials_async',
+                               new_callable=mock.Mock) as fetch:
+            for _offset in range(2):
+                future = concurrent.Future()
+                future.set_result(self.credentials())
+                fetch.return_value = future
+                yield self.obj.refresh()
+            self.assertEqual(fetch.call_count, 2)
+
+    @testing.gen_test
+    def test_concurrent_refreshes_share_error(self):
+        future = concurrent.Future()
+        with mock.patch.object(self.obj, '_fetch_credentials_async',
+                               new_callable=mock.Mock) as fetch:
+            fetch.return_value = future
+            first, second = self.obj.refresh(), self.obj.refresh()
+            future.set_exception(httpclient.HTTPError(599))
+            for waiter in first, second:
+                with self.assertRaises(exceptions.NoCredentialsError):
+                    yield waiter
+            fetch.assert_called_once()
+        self.assertIsNone(self.obj._refreshing)
+
+
+class ParseExpirationTestCase(unittest.TestCase):
+
+    def test_parse_expiration(self):
+        self.assertEqual(config._parse_expiration('2019-11-17T18:30:15Z'),
+                         1574015415)
+
+    def test_parse_expiration_with_fraction(self):
+        self.assertEqual(
+            config._parse_expiration('2019-11-17T18:30:15.123456'),
+            1574015415)
+
+    def test_parse_invalid_expiration(self):
+        self.assertIsNone(config._parse_expiration('tomorrow'))
+        self.assertIsNone(config._parse_expiration(None))
+
+
+class RefreshAheadTestCase(utils.AsyncHTTPTestCase):
+
+    def setUp(self):
+        super(RefreshAheadTestCase, self).setUp()
+        utils.clear_environment()
+        self.obj = config.Authorization(
+            'default', client=httpclient.AsyncHTTPClient(),
+            refresh_margin=60)
+        self.obj._local_credentials = False
+
+    def tearDown(self):
+        self.obj.reset()
+        utils.clear_environment()
+        super(RefreshAheadTestCase, self).tearDown()
+
+    @staticmethod
+    def credentials(expires_in=3600):
+        expiration = datetime.datetime.now(datetime.timezone.utc) + \
+            datetime.timedelta(seconds=expires_in)
+        return {'AccessKeyId': uuid.uuid4().hex,
+                'SecretAccessKey': uuid.uuid4().hex,
+                'Expiration': expiration.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'Token': uuid.uuid4().hex}
+
+    def test_schedules_refresh_before_expiration(self):
+        with mock.patch.object(self.obj._ioloop, 'call_later') as call_later:
+            self.obj._assign_credentials(self.credentials(600))
+            delay, callback = call_later.call_args[0]
+            self.assertAlmostEqual(delay, 540, delta=2)
+            self.assertEqual(callback, self.obj._refresh_ahead)
+
+    def test_schedules_minimum_interval(self):
+        with mock.patch.object(self.obj._ioloop, 'call_later') as call_later:
+            self.obj._assign_credentials(self.credentials(30))
+            call_later.assert_called_once_with(
+                config.REFRESH_MIN_INTERVAL, self.obj._refresh_ahead)
+
+    def test_reassigning_cancels_scheduled_refresh(self):
+        self.obj._assign_credentials(self.credentials())
+        timeout = self.obj._refresh_timeout
+        with mock.patch.object(self.obj._ioloop,
+                               'remove_timeout') as remove_timeout:
+            self.obj._assign_credentials(self.credentials())
+            remove_timeout.assert_called_once_with(timeout)
+
+    def test_expired_credentials_need_refresh(self):
+        self.obj._assign_credentials(self.credentials())
+        self.assertFalse(self.obj.needs_credentials())
+        self.obj._assign_credentials(self.credentials(-10))
+        self.assertTrue(self.obj.needs_credentials())
+
+    @testing.gen_test
+    def test_refresh_ahead_swaps_credentials(self):
+        current, new = self.credentials(), self.credentials()
+        self.obj._assign_credentials(current)
+        future = concurrent.Future()
+        with mock.patch.object(self.obj, '_fetch_credentials_async',
+                               new_callable=mock.Mock) as fetch:
+            fetch.return_value = future
+            self.obj._refresh_ahead()
+            self.assertFalse(self.obj.needs_credentials())
+            self.assertEqual(self.obj.access_key, current['AccessKeyId'])
+            future.set_result(new)
+            yield self.obj.refresh()
+        self.assertEqual(self.obj.access_key, new['AccessKeyId'])
+        self.assertEqual(self.obj.secret_key, new['SecretAccessKey'])
+        self.assertEqual(self.obj.security_token, new['Token'])
+        self.assertIsNotNone(self.obj._refresh_timeout)
+
+    @testing.gen_test
+    def test_refresh_ahead_failure_is_retried(self):
+        self.obj._assign_credentials(self.credentials())
+        future = concurrent.Future()
+        future.set_exception(httpclient.HTTPError(599))
+        with mock.patch.object(self.obj, '_fetch_credentials_async',
+                               new_callable=mock.Mock) as fetch:
+            fetch.return_value = future
+            with mock.patch.object(self.obj._ioloop,
+                                   'call_later') as call_later:
+                self.obj._refresh_ahead()
+                with self.assertRaises(exceptions.NoCredentialsError):
+                    yield self.obj.refresh()
+                yield gen.moment
+                call_later.assert_called_once_with(
+                    config.REFRESH_MIN_INTERVAL, self.obj._refresh_ahead)
+
+    @testing.gen_test
+    def test_refresh_ahead_non_transient_failure_is_not_retried(self):
+        self.obj._assign_credentials(self.credentials())
+        future = concurrent.Future()
+        future.set_exception(RuntimeError(
+            'fetch() called on closed AsyncHTTPClient'))
+        with mock.patch.object(self.obj, '_fetch_credentials_async',
+                               new_callable=mock.Mock) as fetch:
+            fetch.return_value = future
+            with mock.patch.object(self.obj._ioloop,
+                                   'call_later') as call_later:
+                self.obj._refresh_ahead()
+                with self.assertRaises(RuntimeError):
+                    yield self.obj.refresh()
+                yield gen.moment
+                call_later.assert_not_called()
+
+    def test_close_cancels_scheduled_refresh(self):
+        self.obj._assign_credentials(self.credentials())
+        self.assertIsNotNone(self.obj._refresh_timeout)
+        self.obj.close()
+        self.assertIsNone(self.obj._refresh_timeout)
+        self.obj._assign_credentials(self.credentials())
+        self.assertIsNone(self.obj._refresh_timeout)
+        self.assertFalse(self.obj.needs_credentials())
+
+    def test_sync_client_does_not_schedule(self):
+        obj = config.Authorization('default', client=httpclient.HTTPClient())
+        obj._assign_credentials(self.credentials())
+        self.assertIsNone(obj._refresh_timeout)
+
+
+class InstanceTokenTestCase(utils.AsyncHTTPTestCase):
+
+    TOKEN = 'token-{}'.format(config.INSTANCE_TOKEN_TTL)
+
+    def setUp(self):
+        super(InstanceTokenTestCase, self).setUp()
+        config._clear_instance_token()
+        self.role = uuid.uuid4().hex
+        self.endpoint = self.get_url('/latest{}?role=%s' % self.role)
+
+    def tearDown(self):
+        config._clear_instance_token()
+        config._instance_region = None
+        utils.clear_environment()
+        super(InstanceTokenTestCase, self).tearDown()
+
+    @staticmethod
+    def methods(fetch):
+        return [call[1].get('method', 'GET')
+                for call in fetch.call_args_list]
+
+    @testing.gen_test
+    def test_async_token_is_reused(self):
+        client = httpclient.AsyncHTTPClient()
+        obj = config.Authorization('default', client=client)
+        with mock.patch('tornado_aws.config.INSTANCE_ENDPOINT',
+                        self.endpoint):
+            with mock.patch.object(client, 'fetch',
+                                   wraps=client.fetch) as fetch:
+                role = yield obj._get_role_async()
+                self.assertEqual(role, self.role)
+                yield obj._get_instance_credentials_async(role)
+                yield obj._get_role_async()
+        self.assertEqual(self.methods(fetch), ['PUT', 'GET', 'GET', 'GET'])
+        self.assertEqual(
+            fetch.call_args_list[0][1]['headers'],
+            {config.TOKEN_TTL_HEADER: str(config.INSTANCE_TOKEN_TTL)})
+        for call in fetch.call_args_list[1:]:
+            self.assertEqual(call[1]['headers'],
+                             {config.TOKEN_HEADER: self.TOKEN})
+
+    @testing.gen_test
+    def test_async_falls_back_to_v1(self):
+        client = httpclient.AsyncHTTPClient()
+        obj = config.Authorization('default', client=client)
+        with mock.patch('tornado_aws.config.INSTANCE_ENDPOINT',
+                        self.endpoint):
+            with mock.patch('tornado_aws.config.INSTANCE_TOKEN_PATH',
+                            '/invalid'):
+                with mock.patch.object(client, 'fetch',
+                                       wraps=client.fetch) as fetch:
+                    role = yield obj._get_role_async()
+        self.assertEqual(role, self.role)
+        self.assertEqual(self.methods(fetch), ['PUT', 'GET'])
+        self.assertEqual(fetch.call_args_list[1][1]['headers'], {})
+        self.assertIsNone(config._cached_instance_token())
+
+    @concurrent.run_on_executor
+    def sync_fetch_credentials(self):
+        client = httpclient.HTTPClient()
+        obj = config.Authorization('default', client=client)
+        with mock.patch('tornado_aws.config.INSTANCE_ENDPOINT',
+                        self.endpoint):
+            with mock.patch.object(client, 'fetch',
+                                   wraps=client.fetch) as fetch:
+                obj._fetch_credentials()
+                return fetch
+
+    @testing.gen_test
+    def test_sync_token_is_reused(self):
+        fetch = yield self.sync_fetch_credentials()
+        self.assertEqual(self.methods(fetch), ['PUT', 'GET', 'GET'])
+        self.assertEqual(config._cached_instance_token(), self.TOKEN)
+
+    def test_token_expires(self):
+        config._cache_instance_token(self.TOKEN)
+        self.assertEqual(config._cached_instance_token(), self.TOKEN)
+        expired = time.time() + config.INSTANCE_TOKEN_TTL
+        with mock.patch('time.time') as now:
+            now.return_value = expired
+            self.assertIsNone(config._cached_instance_token())
+
+    @concurrent.run_on_executor
+    def request_region(self, region):
+        with mock.patch('tornado_aws.config.INSTANCE_HOST',
+                        '127.0.0.1:{}'.format(self.get_http_port())):
+            with mock.patch('tornado_aws.config.INSTANCE_ENDPOINT',
+                            '/latest{}?region=%s' % region):
+                return config._request_region_from_instance()
+
+    @testing.gen_test
+    def test_region_request_uses_token(self):
+        region = uuid.uuid4().hex
+        value = yield self.request_region(region)
+        self.assertEqual(value, region)
+        self.assertEqual(config._cached_instance_token(), self.TOKEN)
+
+    @testing.gen_test
+    def test_async_region_request_is_shared(self):
+        region = uuid.uuid4().hex
+        os.environ['AWS_CONFIG_FILE'] = uuid.uuid4().hex
+        client = httpclient.AsyncHTTPClient()
+        with mock.patch('tornado_aws.config.INSTANCE_ENDPOINT',
+                        self.get_url('/latest{}?region=%s' % region)):
+            with mock.patch.object(client, 'fetch',
+                                   wraps=client.fetch) as fetch:
+                values = yield [config.get_region_async('default', client),
+                                config.get_region_async('default', client)]
+                self.assertEqual(values, [region, region])
+                value = yield config.get_region_async('default', client)
+                self.assertEqual(value, region)
+        self.assertEqual(self.methods(fetch), ['PUT', 'GET'])
+        self.assertEqual(fetch.call_args_list[1][1]['headers'],
+                         {config.TOKEN_HEADER: self.TOKEN,
+                          'Accept': 'application/json'})
+        self.assertIsNone(config._region_request)
+        self.assertEqual(config.get_region('default'), region)
+
+    @testing.gen_test
+    def test_async_region_request_failure(self):
+        os.environ['AWS_CONFIG_FILE'] = uuid.uuid4().hex
+        with mock.patch('tornado_aws.config.INSTANCE_ENDPOINT',
+                        self.get_url('/missing{}')):
+            with self.assertRaises(exceptions.ConfigNotFound):
+                yield config.get_region_async('default')
+        self.assertIsNone(config._region_request)
+        self.assertIsNone(config._instance_region)
+
+
+class SharedAuthorizationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        super(SharedAuthorizationTestCase, self).setUp()
+        utils.clear_environment()
+        os.environ['AWS_ACCESS_KEY_ID'] = uuid.uuid4().hex
+        os.environ['AWS_SECRET_ACCESS_KEY'] = uuid.uuid4().hex
+        config._shared_authorizations.clear()
+
+    def tearDown(self):
+        config._shared_authorizations.clear()
+        utils.clear_environment()
+        super(SharedAuthorizationTestCase, self).tearDown()
+
+    def test_same_instance_per_profile(self):
+        obj = config.shared_authorization()
+        self.assertIs(config.shared_authorization('default'), obj)
+        self.assertIsNot(config.shared_authorization('other'), obj)
+
+    def test_default_profile_from_environment(self):
+        os.environ['AWS_DEFAULT_PROFILE'] = 'other'
+        self.assertIs(config.shared_authorization(),
+                      config.shared_authorization('other'))
+
+    def test_async_and_sync_instances(self):
+        async_obj = config.shared_authorization()
+        sync_obj = config.shared_authorization(asynchronous=False)
+        self.assertIsNot(async_obj, sync_obj)
+        self.assertTrue(async_obj.is_async)
+        self.assertFalse(sync_obj.is_async)
+
+
+class ContainerCredentialsTestCase(utils.AsyncHTTPTestCase):
+
+    def setUp(self):
+        super(ContainerCredentialsTestCase, self).setUp()
+        utils.clear_environment()
+        self.access_key = uuid.uuid4().hex
+        self.authorization = uuid.uuid4().hex
+
+    def tearDown(self):
+        utils.clear_environment()
+        super(ContainerCredentialsTestCase, self).tearDown()
+
+    def relative_uri(self, authorization=None):
+        uri = '/v2/credentials/{}?access_key={}'.format(
+            uuid.uuid4(), self.access_key)
+        if authorization:
+            uri += '&authorization={}'.format(authorization)
+        return uri
+
+    def authorization_for(self, client):
+        obj = config.Authorization('default', client=client)
+        obj._local_credentials = False
+        return obj
+
+    @testing.gen_test
+    def test_relative_uri(self):
+        os.environ['AWS_CONTAINER_CREDENTIALS_RELATIVE_URI'] = \
+            self.relative_uri()
+        obj = self.authorization_for(httpclient.AsyncHTTPClient())
+        with mock.patch('tornado_aws.config.CONTAINER_ENDPOINT',
+                        self.get_url('')):
+            yield obj.refresh()
+        self.assertEqual(obj.access_key, self.access_key)
+        self.assertFalse(obj.needs_credentials())
+        self.assertIsNotNone(obj._refresh_timeout)
+        obj.reset()
+
+    @testing.gen_test
+    def test_full_uri_with_authorization_token(self):
+        os.environ['AWS_CONTAINER_CREDENTIALS_FULL_URI'] = self.get_url(
+            self.relative_uri(self.authorization))
+        os.environ['AWS_CONTAINER_AUTHORIZATION_TOKEN'] = self.authorization
+        obj = self.authorization_for(httpclient.AsyncHTTPClient())
+        yield obj.refresh()
+        self.assertEqual(obj.access_key, self.access_key)
+        obj.reset()
+
+    @testing.gen_test
+    def test_full_uri_with_authorization_token_file(self):
+        os.environ['AWS_CONTAINER_CREDENTIALS_FULL_URI'] = self.get_url(
+            self.relative_uri(self.authorization))
+        with tempfile.NamedTemporaryFile('w') as handle:
+            handle.write('{}\n'.format(self.authorization))
+            handle.flush()
+            os.environ['AWS_CONTAINER_AUTHORIZATION_TOKEN_FILE'] = \
+                handle.name
+            os.environ['AWS_CONTAINER_AUTHORIZATION_TOKEN'] = 'ignored'
+            obj = self.authorization_for(httpclient.AsyncHTTPClient())
+            yield obj.refresh()
+        self.assertEqual(obj.access_key, self.access_key)
+        obj.reset()
+
+    @testing.gen_test
+    def test_missing_authorization_token_file(self):
+        os.environ['AWS_CONTAINER_CREDENTIALS_FULL_URI'] = self.get_url(
+            self.relative_uri(self.authorization))
+        os.environ['AWS_CONTAINER_AUTHORIZATION_TOKEN_FILE'] = \
+            '/tmp/{}'.format(uuid.uuid4())
+        obj = self.authorization_for(httpclient.AsyncHTTPClient())
+        with self.assertRaises(exceptions.NoCredentialsError):
+            yield obj.refresh()
+
+    @testing.gen_test
+    def test_invalid_authorization_token(self):
+        os.environ['AWS_CONTAINER_CREDENTIALS_FULL_URI'] = self.get_url(
+            self.relative_uri(self.authorization))
+        os.environ['AWS_CONTAINER_AUTHORIZATION_TOKEN'] = 'invalid'
+        obj = self.authorization_for(httpclient.AsyncHTTPClient())
+        with self.assertRaises(httpclient.HTTPError) as error:
+            yield obj.refresh()
+        self.assertEqual(error.exception.code, 401)
+
+    def test_full_uri_must_be_local_or_https(self):
+        os.environ['AWS_CONTAINER_CREDENTIALS_FULL_URI'] = \
+            'http://169.254.169.254/credentials'
+        with self.assertRaises(exceptions.NoCredentialsError):
+            config._container_credentials_request()
+        for url in ('https://example.com/credentials',
+                    'http://169.254.170.23/v1/credentials',
+                    'http://localhost:8080/credentials',
+                    'http://[::1]/credentials'):
+            os.environ['AWS_CONTAINER_CREDENTIALS_FULL_URI'] = url
+            self.assertEqual(config._container_credentials_request(),
+                             (url, {}))
+
+    def test_not_configured(self):
+        self.assertIsNone(config._container_credentials_request())
+
+    @concurrent.run_on_executor
+    def sync_refresh(self):
+        obj = self.authorization_for(httpclient.HTTPClient())
+        obj.refresh()
+        return obj
+
+    @testing.gen_test
+    def test_sync_refresh(self):
+        os.environ['AWS_CONTAINER_CREDENTIALS_FULL_URI'] = self.get_url(
+            self.relative_uri(self.authorization))
+        os.environ['AWS_CONTAINER_AUTHORIZATION_TOKEN'] = self.authorization
+        obj = yield self.sync_refresh()
+        self.assertEqual(obj.access_key, self.access_key)
+
+
+class CredentialCacheTestCase(utils.AsyncHTTPTestCase):
+
+    def setUp(self):
+        super(CredentialCacheTestCase, self).setUp()
+        utils.clear_environment()
+        os.environ['AWS_SHARED_CREDENTIALS_FILE'] = uuid.uuid4().hex
+        self.access_key = uuid.uuid4().hex
+        self.cache_dir = tempfile.TemporaryDirectory()
+        os.environ['AWS_CONTAINER_CREDENTIALS_FULL_URI'] = self.get_url(
+            '/v2/credentials/{}?access_key={}'.format(
+                uuid.uuid4(), self.access_key))
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+        utils.clear_environment()
+        super(CredentialCacheTestCase, self).tearDown()
+
+    def authorization(self, profile='default', provider=None):
+        return config.Authorization(
+            profile, client=httpclient.AsyncHTTPClient(), provider=provider,
+            cache_dir=self.cache_dir.name)
+
+    def write_cache(self, obj, value):
+        with open(obj._cache_path(), 'w') as handle:
+            handle.write(value)
+
+    @testing.gen_test
+    def test_refresh_writes_cache(self):
+        obj = self.authorization()
+        self.assertTrue(obj.needs_credentials())
+        yield obj.refresh()
+        obj.reset()
+        self.assertEqual(os.listdir(self.cache_dir.name),
+                         [path.basename(obj._cache_path())])
+        self.assertEqual(os.stat(obj._cache_path()).st_mode & 0o777, 0o600)
+        with open(obj._cache_path(), 'r') as handle:
+            self.assertEqual(sorted(json.load(handle)),
+                             sorted(config.CACHED_CREDENTIAL_KEYS))
+
+    @testing.gen_test
+    def test_cached_credentials_are_loaded(self):
+        yield self.authorization().refresh()
+        with mock.patch('tornado_aws.config.Authorization._fetch_credentials',
+                        side_effect=AssertionError('fetched credentials')):
+            obj = self.authorization()
+        self.assertFalse(obj.needs_credentials())
+        self.assertEqual(obj.access_key, self.access_key)
+        self.assertIsNotNone(obj._refresh_timeout)
+        obj.reset()
+
+    def test_expired_credentials_are_not_loaded(self):
+        obj = self.authorization()
+        self.write_cache(obj, json.dumps({
+            'AccessKeyId': uuid.uuid4().hex,
+            'SecretAccessKey': uuid.uuid4().hex,
+            'Token': uuid.uuid4().hex,
+            'Expiration': '2019-11-17T18:30:15Z'}))
+        self.assertTrue(self.authorization().needs_credentials())
+
+    def test_invalid_cache_is_not_loaded(self):
+        obj = self.authorization()
+        for value in ('{', '[]', json.dumps({'AccessKeyId': 'foo'})):
+            self.write_cache(obj, value)
+            self.assertTrue(self.authorization().needs_credentials())
+
+    def test_cache_key(self):
+        provider = mock.Mock(cache_key='arn:aws:iam::123456789012:role/a',
+                             is_async=True)
+        paths = {self.authorization()._cache_path(),
+                 self.authorization('other')._cache_path(),
+                 self.authorization(provider=provider)._cache_path()}
+        self.assertEqual(len(paths), 3)
+
+    def test_cache_write_error(self):
+        with tempfile.NamedTemporaryFile() as handle:
+            obj = config.Authorization(
+                'default', client=httpclient.AsyncHTTPClient(),
+                cache_dir=handle.name)
+            obj._cache_credentials({
+                'AccessKeyId': uuid.uuid4().hex,
+                'SecretAccessKey': uuid.uuid4().hex,
+                'Token': uuid.uuid4().hex,
+                'Expiration': '2019-11-17T18:30:15Z'})
+        self.assertEqual(os.listdir(self.cache_dir.name), [])
+
+    @testing.gen_test
+    def test_local_credentials_are_not_cached(self):
+        os.environ['AWS_ACCESS_KEY_ID'] = uuid.uuid4().hex
+        os.environ['AWS_SECRET_ACCESS_KEY'] = uuid.uuid4().hex
+        obj = self.authorization()
+        yield obj.refresh()
+        self.assertEqual(os.listdir(self.cache_dir.name), [])
+
+
+class PreforkCredentialsTestCase(utils.AsyncHTTPTestCase):
+
+    def setUp(self):
+        super(PreforkCredentialsTestCase, self).setUp()
+        utils.clear_environment()
+        os.environ['AWS_SHARED_CREDENTIALS_FILE'] = uuid.uuid4().hex
+        os.environ['AWS_CONTAINER_CREDENTIALS_FULL_URI'] = self.get_url(
+            '/v2/credentials/{}'.format(uuid.uuid4()))
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.fetched = []
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+        utils.clear_environment()
+        super(PreforkCredentialsTestCase, self).tearDown()
+
+    def authorization(self, client=None):
+        return config.Authorization(
+            'default', client=client or httpclient.AsyncHTTPClient(),
+            cache_dir=self.cache_dir.name, prefork=True)
+
+    def count_fetches(self):
+        fetch = config.Authorization._fetch_credentials_async
+
+        async def wrapper(obj):
+            self.fetched.append(obj)
+            return await fetch(obj)
+
+        return mock.patch.object(
+            config.Authorization, '_fetch_credentials_async', wrapper)
+
+    def test_prefork_requires_cache_dir(self):
+        with self.assertRaises(ValueError):
+            config.Authorization('default', client=httpclient.HTTPClient(),
+                                 prefork=True)
+
+    @testing.gen_test
+    def test_one_process_fetches_credentials(self):
+        processes = [self.authorization() for _iteration in range(5)]
+        with self.count_fetches():
+            yield [obj.refresh() for obj in processes]
+        self.assertEqual(len(self.fetched), 1)
+        self.assertEqual(len({obj.secret_key for obj in processes}), 1)
+        for obj in processes:
+            self.assertFalse(obj.needs_credentials())
+            obj.reset()
+
+    @testing.gen_test
+    def test_refreshed_credentials_are_loaded(self):
+        leader, follower = self.authorization(), self.authorization()
+        yield leader.refresh()
+        yield follower.refresh()
+        self.assertEqual(follower.secret_key, leader.secret_key)
+        with self.count_fetches():
+            yield leader.refresh()
+            yield follower.refresh()
+        self.assertEqual(self.fetched, [leader])
+        self.assertEqual(follower.secret_key, leader.secret_key)
+        leader.reset()
+        follower.reset()
+
+    @testing.gen_test
+    def test_waits_for_lock_holder(self):
+        obj = self.authorization()
+        lock = obj._acquire_refresh_lock()
+        self.assertIsNone(self.authorization()._acquire_refresh_lock())
+        with mock.patch('tornado_aws.config.PREFORK_WAIT', 0.2):
+            with self.count_fetches():
+                with self.assertRaises(exceptions.NoCredentialsError):
+                    yield obj.refresh()
+        os.close(lock)
+        self.assertEqual(self.fetched, [])
+        yield obj.refresh()
+        self.assertFalse(obj.needs_credentials())
+        obj.reset()
+
+    @concurrent.run_on_executor
+    def sync_refresh(self):
+        obj = self.authorization(httpclient.HTTPClient())
+        obj.refresh()
+        return obj
+
+    @testing.gen_test
+    def test_sync_refresh(self):
+        leader = yield self.sync_refresh()
+        self.assertFalse(leader.is_async)
+        obj = self.authorization()
+        self.assertEqual(obj.secret_key, leader.secret_key)
+        obj.reset()
@@ -0,0 +1,119 @@
+import unittest
+from unittest import mock
+
+from tornado_aws import retry
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+
+    def test_invalid_max_attempts(self):
+        with self.assertRaises(ValueError):
+            retry.RetryPolicy(max_attempts=0)
+
+    def test_is_retryable(self):
+        for status_code in (429, 500, 502, 503, 504, 599):
+            self.assertTrue(retry.RetryPolicy.is_retryable(status_code))
+        for error_type in ('ThrottlingException', 'SlowDown',
+                           'ProvisionedThroughputExceededException',
+                           'RequestLimitExceeded', 'RequestTimeout'):
+            self.assertTrue(retry.RetryPolicy.is_retryable(400, error_type))
+
+    def test_is_not_retryable(self):
+        self.assertFalse(retry.RetryPolicy.is_retryable(400))
+        self.assertFalse(retry.RetryPolicy.is_retryable(
+            400, 'ValidationException'))
+        self.assertFalse(retry.RetryPolicy.is_retryable(404, 'NoSuchKey'))
+
+    def test_is_throttling_error(self):
+        self.assertTrue(retry.is_throttling_error('ThrottlingException'))
+        self.assertFalse(retry.is_throttling_error('InternalError'))
+        self.assertTrue(retry.is_throttling_error(None, 429))
+        self.assertFalse(retry.is_throttling_error(None, 400))
+
+    def test_backoff_is_capped(self):
+        policy = retry.RetryPolicy(base_delay=1, max_delay=5)
+        with mock.patch('random.uniform') as uniform:
+            uniform.return_value = 1.5
+            self.assertEqual(policy.backoff(1), 1.5)
+            uniform.assert_called_once_with(0, 2)
+            policy.backoff(10)
+            uniform.assert_called_with(0, 5)
+
+    def test_retry_delay(self):
+        policy = retry.RetryPolicy(max_attempts=3, base_delay=0.5)
+        with mock.patch('random.uniform') as uniform:
+            uniform.return_value = 0.25
+            self.assertEqual(policy.retry_delay(1, 503), 0.25)
+            self.assertEqual(policy.retry_delay(2, 599), 0.25)
+        self.assertIsNone(policy.retry_delay(3, 503))
+        self.assertIsNone(policy.retry_delay(1, 400, 'ValidationException'))
+        self.assertEqual(policy.available, 485)
+
+    def test_budget(self):
+        policy = retry.RetryPolicy(budget=12)
+        self.assertIsNotNone(policy.retry_delay(1, 503))
+        self.assertIsNotNone(policy.retry_delay(1, 503))
+        self.assertIsNone(policy.retry_delay(1, 503))
+        self.assertEqual(policy.available, 2)
+        policy.succeeded()
+        self.assertEqual(policy.available, 3)
+        policy.succeeded(retried=True)
+        self.assertEqual(policy.available, 8)
+        policy.succeeded(retried=True)
+        self.assertEqual(policy.available, 12)
+
+
+class AdaptiveRateLimiterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        super(AdaptiveRateLimiterTestCase, self).setUp()
+        self.now = 1000.0
+        patcher = mock.patch('time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limiter = retry.AdaptiveRateLimiter()
+
+    def send(self, count, interval, throttled=False):
+        for _offset in range(count):
+            self.limiter.update(throttled)
+            self.now += interval
+
+    def test_disabled_until_throttled(self):
+        self.send(100, 0.01)
+        self.assertEqual(self.limiter.delay(), 0)
+        self.assertFalse(self.limiter.state['enabled'])
+        self.assertIsNone(self.limiter.state['rate'])
+
+    def test_throttling_reduces_rate(self):
+        self.send(100, 0.01)
+        measured = self.limiter.state['measured_rate']
+        self.assertGreater(measured, 75.0)
+        self.assertLess(measured, 100.0)
+        self.limiter.update(True)
+        state = self.limiter.state
+        self.assertTrue(state['enabled'])
+        self.assertEqual(state['last_max_rate'], measured)
+        self.assertAlmostEqual(state['rate'], measured * 0.7)
+
+    def test_delay_spaces_requests(self):
+        self.send(100, 0.01)
+        self.limiter.update(True)
+        rate = self.limiter.state['rate']
+        self.assertAlmostEqual(self.limiter.delay(), 1 / rate)
+        self.assertAlmostEqual(self.limiter.delay(), 2 / rate)
+        self.now += 3 / rate
+        self.assertEqual(self.limiter.delay(), 0)
+
+    def test_rate_recovers_cubically(self):
+        self.send(100, 0.01)
+        self.limiter.update(True)
+        reduced = self.limiter.state['rate']
+        self.send(50, 0.01)
+        recovering = self.limiter.state['rate']
+        self.assertGreater(recovering, reduced)
+        self.send(1000, 0.01)
+        self.assertGreater(self.limiter.state['rate'], 75.0)
+
+    def test_minimum_rate(self):
+        self.limiter.update(True)
+        self.assertEqual(self.limiter.state['rate'], 0.5)
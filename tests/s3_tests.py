@@ -0,0 +1,539 @@
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from urllib import parse
+import uuid
+from xml.etree import ElementTree
+from xml.sax import saxutils
+
+from tornado import gen, locks, testing, web
+
+from tornado_aws import client, exceptions, retry, s3
+from . import utils
+
+NAMESPACE = 'http://s3.amazonaws.com/doc/2006-03-01/'
+
+
+class FakeS3(object):
+
+    def __init__(self):
+        self.aborted = []
+        self.failures = {}
+        self.get_failures = []
+        self.ignore_if_match = False
+        self.list_event = None
+        self.list_requests = []
+        self.on_get = None
+        self.in_flight = 0
+        self.short_reads = 0
+        self.max_in_flight = 0
+        self.objects = {}
+        self.uploads = {}
+
+
+class ObjectHandler(web.RequestHandler):
+
+    def initialize(self, store):
+        self.store = store
+
+    def error(self, status, code):
+        self.set_status(status)
+        self.set_header('Content-Type', 'application/xml')
+        self.finish('<?xml version="1.0" encoding="UTF-8"?>\n<Error><Code>{}'
+                    '</Code><Message>{}</Message></Error>'.format(code, code))
+
+    def result(self, name, **values):
+        self.set_header('Content-Type', 'application/xml')
+        self.finish('<{0} xmlns="{1}">{2}</{0}>'.format(
+            name, NAMESPACE, ''.join('<{0}>{1}</{0}>'.format(key, value)
+                                     for key, value in values.items())))
+
+    def head(self, bucket, key):
+        if key not in self.store.objects:
+            raise web.HTTPError(404)
+        body, etag = self.store.objects[key]
+        self.set_header('Content-Length', len(body))
+        self.set_header('ETag', etag)
+
+    async def get(self, bucket, key):
+        if self.store.get_failures:
+            return self.error(*self.store.get_failures.pop(0))
+        if self.store.on_get is not None:
+            self.store.on_get()
+        body, etag = self.store.objects[key]
+        if self.request.headers.get('If-Match') != etag and \
+                not self.store.ignore_if_match:
+            return self.error(412, 'PreconditionFailed')
+        start, end = (int(value) for value in self.request.headers[
+            'Range'][6:].split('-'))
+        end = min(end, len(body) - 1)
+        if self.store.short_reads:
+            self.store.short_reads -= 1
+            end -= 1
+        self.store.in_flight += 1
+        self.store.max_in_flight = max(
+            self.store.max_in_flight, self.store.in_flight)
+        await gen.sleep(0.01)
+        self.store.in_flight -= 1
+        self.set_status(206)
+        self.set_header('Content-Range', 'bytes {}-{}/{}'.format(
+            start, end, len(body)))
+        self.set_header('ETag', etag)
+        self.finish(body[start:end + 1])
+
+    def post(self, bucket, key):
+        if 'uploads' in self.request.arguments:
+            upload_id = uuid.uuid4().hex
+            self.store.uploads[upload_id] = {}
+            return self.result('InitiateMultipartUploadResult',
+                               Bucket=bucket, Key=key, UploadId=upload_id)
+        parts = self.store.uploads.pop(self.get_argument('uploadId'), None)
+        if parts is None:
+            return self.error(404, 'NoSuchUpload')
+        root = ElementTree.XML(self.request.body)
+        body = b''
+        for number, part in enumerate(root.findall('Part'), 1):
+            etag, data = parts[int(part.findtext('PartNumber'))]
+            if int(part.findtext('PartNumber')) != number or \
+                    part.findtext('ETag') != etag:
+                return self.error(400, 'InvalidPart')
+            body += data
+        etag = '"{}-{}"'.format(hashlib.md5(body).hexdigest(), len(parts))
+        self.store.objects[key] = body, etag
+        self.result('CompleteMultipartUploadResult',
+                    Bucket=bucket, Key=key, ETag=etag)
+
+    async def put(self, bucket, key):
+        upload_id = self.get_argument('uploadId')
+        number = int(self.get_argument('partNumber'))
+        if self.store.failures.get(number):
+            return self.error(*self.store.failures[number].pop(0))
+        if upload_id not in self.store.uploads:
+            return self.error(404, 'NoSuchUpload')
+        self.store.in_flight += 1
+        self.store.max_in_flight = max(
+            self.store.max_in_flight, self.store.in_flight)
+        await gen.sleep(0.01)
+        self.store.in_flight -= 1
+        etag = '"{}"'.format(hashlib.md5(self.request.body).hexdigest())
+        self.store.uploads[upload_id][number] = etag, self.request.body
+        self.set_header('ETag', etag)
+
+    def delete(self, bucket, key):
+        self.store.uploads.pop(self.get_argument('uploadId'), None)
+        self.store.aborted.append(self.get_argument('uploadId'))
+        self.set_status(204)
+
+
+class BucketHandler(ObjectHandler):
+
+    async def get(self, bucket):
+        self.store.list_requests.append(self.request.arguments)
+        if bucket != 'bucket':
+            return self.error(404, 'NoSuchBucket')
+        prefix = self.get_argument('prefix', '')
+        delimiter = self.get_argument('delimiter', None)
+        after = self.get_argument('continuation-token',
+                                  self.get_argument('start-after', ''))
+        entries = []
+        for key in sorted(self.store.objects):
+            if key <= after or not key.startswith(prefix):
+                continue
+            if delimiter and delimiter in key[len(prefix):]:
+                common = key[:key.index(delimiter, len(prefix)) + 1]
+                if entries and entries[-1] == (common, None):
+                    continue
+                entries.append((common, None))
+            else:
+                entries.append((key, self.store.objects[key]))
+        page = entries[:int(self.get_argument('max-keys'))]
+        self.set_header('Content-Type', 'application/xml')
+        self.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<ListBucketResult xmlns="{}"><Name>bucket</Name>'
+                   '<KeyCount>{}</KeyCount>'.format(NAMESPACE, len(page)))
+        if len(page) < len(entries):
+            self.write('<NextContinuationToken>{}</NextContinuationToken>'
+                       '<IsTruncated>true</IsTruncated>'.format(
+                           saxutils.escape(page[-1][0])))
+        for key, value in page:
+            if value is None:
+                self.write('<CommonPrefixes><Prefix>{}</Prefix>'
+                           '</CommonPrefixes>'.format(parse.quote(key)))
+            else:
+                self.write(
+                    '<Contents><Key>{}</Key><LastModified>2019-11-17T00:00:'
+                    '00.000Z</LastModified><ETag>{}</ETag><Size>{}</Size>'
+                    '<Owner><ID>owner</ID></Owner><StorageClass>STANDARD'
+                    '</StorageClass></Contents>'.format(
+                        parse.quote(key), saxutils.escape(value[1]),
+                        len(value[0])))
+            await self.flush()
+            if self.store.list_event is not None:
+                await self.store.list_event.wait()
+        self.finish('</ListBucketResult>')
+
+
+class S3TestCase(utils.AsyncHTTPTestCase):
+
+    PART_SIZE = 1024
+
+    def setUp(self):
+        self.store = FakeS3()
+        super(S3TestCase, self).setUp()
+        utils.clear_environment()
+        os.environ['AWS_ACCESS_KEY_ID'] = uuid.uuid4().hex
+        os.environ['AWS_SECRET_ACCESS_KEY'] = uuid.uuid4().hex
+        self.client = client.AsyncAWSClient(
+            's3', region='us-east-1', endpoint=self.get_url(''))
+        patcher = mock.patch.object(
+            s3.MultipartUploader, 'MIN_PART_SIZE', self.PART_SIZE)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        utils.clear_environment()
+        super(S3TestCase, self).tearDown()
+
+    def retrying_client(self):
+        return client.AsyncAWSClient(
+            's3', region='us-east-1', endpoint=self.get_url(''),
+            retry_policy=retry.RetryPolicy(max_attempts=3))
+
+    def get_app(self):
+        return web.Application([
+            (r'/([^/]+)', BucketHandler, {'store': self.store}),
+            (r'/([^/]+)/(.*)', ObjectHandler, {'store': self.store})])
+
+
+class MultipartUploaderTestCase(S3TestCase):
+
+    def uploader(self, **kwargs):
+        kwargs.setdefault('part_size', self.PART_SIZE)
+        return s3.MultipartUploader(self.client, **kwargs)
+
+    @testing.gen_test
+    def test_upload_bytes(self):
+        body = os.urandom(self.PART_SIZE * 3 + 10)
+        etag = yield self.uploader().upload('bucket', 'path/to key', body)
+        self.assertEqual(self.store.objects['path/to key'], (body, etag))
+        self.assertTrue(etag.endswith('-4"'))
+        self.assertEqual(self.store.uploads, {})
+
+    @testing.gen_test
+    def test_upload_file(self):
+        body = os.urandom(self.PART_SIZE * 2)
+        yield self.uploader().upload('bucket', 'key', io.BytesIO(body))
+        self.assertEqual(self.store.objects['key'][0], body)
+
+    @testing.gen_test
+    def test_upload_async_iterator(self):
+        body = os.urandom(self.PART_SIZE * 2 + 500)
+
+        async def chunks():
+            for offset in range(0, len(body), 700):
+                yield body[offset:offset + 700]
+
+        etag = yield self.uploader().upload('bucket', 'key', chunks())
+        self.assertEqual(self.store.objects['key'], (body, etag))
+        self.assertTrue(etag.endswith('-3"'))
+
+    @testing.gen_test
+    def test_upload_empty_body(self):
+        yield self.uploader().upload('bucket', 'key', b'')
+        self.assertEqual(self.store.objects['key'][0], b'')
+
+    @testing.gen_test
+    def test_concurrency_is_bounded(self):
+        body = os.urandom(self.PART_SIZE * 12)
+        yield self.uploader(concurrency=3).upload('bucket', 'key', body)
+        self.assertEqual(self.store.objects['key'][0], body)
+        self.assertEqual(self.store.max_in_flight, 3)
+
+    @testing.gen_test
+    def test_failed_part_is_retried(self):
+        self.store.failures[2] = [(500, 'InternalError')]
+        body = os.urandom(self.PART_SIZE * 3)
+        with mock.patch('tornado_aws.retry.RetryPolicy.backoff',
+                        return_value=0):
+            yield self.uploader().upload('bucket', 'key', body)
+        self.assertEqual(self.store.objects['key'][0], body)
+        self.assertEqual(self.store.failures[2], [])
+
+    @testing.gen_test
+    def test_failed_part_is_retried_by_client(self):
+        self.store.failures[2] = [(500, 'InternalError')] * 4
+        uploader = s3.MultipartUploader(
+            self.retrying_client(), part_size=self.PART_SIZE)
+        with mock.patch('tornado_aws.retry.RetryPolicy.backoff',
+                        return_value=0):
+            with self.assertRaises(exceptions.AWSError):
+                yield uploader.upload(
+                    'bucket', 'key', os.urandom(self.PART_SIZE * 3))
+        self.assertEqual(len(self.store.failures[2]), 1)
+
+    @testing.gen_test
+    def test_failed_upload_is_aborted(self):
+        self.store.failures[2] = [(403, 'AccessDenied')]
+        with self.assertRaises(exceptions.AWSError) as context:
+            yield self.uploader().upload(
+                'bucket', 'key', os.urandom(self.PART_SIZE * 6))
+        self.assertEqual(context.exception.args[1]['type'], 'AccessDenied')
+        self.assertEqual(len(self.store.aborted), 1)
+        self.assertEqual(self.store.uploads, {})
+        self.assertNotIn('key', self.store.objects)
+
+    @testing.gen_test
+    def test_too_many_parts_is_aborted(self):
+        async def chunks():
+            for _offset in range(4):
+                yield os.urandom(self.PART_SIZE)
+
+        with mock.patch.object(s3.MultipartUploader, 'MAX_PARTS', 3):
+            with self.assertRaises(ValueError):
+                yield self.uploader().upload('bucket', 'key', chunks())
+        self.assertEqual(len(self.store.aborted), 1)
+
+    def test_part_size_for_known_sizes(self):
+        uploader = self.uploader()
+        with mock.patch.object(s3.MultipartUploader, 'MAX_PARTS', 4):
+            self.assertEqual(uploader._part_size_for(
+                b'\0' * self.PART_SIZE * 8), self.PART_SIZE * 2)
+            self.assertEqual(uploader._part_size_for(b'\0' * 10),
+                             self.PART_SIZE)
+            handle = io.BytesIO()
+            self.assertEqual(uploader._part_size_for(handle), self.PART_SIZE)
+
+    def test_minimum_part_size(self):
+        with self.assertRaises(ValueError):
+            s3.MultipartUploader(self.client, part_size=self.PART_SIZE - 1)
+        with self.assertRaises(ValueError):
+            s3.MultipartUploader(self.client, concurrency=0)
+
+
+class RangedDownloaderTestCase(S3TestCase):
+
+    def setUp(self):
+        super(RangedDownloaderTestCase, self).setUp()
+        self.body = os.urandom(self.PART_SIZE * 3 + 500)
+        self.store.objects['path/to key'] = self.body, '"etag"'
+
+    def downloader(self, **kwargs):
+        kwargs.setdefault('part_size', self.PART_SIZE)
+        return s3.RangedDownloader(self.client, **kwargs)
+
+    @testing.gen_test
+    def test_download_to_buffer(self):
+        target = bytearray(len(self.body) + 10)
+        size = yield self.downloader().download(
+            'bucket', 'path/to key', target)
+        self.assertEqual(size, len(self.body))
+        self.assertEqual(target[:size], self.body)
+
+    @testing.gen_test
+    def test_download_to_file(self):
+        with tempfile.TemporaryFile() as handle:
+            handle.write(b'prefix' * 1000)
+            handle.seek(6)
+            yield self.downloader().download('bucket', 'path/to key', handle)
+            self.assertEqual(handle.tell(), 6 + len(self.body))
+            handle.seek(0)
+            self.assertEqual(handle.read(), b'prefix' + self.body)
+
+    @testing.gen_test
+    def test_download_to_file_object(self):
+        handle = io.BytesIO(b'prefix' * 1000)
+        handle.seek(6)
+        yield self.downloader().download('bucket', 'path/to key', handle)
+        self.assertEqual(handle.getvalue(), b'prefix' + self.body)
+
+    @testing.gen_test
+    def test_download_empty_object(self):
+        self.store.objects['empty'] = b'', '"empty"'
+        handle = io.BytesIO(b'existing')
+        size = yield self.downloader().download('bucket', 'empty', handle)
+        self.assertEqual(size, 0)
+        self.assertEqual(handle.getvalue(), b'')
+
+    @testing.gen_test
+    def test_concurrency_is_bounded(self):
+        self.store.objects['key'] = os.urandom(self.PART_SIZE * 12), '"a"'
+        target = bytearray(self.PART_SIZE * 12)
+        yield self.downloader(concurrency=3).download('bucket', 'key', target)
+        self.assertEqual(target, self.store.objects['key'][0])
+        self.assertEqual(self.store.max_in_flight, 3)
+
+    @testing.gen_test
+    def test_failed_part_is_retried(self):
+        self.store.get_failures = [(503, 'SlowDown')]
+        target = bytearray(len(self.body))
+        with mock.patch('tornado_aws.retry.RetryPolicy.backoff',
+                        return_value=0):
+            yield self.downloader().download('bucket', 'path/to key', target)
+        self.assertEqual(target, self.body)
+
+    @testing.gen_test
+    def test_failed_part_is_retried_by_client(self):
+        self.store.get_failures = [(503, 'SlowDown')] * 4
+        downloader = s3.RangedDownloader(
+            self.retrying_client(), part_size=self.PART_SIZE, concurrency=1)
+        with mock.patch('tornado_aws.retry.RetryPolicy.backoff',
+                        return_value=0):
+            with self.assertRaises(exceptions.AWSError):
+                yield downloader.download(
+                    'bucket', 'path/to key', bytearray(len(self.body)))
+        self.assertEqual(len(self.store.get_failures), 1)
+
+    @testing.gen_test
+    def test_short_part_is_retried(self):
+        self.store.short_reads = 1
+        target = bytearray(len(self.body))
+        downloader = s3.RangedDownloader(
+            self.retrying_client(), part_size=self.PART_SIZE)
+        with mock.patch('tornado_aws.retry.RetryPolicy.backoff',
+                        return_value=0):
+            yield downloader.download('bucket', 'path/to key', target)
+        self.assertEqual(target, self.body)
+        self.assertEqual(self.store.short_reads, 0)
+
+    @testing.gen_test
+    def test_changed_object_fails(self):
+        def replace():
+            self.store.objects['path/to key'] = b'changed', '"changed"'
+
+        self.store.on_get = replace
+        with self.assertRaises(exceptions.AWSError) as context:
+            yield self.downloader().download(
+                'bucket', 'path/to key', bytearray(len(self.body)))
+        self.assertEqual(context.exception.args[1]['type'],
+                         'PreconditionFailed')
+
+    @testing.gen_test
+    def test_changed_etag_fails(self):
+        self.store.ignore_if_match = True
+        self.store.on_get = lambda: self.store.objects.update(
+            {'path/to key': (self.body, '"changed"')})
+        with self.assertRaises(exceptions.AWSError) as context:
+            yield self.downloader().download(
+                'bucket', 'path/to key', bytearray(len(self.body)))
+        self.assertEqual(context.exception.args[1]['type'],
+                         'PreconditionFailed')
+
+    @testing.gen_test
+    def test_buffer_too_small(self):
+        with self.assertRaises(ValueError):
+            yield self.downloader().download(
+                'bucket', 'path/to key', bytearray(len(self.body) - 1))
+
+    @testing.gen_test
+    def test_read_only_buffer(self):
+        with self.assertRaises(ValueError):
+            yield self.downloader().download(
+                'bucket', 'path/to key', bytes(len(self.body)))
+
+
+class ListObjectsTestCase(S3TestCase):
+
+    def setUp(self):
+        super(ListObjectsTestCase, self).setUp()
+        for key in ['a', 'b/1', 'b/2', 'c d+e', 'c/1', 'e']:
+            self.store.objects[key] = key.encode('utf-8'), '"{}"'.format(key)
+
+    async def list_objects(self, *args, **kwargs):
+        return [entry async for entry in s3.list_objects(
+            self.client, 'bucket', *args, **kwargs)]
+
+    @testing.gen_test
+    def test_list_objects(self):
+        entries = yield self.list_objects()
+        self.assertEqual([entry['Key'] for entry in entries],
+                         sorted(self.store.objects))
+        self.assertEqual(entries[3], {
+            'Key': 'c d+e', 'LastModified': '2019-11-17T00:00:00.000Z',
+            'ETag': '"c d+e"', 'Size': 5, 'Owner': {'ID': 'owner'},
+            'StorageClass': 'STANDARD'})
+        self.assertEqual(len(self.store.list_requests), 1)
+        self.assertEqual(self.store.list_requests[0]['encoding-type'],
+                         [b'url'])
+
+    @testing.gen_test
+    def test_list_objects_pages(self):
+        entries = yield self.list_objects(max_keys=2)
+        self.assertEqual([entry['Key'] for entry in entries],
+                         sorted(self.store.objects))
+        self.assertEqual(len(self.store.list_requests), 3)
+        self.assertEqual(
+            self.store.list_requests[2]['continuation-token'], [b'c d+e'])
+
+    @testing.gen_test
+    def test_list_objects_prefix_and_delimiter(self):
+        entries = yield self.list_objects(delimiter='/', max_keys=3)
+        self.assertEqual(
+            [entry.get('Key', entry.get('Prefix')) for entry in entries],
+            ['a', 'b/', 'c d+e', 'c/', 'e'])
+        self.assertEqual(entries[1], {'Prefix': 'b/'})
+        entries = yield self.list_objects(prefix='b/', start_after='b/1')
+        self.assertEqual([entry['Key'] for entry in entries], ['b/2'])
+
+    @testing.gen_test
+    def test_objects_are_yielded_as_parsed(self):
+        self.store.list_event = locks.Event()
+        listing = s3.list_objects(self.client, 'bucket')
+        entry = yield listing.__anext__()
+        self.assertEqual(entry['Key'], 'a')
+        self.store.list_event.set()
+        entry = yield listing.__anext__()
+        self.assertEqual(entry['Key'], 'b/1')
+        yield listing.aclose()
+
+    @testing.gen_test
+    def test_next_page_is_prefetched(self):
+        self.store.list_event = locks.Event()
+        listing = s3.list_objects(self.client, 'bucket', max_keys=3)
+        entry = yield listing.__anext__()
+        self.assertEqual(entry['Key'], 'a')
+        # The second page is requested while the first is being read
+        while len(self.store.list_requests) < 2:
+            yield gen.sleep(0.01)
+        self.store.list_event.set()
+        for _entry in range(5):
+            entry = yield listing.__anext__()
+        self.assertEqual(entry['Key'], 'e')
+        with self.assertRaises(StopAsyncIteration):
+            yield listing.__anext__()
+        self.assertEqual(len(self.store.list_requests), 2)
+
+    @testing.gen_test
+    def test_close_listing(self):
+        listing = s3.list_objects(self.client, 'bucket', max_keys=1)
+        entry = yield listing.__anext__()
+        self.assertEqual(entry['Key'], 'a')
+        yield listing.aclose()
+        self.assertEqual(len(self.store.list_requests), 2)
+
+    @testing.gen_test
+    def test_missing_bucket(self):
+        with self.assertRaises(exceptions.AWSError) as context:
+            yield s3.list_objects(self.client, 'missing').__anext__()
+        self.assertEqual(context.exception.args[1]['type'], 'NoSuchBucket')
+
+
+class HelpersTestCase(unittest.TestCase):
+
+    def test_complete_body(self):
+        self.assertEqual(
+            s3._complete_body([(1, '"a"'), (2, '"b&c"')]),
+            b'<CompleteMultipartUpload><Part><PartNumber>1</PartNumber>'
+            b'<ETag>"a"</ETag></Part><Part><PartNumber>2</PartNumber>'
+            b'<ETag>"b&amp;c"</ETag></Part></CompleteMultipartUpload>')
+
+    def test_find_text(self):
+        self.assertEqual(s3._find_text(
+            '<R xmlns="{}"><UploadId>abc</UploadId></R>'.format(NAMESPACE),
+            'UploadId'), 'abc')
+        with self.assertRaises(ValueError):
+            s3._find_text(b'<R/>', 'UploadId')
+        with self.assertRaises(ValueError):
+            s3._find_text(b'not xml', 'UploadId')
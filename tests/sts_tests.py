@@ -0,0 +1,187 @@
+import datetime
+import os
+import tempfile
+import unittest
+from unittest import mock
+import uuid
+
+from tornado import concurrent, httpclient, testing, web
+
+from tornado_aws import client, config, sts
+from . import utils
+
+RESPONSE = """\
+<{action}Response xmlns="https://sts.amazonaws.com/doc/2011-06-15/">
+  <{action}Result>
+    <Credentials>
+      <AccessKeyId>{access_key}</AccessKeyId>
+      <SecretAccessKey>{secret_key}</SecretAccessKey>
+      <SessionToken>{token}</SessionToken>
+      <Expiration>{expiration}</Expiration>
+    </Credentials>
+    <AssumedRoleUser>
+      <Arn>{role_arn}/{session_name}</Arn>
+    </AssumedRoleUser>
+  </{action}Result>
+  <ResponseMetadata>
+    <RequestId>c6104cbe-af31-11e0-8154-cbc7ccf896c7</RequestId>
+  </ResponseMetadata>
+</{action}Response>"""
+
+
+class STSRequestHandler(web.RequestHandler):
+
+    def get(self):
+        action = self.get_argument('Action')
+        if action == 'AssumeRole':
+            if not self.request.headers.get(
+                    'Authorization', '').startswith('AWS4-HMAC-SHA256'):
+                raise web.HTTPError(403)
+        elif action == 'AssumeRoleWithWebIdentity':
+            if self.get_argument('WebIdentityToken') != 'web-identity-token':
+                raise web.HTTPError(400)
+        else:
+            raise web.HTTPError(400)
+        expiration = datetime.datetime.now(datetime.timezone.utc) + \
+            datetime.timedelta(
+                seconds=int(self.get_argument('DurationSeconds')))
+        self.set_header('Content-Type', 'text/xml')
+        self.write(RESPONSE.format(
+            action=action,
+            access_key=self.get_argument('RoleSessionName'),
+            secret_key=uuid.uuid4().hex, token=uuid.uuid4().hex,
+            expiration=expiration.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            role_arn=self.get_argument('RoleArn'),
+            session_name=self.get_argument('RoleSessionName')))
+
+
+class STSTestCase(utils.AsyncHTTPTestCase):
+
+    ROLE_ARN = 'arn:aws:iam::123456789012:role/example'
+
+    def setUp(self):
+        super(STSTestCase, self).setUp()
+        utils.clear_environment()
+        self.session_name = uuid.uuid4().hex
+        self.token_file = tempfile.NamedTemporaryFile('w')
+        self.token_file.write('web-identity-token\n')
+        self.token_file.flush()
+
+    def tearDown(self):
+        self.token_file.close()
+        utils.clear_environment()
+        super(STSTestCase, self).tearDown()
+
+    def get_app(self):
+        return web.Application([(r'/', STSRequestHandler)])
+
+    def source(self, client_class=client.AsyncAWSClient):
+        return client_class(
+            'sts', region='us-east-1', access_key=uuid.uuid4().hex,
+            secret_key=uuid.uuid4().hex, endpoint=self.get_url(''))
+
+    def web_identity_provider(self, asynchronous=True):
+        return sts.WebIdentityProvider(
+            self.ROLE_ARN, self.token_file.name, self.session_name,
+            endpoint=self.get_url(''), asynchronous=asynchronous)
+
+    @testing.gen_test
+    def test_assume_role(self):
+        provider = sts.AssumeRoleProvider(
+            self.ROLE_ARN, self.session_name, source=self.source())
+        self.assertTrue(provider.is_async)
+        credentials = yield provider.fetch_credentials()
+        self.assertEqual(credentials['AccessKeyId'], self.session_name)
+        self.assertIsNotNone(credentials['SecretAccessKey'])
+        self.assertIsNotNone(credentials['Token'])
+        self.assertIsNotNone(config._parse_expiration(
+            credentials['Expiration']))
+
+    def test_assume_role_query_args(self):
+        provider = sts.AssumeRoleProvider(
+            self.ROLE_ARN, self.session_name, duration=900,
+            external_id='external', source=self.source())
+        self.assertEqual(provider._query_args(), {
+            'Action': 'AssumeRole',
+            'DurationSeconds': '900',
+            'ExternalId': 'external',
+            'RoleArn': self.ROLE_ARN,
+            'RoleSessionName': self.session_name,
+            'Version': sts.STS_VERSION})
+
+    @testing.gen_test
+    def test_authorization_with_provider(self):
+        os.environ['AWS_ACCESS_KEY_ID'] = uuid.uuid4().hex
+        os.environ['AWS_SECRET_ACCESS_KEY'] = uuid.uuid4().hex
+        credentials = config.Authorization(
+            'default', provider=sts.AssumeRoleProvider(
+                self.ROLE_ARN, self.session_name, source=self.source()))
+        self.assertTrue(credentials.is_async)
+        self.assertTrue(credentials.needs_credentials())
+        obj = client.AsyncAWSClient(
+            'dynamodb', region='us-east-1', credentials=credentials)
+        self.assertIs(obj._auth_config, credentials)
+        yield credentials.refresh()
+        self.assertEqual(credentials.access_key, self.session_name)
+        self.assertFalse(credentials.needs_credentials())
+        self.assertIsNotNone(credentials._refresh_timeout)
+        credentials.reset()
+
+    @testing.gen_test
+    def test_web_identity(self):
+        provider = self.web_identity_provider()
+        credentials = yield provider.fetch_credentials()
+        self.assertEqual(credentials['AccessKeyId'], self.session_name)
+
+    @testing.gen_test
+    def test_web_identity_rejected(self):
+        self.token_file.seek(0)
+        self.token_file.write('invalid-token-value\n')
+        self.token_file.flush()
+        credentials = config.Authorization(
+            'default', provider=self.web_identity_provider())
+        with self.assertRaises(httpclient.HTTPError):
+            yield credentials.refresh()
+
+    def test_web_identity_from_environment(self):
+        os.environ['AWS_ROLE_ARN'] = self.ROLE_ARN
+        os.environ['AWS_WEB_IDENTITY_TOKEN_FILE'] = self.token_file.name
+        os.environ['AWS_ROLE_SESSION_NAME'] = self.session_name
+        provider = sts.WebIdentityProvider(region='us-west-2')
+        self.assertEqual(provider._endpoint,
+                         'https://sts.us-west-2.amazonaws.com')
+        self.assertIn('RoleSessionName={}'.format(self.session_name),
+                      provider._url())
+        self.assertIn('WebIdentityToken=web-identity-token', provider._url())
+
+    def test_web_identity_requires_role_and_token(self):
+        with self.assertRaises(ValueError):
+            sts.WebIdentityProvider(region='us-west-2')
+
+    @concurrent.run_on_executor
+    def sync_refresh(self):
+        credentials = config.Authorization(
+            'default', provider=self.web_identity_provider(False))
+        credentials.refresh()
+        return credentials
+
+    @testing.gen_test
+    def test_sync_web_identity(self):
+        credentials = yield self.sync_refresh()
+        self.assertFalse(credentials.is_async)
+        self.assertEqual(credentials.access_key, self.session_name)
+
+
+class ParseCredentialsTestCase(unittest.TestCase):
+
+    def test_missing_credentials(self):
+        with self.assertRaises(ValueError):
+            sts._parse_credentials(
+                b'<AssumeRoleResponse><AssumeRoleResult/>'
+                b'</AssumeRoleResponse>', 'AssumeRole')
+
+    def test_session_name(self):
+        self.assertEqual(sts._session_name('example'), 'example')
+        with mock.patch.dict(os.environ, {'AWS_ROLE_SESSION_NAME': 'env'}):
+            self.assertEqual(sts._session_name(None), 'env')
+        self.assertTrue(sts._session_name(None).startswith('tornado-aws-'))
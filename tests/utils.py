@@ -28,6 +28,13 @@ def clear_environment():
     os.environ.pop('AWS_DEFAULT_PROFILE', None)
     os.environ.pop('AWS_ACCESS_KEY_ID', None)
     os.environ.pop('AWS_SECRET_ACCESS_KEY', None)
+    os.environ.pop('AWS_CONTAINER_CREDENTIALS_RELATIVE_URI', None)
+    os.environ.pop('AWS_CONTAINER_CREDENTIALS_FULL_URI', None)
+    os.environ.pop('AWS_CONTAINER_AUTHORIZATION_TOKEN', None)
+    os.environ.pop('AWS_CONTAINER_AUTHORIZATION_TOKEN_FILE', None)
+    os.environ.pop('AWS_ROLE_ARN', None)
+    os.environ.pop('AWS_ROLE_SESSION_NAME', None)
+    os.environ.pop('AWS_WEB_IDENTITY_TOKEN_FILE', None)
 
 
 class RequestHandler(web.RequestHandler):
@@ -48,11 +55,34 @@ class RequestHandler(web.RequestHandler):
                     self.get_argument('secret_key', uuid.uuid4().hex),
                 'Expiration': datetime.datetime.now().isoformat(),
                 'Token': self.get_argument('token', uuid.uuid4().hex)})
+        elif args[0].startswith('v2/credentials/'):
+            authorization = self.get_argument('authorization', None)
+            if authorization and \
+                    self.request.headers.get('Authorization') != authorization:
+                raise web.HTTPError(401, 'Unauthorized')
+            expiration = datetime.datetime.now(datetime.timezone.utc) + \
+                datetime.timedelta(hours=1)
+            self.write({
+                'AccessKeyId':
+                    self.get_argument('access_key', uuid.uuid4().hex),
+                'SecretAccessKey': uuid.uuid4().hex,
+                'Expiration': expiration.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'Token': uuid.uuid4().hex})
         elif args[0].startswith('api'):
             self.write({'result': self.get_argument('expectation', True)})
         else:
             raise web.HTTPError(400, 'Invalid Path')
 
+    def put(self, *args, **kwargs):
+        if args[0] == 'latest/api/token':
+            self.write('token-{}'.format(
+                self.request.headers['X-aws-ec2-metadata-token-ttl-seconds']))
+        elif args[0].startswith('api'):
+            self.write({'headers': dict(self.request.headers),
+                        'body': self.request.body.decode('latin-1')})
+        else:
+            raise web.HTTPError(400, 'Invalid Path')
+
 
 class AsyncHTTPTestCase(testing.AsyncHTTPTestCase):
 
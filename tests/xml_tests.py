@@ -1,6 +1,38 @@
+import collections
+import json
+import timeit
 import unittest
+from xml.etree import ElementTree
 
 from tornado_aws import txml
+from . import xml_corpus
+
+
+def reference_loads(content):
+    """The recursive converter that txml.loads used before it was
+    optimized, which its output is compared with."""
+    def xml_to_dict(t):
+        d = {t.tag: {} if t.attrib else None}
+        children = list(t)
+        if children:
+            dd = collections.defaultdict(list)
+            for dc in map(xml_to_dict, children):
+                for k, v in dc.items():
+                    dd[k].append(v)
+            d = {t.tag: {k: v[0] if len(v) == 1 else v
+                         for k, v in dd.items()}}
+        if t.attrib:
+            d[t.tag].update(('@' + k, v) for k, v in t.attrib.items())
+        if t.text:
+            text = t.text.strip()
+            if children or t.attrib:
+                if text:
+                    d[t.tag]['#text'] = text
+            else:
+                d[t.tag] = text
+        return dict(d)
+
+    return xml_to_dict(ElementTree.XML(content))
 
 
 class TestCase(unittest.TestCase):
@@ -27,6 +59,74 @@ class TestCase(unittest.TestCase):
         <test><foo>bar</foo><baz val="1">gorge<qux>corgie</qux></baz></test>"""
         self.assertDictEqual(txml.loads(value), expectation)
 
+    def test_indented_xml(self):
+        expectation = {'test': {'foo': 'bar', 'baz': {'qux': 'corgie'}}}
+        value = """<?xml version="1.0" encoding="UTF-8"?>
+        <test>
+          <foo>bar</foo>
+          <baz>
+            <qux>corgie</qux>
+          </baz>
+        </test>"""
+        self.assertDictEqual(txml.loads(value), expectation)
+
     def test_invalid_xml(self):
         with self.assertRaises(ValueError):
             txml.loads('foo')
+
+
+class ParsersTestCase(unittest.TestCase):
+
+    def assertSameDocument(self, content):
+        expectation = json.dumps(reference_loads(content))
+        for parser in txml.PARSERS:
+            with self.subTest(parser=parser):
+                # Compare the JSON to also compare the order of the keys
+                self.assertEqual(
+                    json.dumps(txml.loads(content, parser)), expectation)
+
+    def test_corpus(self):
+        for name, content in xml_corpus.DOCUMENTS.items():
+            with self.subTest(document=name):
+                self.assertSameDocument(content)
+
+    def test_bytes(self):
+        self.assertSameDocument(
+            xml_corpus.DOCUMENTS['s3-error'].encode('utf-8'))
+
+    def test_attributes(self):
+        self.assertSameDocument(
+            '<a xmlns:x="urn:x" x:y="1" z="2"><b c="3"/><b c="4">d</b>'
+            '<b>e</b></a>')
+
+    def test_text(self):
+        self.assertSameDocument(
+            '<a>text <b> </b><c/><d><![CDATA[<cdata>]]> &amp; more</d>'
+            'tail<e>\n  <f>g</f>\n</e></a>')
+
+    def test_leaf_root(self):
+        self.assertSameDocument('<a>value</a>')
+        self.assertSameDocument('<a/>')
+
+    def test_comments_and_processing_instructions(self):
+        self.assertSameDocument(
+            '<?xml version="1.0"?><!-- comment --><a><!-- comment -->'
+            '<?pi value?><b>c</b></a>')
+
+    def test_invalid_xml(self):
+        for parser in txml.PARSERS:
+            for content in ['foo', '<a>', '<a></b>', '<a/><b/>',
+                            '<x:a>b</x:a>']:
+                with self.subTest(parser=parser, content=content):
+                    with self.assertRaises(ValueError):
+                        txml.loads(content, parser)
+
+    def test_faster_than_recursive_converter(self):
+        for name in ['ec2-describe-instances', 's3-list-objects-v2']:
+            content = xml_corpus.DOCUMENTS[name]
+            with self.subTest(document=name):
+                self.assertLess(
+                    min(timeit.repeat(lambda: txml.loads(content),
+                                      number=3, repeat=3)),
+                    min(timeit.repeat(lambda: reference_loads(content),
+                                      number=3, repeat=3)))
@@ -3,7 +3,10 @@ Low-level AWS client for Tornado
 
 """
 from tornado_aws.client import AsyncAWSClient, AWSClient, exceptions
+from tornado_aws.retry import AdaptiveRateLimiter, RetryPolicy
+from tornado_aws.signer import Signer
 
 __version__ = '2.0.0'
 
-__all__ = ['AWSClient', 'AsyncAWSClient', 'exceptions']
+__all__ = ['AdaptiveRateLimiter', 'AWSClient', 'AsyncAWSClient',
+           'RetryPolicy', 'Signer', 'exceptions']
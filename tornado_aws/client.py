@@ -5,22 +5,28 @@ requests to the AWS APIs and are generally meant to be used by service specific
 client API implementations.
 
 """
-import datetime
+import base64
+import collections
 import hashlib
-import hmac
+import io
 import json
 import logging
+import mmap
 import os
 import socket
+import sys
+import time
 from urllib import parse
+import zlib
 
-from tornado import concurrent, httpclient, ioloop
+from tornado import (concurrent, gen, httpclient, httputil, ioloop, queues,
+                     simple_httpclient)
 try:
     from tornado import curl_httpclient
 except ImportError:  # pragma: nocover
     curl_httpclient = None
 
-from tornado_aws import config, exceptions, txml
+from tornado_aws import config, exceptions, retry, signer, txml
 
 LOGGER = logging.getLogger(__name__)
 
@@ -32,6 +38,8 @@ _AWZ_CONTENT_TYPES = [
     'application/x-amz-json-1.1'
 ]
 
+_CHECKSUMS = {None, 'crc32', 'md5'}
+
 _REFRESH_EXCEPTIONS = [
     'AuthFailure',
     'AuthMissingFailure',
@@ -52,9 +60,6 @@ _REFRESH_XML_EXCEPTIONS = [
 ]
 
 
-_HEADER_FORMAT = '{0} Credential={1}/{2}, SignedHeaders={3}, Signature={4}'
-
-
 class AWSClient(object):
     """Implement a low level AWS client that performs the request signing
     required for AWS API requests.
@@ -97,13 +102,45 @@ class AWSClient(object):
     ``AWS_SECRET_ACCESS_KEY`` environment variable.
 
     If there is no local configuration or credentials, the client will attempt
-    to load the information from the EC2 instance meta-data API, if it is
-    available.
+    to load the information from the ECS or EKS container credentials
+    endpoint if the ``AWS_CONTAINER_CREDENTIALS_RELATIVE_URI`` or
+    ``AWS_CONTAINER_CREDENTIALS_FULL_URI`` environment variables are set,
+    sending the token from ``AWS_CONTAINER_AUTHORIZATION_TOKEN_FILE`` or
+    ``AWS_CONTAINER_AUTHORIZATION_TOKEN``, and otherwise from the EC2 instance
+    meta-data API, if it is available.
 
     The ``endpoint`` argument is primarily used for testing and allows for
     the use of a specified base URL value instead of the auto-construction of
     a URL using the service and region variables.
 
+    When ``unsigned_payload`` is ``True``, requests are sent with the
+    ``X-Amz-Content-sha256`` header set to ``UNSIGNED-PAYLOAD`` and the body
+    is not hashed, relying on TLS for the integrity of the body. This saves
+    the CPU cost of hashing large request bodies, but is only supported by
+    some services, such as S3. It can also be set for individual requests
+    when calling :py:meth:`fetch`.
+
+    The ``checksum`` argument adds a checksum of the request body to each
+    request, either ``md5`` for the ``Content-MD5`` header or ``crc32`` for
+    the ``X-Amz-Checksum-Crc32`` header.
+
+    By default, only requests that failed due to expired or invalid
+    credentials are retried. Passing a
+    :py:class:`~tornado_aws.retry.RetryPolicy` as ``retry_policy`` also
+    retries requests that were throttled or failed with a transient error,
+    waiting between attempts. Requests with a streaming body are not retried.
+
+    Passing a :py:class:`~tornado_aws.retry.AdaptiveRateLimiter` as
+    ``rate_limiter`` limits the rate that requests are sent at once they
+    start being throttled.
+
+    The ``credentials`` argument allows clients to share credentials, such
+    as the :py:class:`~tornado_aws.config.Authorization` returned by
+    :py:func:`tornado_aws.config.shared_authorization`, so that clients for
+    multiple services load and refresh them once. When it is passed, the
+    ``profile``, ``access_key``, ``secret_key`` and ``security_token``
+    arguments are not used to load credentials.
+
     :param str service: The service for the API calls
     :param str profile: Optionally specify the configuration profile name
     :param str region: An optional AWS region to make requests to
@@ -111,32 +148,86 @@ class AWSClient(object):
     :param str secret_key: An optional secret access key
     :param str security_token: An optional security token
     :param str endpoint: Override the base endpoint URL
+    :param bool unsigned_payload: Do not include the request body in the
+        request signature
+    :param str checksum: Add a ``md5`` or ``crc32`` checksum of the body
+    :param retry_policy: Retry throttled and transiently failed requests
+    :type retry_policy: tornado_aws.retry.RetryPolicy
+    :param rate_limiter: Limit the request rate when throttled
+    :type rate_limiter: tornado_aws.retry.AdaptiveRateLimiter
+    :param credentials: Use shared credentials instead of loading them
+    :type credentials: tornado_aws.config.Authorization
     :raises: :exc:`tornado_aws.exceptions.ConfigNotFound`
     :raises: :exc:`tornado_aws.exceptions.ConfigParserError`
     :raises: :exc:`tornado_aws.exceptions.NoCredentialsError`
     :raises: :exc:`tornado_aws.exceptions.NoProfileError`
 
     """
-    ALGORITHM = 'AWS4-HMAC-SHA256'
+    ALGORITHM = signer.ALGORITHM
     ASYNC = False
     CONNECT_TIMEOUT = 10
+    PRESIGN_CACHE_SIZE = 1024
+    PRESIGN_EXPIRY_MARGIN = 60
     REQUEST_TIMEOUT = 30
     SCHEME = 'https'
+    STREAMING_CHUNK_SIZE = 65536
+    STREAMING_REQUEST_TIMEOUT = 3600
 
     def __init__(self, service, profile=None, region=None, access_key=None,
-                 secret_key=None, security_token=None, endpoint=None):
+                 secret_key=None, security_token=None, endpoint=None,
+                 unsigned_payload=False, checksum=None, retry_policy=None,
+                 rate_limiter=None, credentials=None):
+        if checksum not in _CHECKSUMS:
+            raise ValueError('Unsupported checksum: {}'.format(checksum))
+        self._checksum = checksum
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
         self._client = self._get_client_adapter()
         self._service = service
+        self._unsigned_payload = unsigned_payload
         self._profile = profile or os.getenv('AWS_DEFAULT_PROFILE', 'default')
-        self._region = region or config.get_region(self._profile)
-        self._auth_config = config.Authorization(
-            self._profile, access_key, secret_key,
-            security_token, self._client)
-        self._endpoint_url = self._endpoint(endpoint)
-        self._host = self._hostname(self._endpoint_url)
+        self._region = region or self._default_region()
+        self._owns_credentials = credentials is None
+        if credentials is None:
+            credentials = config.Authorization(
+                self._profile, access_key, secret_key,
+                security_token, self._client)
+        elif credentials.is_async != self.ASYNC:
+            raise ValueError('credentials must be {}synchronous'.format(
+                'a' if self.ASYNC else ''))
+        self._auth_config = credentials
+        self._endpoint_url = endpoint
+        self._host = None
+        self._signer = None
+        if self._region:
+            self._configure_region(self._region)
+        self._presigned = collections.OrderedDict()
+
+    @property
+    def retry_policy(self):
+        """Return the :py:class:`~tornado_aws.retry.RetryPolicy` that failed
+        requests are retried with, or ``None`` if only requests that failed
+        due to expired or invalid credentials are retried.
+
+        :rtype: tornado_aws.retry.RetryPolicy or None
+
+        """
+        return self._retry_policy
+
+    @property
+    def signer(self):
+        """Return the :py:class:`~tornado_aws.signer.Signer` used to sign
+        requests, allowing service specific implementations to sign requests
+        without using :py:meth:`fetch`. ``None`` is returned until the
+        region of a client created with ``lazy_region`` is resolved.
+
+        :rtype: tornado_aws.signer.Signer or None
+
+        """
+        return self._signer
 
     def fetch(self, method, path='/', query_args=None, headers=None, body=b'',
-              recursed=False):
+              recursed=False, unsigned_payload=None):
         """Executes a request, returning an
         :py:class:`HTTPResponse <tornado.httpclient.HTTPResponse>`.
 
@@ -148,38 +239,161 @@ class AWSClient(object):
         :param str path: The request path
         :param dict query_args: Request query arguments
         :param dict headers: Request headers
-        :param bytes body: The request body
+        :param body: The request body
+        :type body: bytes or bytes-like object or file or async iterator or
+            callable
         :param bool recursed: Internally invoked if it's a recursive fetch
+        :param bool unsigned_payload: Override the client setting for
+            excluding the body from the request signature
         :rtype: :class:`~tornado.httpclient.HTTPResponse`
         :raises: :class:`~tornado.httpclient.HTTPError`
         :raises: :class:`~tornado_aws.exceptions.NoCredentialsError`
         :raises: :class:`~tornado_aws.exceptions.AWSError`
+        :raises: :class:`~tornado_aws.exceptions.StreamingBodyError`
 
         """
         if self._auth_config.needs_credentials():
             self._auth_config.refresh()
 
-        request = self._create_request(method, path, query_args, headers, body)
-
-        try:
-            result = self._client.fetch(request, raise_error=True)
-            return result
-        except (OSError, socket.error) as error:
-            LOGGER.error('Error making request: %s', error)
-            raise exceptions.RequestException(error=error)
-        except httpclient.HTTPError as error:
-            need_credentials, aws_error = self._process_error(error)
-            if need_credentials and not self._auth_config.local_credentials:
-                self._auth_config.reset()
-                if not recursed:
-                    return self.fetch(method, path, query_args,
-                                      headers, body, True)
-            raise aws_error if aws_error else error
+        attempt = 1
+        while True:
+            # Wait before signing so the signature is not stale when sent
+            delay = self._rate_limit_delay()
+            if delay:
+                time.sleep(delay)
+            request = self._create_request(
+                method, path, query_args, headers, body, unsigned_payload)
+            try:
+                result = self._client.fetch(request, raise_error=True)
+            except (OSError, socket.error) as error:
+                LOGGER.error('Error making request: %s', error)
+                delay = self._retry_delay(
+                    attempt, body, retry.CONNECTION_ERROR)
+                if delay is None:
+                    raise exceptions.RequestException(error=error)
+            except httpclient.HTTPError as error:
+                need_credentials, aws_error = self._process_error(error)
+                self._update_rate_limiter(error.code, aws_error)
+                if need_credentials and \
+                        not self._auth_config.local_credentials:
+                    self._auth_config.reset()
+                    if not recursed and not self._is_stream(body):
+                        return self.fetch(method, path, query_args, headers,
+                                          body, True, unsigned_payload)
+                delay = self._retry_delay(
+                    attempt, body, error.code, aws_error)
+                if delay is None:
+                    raise aws_error if aws_error else error
+            else:
+                self._update_rate_limiter(result.code)
+                self._retry_succeeded(attempt)
+                return result
+            LOGGER.info('Retrying request in %.2f seconds', delay)
+            time.sleep(delay)
+            attempt += 1
 
     def close(self):
-        """Closes the underlying HTTP client, freeing any resources used."""
+        """Closes the underlying HTTP client, freeing any resources used.
+        Credentials that were created by the client stop being refreshed in
+        the background, shared credentials are not affected.
+
+        """
+        if self._owns_credentials:
+            self._auth_config.close()
         self._client.close()
 
+    def fetch_file(self, method, path, file_path, query_args=None,
+                   headers=None, unsigned_payload=None):
+        """Executes a request that uploads the file at ``file_path`` as the
+        request body, returning an
+        :py:class:`HTTPResponse <tornado.httpclient.HTTPResponse>`. The file
+        is memory-mapped, so it is neither read into memory nor copied.
+
+        :param str method: HTTP request method
+        :param str path: The request path
+        :param str file_path: The path of the file to upload
+        :param dict query_args: Request query arguments
+        :param dict headers: Request headers
+        :param bool unsigned_payload: Override the client setting for
+            excluding the body from the request signature
+        :rtype: :class:`~tornado.httpclient.HTTPResponse`
+        :raises: :class:`~tornado.httpclient.HTTPError`
+        :raises: :class:`~tornado_aws.exceptions.NoCredentialsError`
+        :raises: :class:`~tornado_aws.exceptions.AWSError`
+
+        """
+        with open(file_path, 'rb') as handle:
+            if not os.fstat(handle.fileno()).st_size:
+                return self.fetch(method, path, query_args, headers, b'',
+                                  unsigned_payload=unsigned_payload)
+            body = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return self.fetch(method, path, query_args, headers, body,
+                                  unsigned_payload=unsigned_payload)
+            finally:
+                self._close_mmap(body)
+
+    def presign(self, method, path='/', query_args=None, expires_in=3600,
+                cache=False):
+        """Return a presigned URL that allows the holder to perform the
+        request without AWS credentials until it expires, for example to
+        redirect a client to download an object directly from S3.
+
+        When ``cache`` is ``True``, the same URL is returned for the same
+        request until it is within ``PRESIGN_EXPIRY_MARGIN`` seconds (or half
+        of ``expires_in`` if that is shorter) of expiring.
+
+        Presigning does not perform any I/O. The synchronous client will
+        load credentials if needed, the asynchronous client requires that
+        credentials and its region have already been loaded.
+
+        :param str method: HTTP request method
+        :param str path: The request path
+        :param dict query_args: Request query arguments
+        :param int expires_in: The number of seconds the URL is valid for
+        :param bool cache: Reuse previously presigned URLs
+        :rtype: str
+        :raises: :class:`~tornado_aws.exceptions.NoCredentialsError`
+        :raises: :class:`~tornado_aws.exceptions.RegionNotResolvedError`
+
+        """
+        if self._signer is None:
+            raise exceptions.RegionNotResolvedError()
+        if self._auth_config.needs_credentials():
+            if self.ASYNC:
+                raise exceptions.NoCredentialsError()
+            self._auth_config.refresh()
+
+        query_args = query_args or {}
+        if not cache:
+            return self._presign(method, path, query_args, expires_in)
+
+        now = time.time()
+        key = (self._auth_config.access_key, method, path,
+               tuple(sorted(query_args.items())), expires_in)
+        cached = self._presigned.get(key)
+        if cached and cached[1] > now:
+            return cached[0]
+        url = self._presign(method, path, query_args, expires_in)
+        margin = min(self.PRESIGN_EXPIRY_MARGIN, expires_in / 2)
+        self._presigned[key] = url, now + expires_in - margin
+        self._presigned.move_to_end(key)
+        while len(self._presigned) > self.PRESIGN_CACHE_SIZE:
+            self._presigned.popitem(last=False)
+        return url
+
+    def xml_error(self, content):
+        """Return the :py:class:`~tornado_aws.exceptions.AWSError` for an XML
+        error document, such as the errors that S3 returns in the body of a
+        successful response when completing a multipart upload.
+
+        :param bytes content: The XML error document
+        :rtype: tornado_aws.exceptions.AWSError
+        :raises: ValueError
+
+        """
+        return self._aws_error_from_xml(self._parse_xml_error(content))
+
     def _process_error(self, error):
         """Attempt to process the error coming from AWS. Returns ``True``
         if the client should attempt to fetch credentials and the AWSError
@@ -209,6 +423,56 @@ class AWSClient(object):
                 xml_error['Code'] in _REFRESH_XML_EXCEPTIONS),
                 self._aws_error_from_xml(xml_error))
 
+    def _retry_delay(self, attempt, body, status_code, aws_error=None):
+        """Returns the number of seconds to wait before retrying a request
+        that failed, or ``None`` if it should not be retried. Requests with
+        a streaming body can not be retried.
+
+        :param int attempt: The attempt that failed, starting at 1
+        :param body: The request body
+        :param int status_code: The HTTP status code of the response
+        :param tornado_aws.exceptions.AWSError aws_error: The parsed error
+        :rtype: float or None
+
+        """
+        if self._retry_policy is None or self._is_stream(body):
+            return None
+        return self._retry_policy.retry_delay(
+            attempt, status_code, self._error_type(aws_error))
+
+    def _retry_succeeded(self, attempt):
+        """Return tokens to the retry budget after a successful request.
+
+        :param int attempt: The attempt that succeeded, starting at 1
+
+        """
+        if self._retry_policy is not None:
+            self._retry_policy.succeeded(attempt > 1)
+
+    def _rate_limit_delay(self):
+        """Returns the number of seconds to wait before sending a request
+        when using a rate limiter.
+
+        :rtype: float
+
+        """
+        if self._rate_limiter is None:
+            return 0
+        return self._rate_limiter.delay()
+
+    def _update_rate_limiter(self, status_code, aws_error=None):
+        """Update the rate limiter with the result of a request. Connection
+        errors and timeouts do not update the rate limiter.
+
+        :param int status_code: The HTTP status code of the response
+        :param tornado_aws.exceptions.AWSError aws_error: The parsed error
+
+        """
+        if self._rate_limiter is not None and \
+                status_code != retry.CONNECTION_ERROR:
+            self._rate_limiter.update(retry.is_throttling_error(
+                self._error_type(aws_error), status_code))
+
     @staticmethod
     def _aws_error_from_xml(error):
         """Return an AWSError exception for an XML error response, given the
@@ -273,24 +537,8 @@ class AWSClient(object):
             return {'Code': key, 'Message': payload[key]['Message']}
         raise ValueError
 
-    def _auth_header(self, amz_date, date_stamp, request_hash, signed_headers):
-        """Return the Authorization string header value
-
-        :param str amz_date: The x-amz-date header value
-        :param str date_stamp: The signing date_stamp
-        :param str request_hash: The SHA-256 request hash
-        :param str signed_headers: A semicolon delimited list of header keys
-        :rtype: str
-
-        """
-        scope, signature = self._signature(amz_date, date_stamp, request_hash)
-        return _HEADER_FORMAT.format(self.ALGORITHM,
-                                     self._auth_config.access_key,
-                                     scope,
-                                     signed_headers, signature)
-
     def _create_request(self, method, path='/', query_args=None, headers=None,
-                        body=b''):
+                        body=b'', unsigned_payload=None, digests=None):
         """Create the HTTPRequest instance that will be used to make the AWS
         API request.
 
@@ -298,18 +546,112 @@ class AWSClient(object):
         :param str path: The request path
         :param dict query_args: Request query arguments
         :param dict headers: Request headers
-        :param bytes body: The request body
+        :param body: The request body
+        :type body: bytes or bytes-like object
+        :param bool unsigned_payload: Exclude the body from the signature,
+            defaulting to the client setting
+        :param tuple digests: The previously calculated payload digests
         :rtype: tornado.httpclient.HTTPRequest
 
         """
         if headers is None:
             headers = {}
+        if self._is_stream(body):
+            return self._create_streaming_request(
+                method, path, query_args or {}, dict(headers), body)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        if digests is None:
+            digests = self._payload_digests(body or b'', unsigned_payload)
+        payload_hash, checksum_headers = digests
+        headers = dict(headers)
+        headers.update(checksum_headers)
         signed_headers, signed_url = self._signed_request(
-            method, path, query_args or {}, dict(headers), body or b'')
+            method, path, query_args or {}, headers, body or b'',
+            payload_hash)
         return httpclient.HTTPRequest(
-            signed_url, method, signed_headers, body,
+            signed_url, method, signed_headers,
             connect_timeout=self.CONNECT_TIMEOUT,
-            request_timeout=self.REQUEST_TIMEOUT)
+            request_timeout=self.REQUEST_TIMEOUT,
+            **self._body_arguments(body))
+
+    @staticmethod
+    def _body_arguments(body):
+        """Return the keyword arguments for passing the body to the
+        HTTPRequest. Bytes-like objects other than :py:class:`bytes` are
+        written by a ``body_producer`` so they are not copied.
+
+        :param body: The request body
+        :type body: bytes or bytes-like object
+        :rtype: dict
+
+        """
+        if body is None or isinstance(body, bytes):
+            return {'body': body}
+        return {'body_producer': _BufferBody(body)}
+
+    def _create_streaming_request(self, method, path, query_args, headers,
+                                  body):
+        """Create the HTTPRequest instance for a request that streams its
+        body using the ``aws-chunked`` content encoding, signing each chunk
+        as it is sent so the body never has to be held in memory.
+
+        The length of the body is taken from a ``Content-Length`` or
+        ``X-Amz-Decoded-Content-Length`` header if one is passed in,
+        otherwise it is determined from the file object. Large bodies take
+        longer to send than ``REQUEST_TIMEOUT`` allows, so the request uses
+        ``STREAMING_REQUEST_TIMEOUT`` instead.
+
+        :param str method: HTTP request method
+        :param str path: The request path
+        :param dict query_args: Request query arguments
+        :param dict headers: Request headers
+        :param body: The file object, async iterator or body producer
+        :rtype: tornado.httpclient.HTTPRequest
+        :raises: :class:`~tornado_aws.exceptions.StreamingBodyError`
+
+        """
+        content_length = None
+        for key in list(headers.keys()):
+            if key.lower() in ('content-length',
+                               'x-amz-decoded-content-length'):
+                content_length = int(headers.pop(key))
+        if content_length is None:
+            content_length = self._file_length(body)
+        signed_headers, query_string, chunk_signer = \
+            self._signer.sign_streaming(
+                method, path, query_args, headers, content_length,
+                self.STREAMING_CHUNK_SIZE)
+        return httpclient.HTTPRequest(
+            '{0}{1}?{2}'.format(self._endpoint_url, path, query_string),
+            method, signed_headers,
+            body_producer=_AWSChunkedBody(
+                body, chunk_signer, content_length,
+                self.STREAMING_CHUNK_SIZE),
+            connect_timeout=self.CONNECT_TIMEOUT,
+            request_timeout=self.STREAMING_REQUEST_TIMEOUT)
+
+    def _configure_region(self, region):
+        """Set the region, creating the endpoint URL and signer for it.
+
+        :param str region: The AWS region to make requests to
+
+        """
+        self._region = region
+        self._endpoint_url = self._endpoint(self._endpoint_url)
+        self._host = self._hostname(self._endpoint_url)
+        self._signer = signer.Signer(
+            self._auth_config, self._region, self._service, self._host)
+
+    def _default_region(self):
+        """Return the region configured for the profile.
+
+        :rtype: str
+        :raises: :exc:`tornado_aws.exceptions.ConfigNotFound`
+        :raises: :exc:`tornado_aws.exceptions.NoProfileError`
+
+        """
+        return config.get_region(self._profile)
 
     def _endpoint(self, endpoint):
         """Return the user specified endpoint or dynamically create the
@@ -323,6 +665,38 @@ class AWSClient(object):
         return '{}://{}.{}.amazonaws.com'.format(
             self.SCHEME, self._service, self._region)
 
+    @staticmethod
+    def _error_type(aws_error):
+        """Return the AWS error type or code of a parsed error.
+
+        :param tornado_aws.exceptions.AWSError aws_error: The parsed error
+        :rtype: str or None
+
+        """
+        return aws_error.args[1].get('type') if aws_error else None
+
+    @staticmethod
+    def _file_length(body):
+        """Return the number of bytes remaining to be read from a file
+        object.
+
+        :param file body: The file object
+        :rtype: int
+        :raises: :class:`~tornado_aws.exceptions.StreamingBodyError`
+
+        """
+        try:
+            position = body.tell()
+            try:
+                size = os.fstat(body.fileno()).st_size
+            except (AttributeError, OSError, ValueError):
+                size = body.seek(0, os.SEEK_END)
+                body.seek(position)
+            return size - position
+        except (AttributeError, OSError, ValueError):
+            raise exceptions.StreamingBodyError(
+                reason='a Content-Length header is required')
+
     def _get_client_adapter(self):
         """Return a HTTP client
 
@@ -331,6 +705,42 @@ class AWSClient(object):
         """
         return httpclient.HTTPClient(force_instance=True)
 
+    @staticmethod
+    def _close_mmap(body):
+        """Close the memory map of an uploaded file. When the upload failed
+        part way, the connection's write buffer may still reference it, in
+        which case it is unmapped once it is no longer referenced instead of
+        replacing the error of the request.
+
+        :param mmap.mmap body: The memory-mapped file
+
+        """
+        try:
+            body.close()
+        except BufferError:
+            LOGGER.debug('Memory-mapped file is still referenced, not '
+                         'closing it')
+
+    @staticmethod
+    def _is_stream(body):
+        """Returns ``True`` if the body is a file object, async iterator or
+        Tornado ``body_producer`` that should be streamed. Objects that
+        support the buffer protocol, such as :py:class:`mmap.mmap`, are not
+        streamed.
+
+        :param body: The request body
+        :rtype: bool
+
+        """
+        if body is None or isinstance(body, (bytes, str)):
+            return False
+        try:
+            memoryview(body).release()
+        except TypeError:
+            return (hasattr(body, 'read') or hasattr(body, '__aiter__') or
+                    callable(body))
+        return False
+
     @staticmethod
     def _hostname(url):
         """Parse the url returning a named tuple with the parts of the
@@ -342,29 +752,46 @@ class AWSClient(object):
         """
         return parse.urlparse(url).netloc
 
-    @staticmethod
-    def _quote(value):
-        """Return the percent encoded value, ensuring there are no skipped
-        characters.
+    def _payload_digests(self, body, unsigned_payload=None):
+        """Return the payload hash used in the request signature and the
+        checksum headers for the request body. This is safe to invoke from
+        a thread other than the IOLoop thread.
 
-        :param str value: The value to quote
-        :rtype: str
+        :param body: The request body
+        :type body: bytes or bytes-like object
+        :param bool unsigned_payload: Exclude the body from the signature,
+            defaulting to the client setting
+        :rtype: (str, dict)
 
         """
-        return parse.quote(value, safe='').replace('%7E', '~')
+        if unsigned_payload is None:
+            unsigned_payload = self._unsigned_payload
+        payload_hash = signer.UNSIGNED_PAYLOAD if unsigned_payload \
+            else hashlib.sha256(body).hexdigest()
+        if self._checksum == 'md5':
+            return payload_hash, {'Content-MD5': base64.b64encode(
+                hashlib.md5(body).digest()).decode('ascii')}
+        elif self._checksum == 'crc32':
+            return payload_hash, {'X-Amz-Checksum-Crc32': base64.b64encode(
+                zlib.crc32(body).to_bytes(4, 'big')).decode('ascii')}
+        return payload_hash, {}
+
+    def _presign(self, method, path, query_args, expires_in):
+        """Return the presigned URL for the request.
 
-    @staticmethod
-    def _sign(key, msg):
-        """Sign the msg with the key
-
-        :param bytes key: The signing key
-        :param bytes msg: The value to sign
-        :return: bytes
+        :param str method: HTTP request method
+        :param str path: The request path
+        :param dict query_args: Request query arguments
+        :param int expires_in: The number of seconds the URL is valid for
+        :rtype: str
 
         """
-        return hmac.new(key, msg, hashlib.sha256).digest()
+        return '{0}{1}?{2}'.format(
+            self._endpoint_url, path,
+            self._signer.presign(method, path, query_args, expires_in))
 
-    def _signed_request(self, method, path, query_args, headers, body):
+    def _signed_request(self, method, path, query_args, headers, body,
+                        payload_hash=None):
         """Create the request signature headers and return updated headers
          for the request.
 
@@ -373,106 +800,15 @@ class AWSClient(object):
         :param dict query_args: Query string args
         :param dict headers: Request headers
         :param bytes body: The request body
+        :param str payload_hash: Use the value instead of hashing the body
         :rtype: dict
 
         """
-        if isinstance(body, str):
-            body = body.encode('utf-8')
-
-        query_string = self._query_string(query_args)
-
-        timestamp = datetime.datetime.utcnow()
-        amz_date = timestamp.strftime('%Y%m%dT%H%M%SZ')
-        date_stamp = timestamp.strftime('%Y%m%d')
-
-        payload_hash = hashlib.sha256(body).hexdigest()
-
-        headers.update({
-            'Content-Length': str(len(body)),
-            'Date': amz_date,
-            'X-Amz-Content-sha256': payload_hash
-        })
-
-        headers.setdefault('Host', self._host)
-
-        # Temporary auth security token
-        if self._auth_config.security_token:
-            headers['X-Amz-Security-Token'] = self._auth_config.security_token
-
-        signed_headers, headers_string = self._signed_headers(headers)
-
-        request = '\n'.join([method, path, query_string, headers_string,
-                             signed_headers, payload_hash])
-        request_hash = hashlib.sha256(request.encode('utf-8')).hexdigest()
-
-        headers['Authorization'] = self._auth_header(amz_date, date_stamp,
-                                                     request_hash,
-                                                     signed_headers)
-
+        headers, query_string = self._signer.sign(
+            method, path, query_args, headers, body, payload_hash)
         return headers, '{0}{1}?{2}'.format(self._endpoint_url, path,
                                             query_string)
 
-    def _query_string(self, query_args):
-        """Return the sorted query string from the query args dict
-
-        :param dict query_args: The dict of query arguments
-        :rtype: str
-
-        """
-        return '&'.join(['{0}={1}'.format(self._quote(k),
-                                          self._quote(query_args[k]))
-                         for k in sorted(query_args.keys())])
-
-    def _signature(self, amz_date, date_stamp, request_hash):
-        """Return the request scope and signature
-
-        :param str date_stamp: The signing date stamp
-        :param str amz_date: The x-amz-date header value
-        :param str request_hash: The canonical request signature hash
-        :rtype: str, str
-
-        """
-        scope = '/'.join([date_stamp, self._region, self._service,
-                          'aws4_request'])
-        to_sign = '\n'.join([self.ALGORITHM, amz_date, scope, request_hash])
-        signing_key = self._signing_key(date_stamp)
-        return scope, hmac.new(signing_key, to_sign.encode('utf-8'),
-                               hashlib.sha256).hexdigest()
-
-    @staticmethod
-    def _signed_headers(headers):
-        """Create and return the canonical headers string and the signed
-        headers list.
-
-        Canonical header names must be trimmed and lowercase, and sorted in
-        ASCII order.
-
-        The signed headers lists the headers in the canonical_headers list,
-        delimited with ";" and in alpha order.
-
-        :param dict headers: The request headers
-        :rtype: str, str
-
-        """
-        tmp = {key.lower(): value for key, value in headers.items()}
-        signed_headers = ';'.join([k.lower() for k in sorted(tmp.keys())])
-        headers_string = '\n'.join(['{0}:{1}'.format(k, tmp[k])
-                                    for k in sorted(tmp.keys())]) + '\n'
-        return signed_headers, headers_string
-
-    def _signing_key(self, date_stamp):
-        """Create the signature key for the request.
-
-        :param str date_stamp: Date in %Y%m%d format for signing
-        :rtype: bytes
-
-        """
-        key = 'AWS4{0}'.format(self._auth_config.secret_key)
-        date = self._sign(key.encode('utf-8'), date_stamp.encode('utf-8'))
-        region = self._sign(date, self._region.encode('utf-8'))
-        service = self._sign(region, self._service.encode('utf-8'))
-        return self._sign(service, b'aws4_request')
-
 
 class AsyncAWSClient(AWSClient):
     """Implement a low level AWS client that performs the request signing
@@ -514,9 +850,61 @@ class AsyncAWSClient(AWSClient):
     the use of a specified base URL value instead of the auto-construction of
     a URL using the service and region variables.
 
+    When ``unsigned_payload`` is ``True``, requests are sent with the
+    ``X-Amz-Content-sha256`` header set to ``UNSIGNED-PAYLOAD`` and the body
+    is not hashed, relying on TLS for the integrity of the body. This saves
+    the CPU cost of hashing large request bodies, but is only supported by
+    some services, such as S3. It can also be set for individual requests
+    when calling :py:meth:`fetch`.
+
+    The ``checksum`` argument adds a checksum of the request body to each
+    request, either ``md5`` for the ``Content-MD5`` header or ``crc32`` for
+    the ``X-Amz-Checksum-Crc32`` header.
+
+    Request bodies of ``HASH_THRESHOLD`` bytes or more are hashed in a thread
+    pool instead of on the IOLoop, so that hashing large bodies does not
+    block other requests. ``hash_executor`` specifies the
+    :py:class:`~concurrent.futures.ThreadPoolExecutor` to use, defaulting to
+    the IOLoop's default executor.
+
+    By default, only requests that failed due to expired or invalid
+    credentials are retried. Passing a
+    :py:class:`~tornado_aws.retry.RetryPolicy` as ``retry_policy`` also
+    retries requests that were throttled or failed with a transient error,
+    waiting between attempts without blocking the IOLoop. Requests with a
+    streaming body are not retried.
+
+    Passing a :py:class:`~tornado_aws.retry.AdaptiveRateLimiter` as
+    ``rate_limiter`` limits the rate that requests are sent at once they
+    start being throttled, delaying requests instead of sending them at up
+    to ``max_clients`` concurrency.
+
+    Large response bodies, such as S3 objects, can be streamed instead of
+    buffered in memory by passing a ``streaming_callback`` to
+    :py:meth:`fetch` or by iterating over :py:meth:`fetch_stream`. If the
+    callback returns an awaitable, the response is not read any further
+    until it resolves, so a slow consumer applies backpressure instead of
+    the body being buffered. Backpressure is not supported when
+    ``use_curl`` is ``True``, in which case the callback must not be a
+    coroutine.
+
+    When ``lazy_region`` is ``True`` and the region is not passed in, set in
+    ``AWS_DEFAULT_REGION`` or the configuration file, the client does not
+    block the IOLoop requesting it from the EC2 Instance Metadata API when
+    created. Instead, it is requested asynchronously on the first call to
+    :py:meth:`fetch` or :py:meth:`resolve_region` and cached, so clients
+    created afterwards use it without requesting it again.
+
     ``max_clients`` allows for the specification of the maximum number if
     concurrent asynchronous HTTP requests that the client will perform.
 
+    The ``credentials`` argument allows clients to share credentials, such
+    as the :py:class:`~tornado_aws.config.Authorization` returned by
+    :py:func:`tornado_aws.config.shared_authorization`, so that clients for
+    multiple services load and refresh them once. When it is passed, the
+    ``profile``, ``access_key``, ``secret_key`` and ``security_token``
+    arguments are not used to load credentials.
+
     :param str service: The service for the API calls
     :param str profile: Specify the configuration profile name
     :param str region: The AWS region to make requests to
@@ -524,6 +912,19 @@ class AsyncAWSClient(AWSClient):
     :param str secret_key: The secret access key
     :param str security_token: An optional security token
     :param str endpoint: Override the base endpoint URL
+    :param bool unsigned_payload: Do not include the request body in the
+        request signature
+    :param str checksum: Add a ``md5`` or ``crc32`` checksum of the body
+    :param hash_executor: The executor for hashing large request bodies
+    :type hash_executor: concurrent.futures.ThreadPoolExecutor
+    :param retry_policy: Retry throttled and transiently failed requests
+    :type retry_policy: tornado_aws.retry.RetryPolicy
+    :param rate_limiter: Limit the request rate when throttled
+    :type rate_limiter: tornado_aws.retry.AdaptiveRateLimiter
+    :param credentials: Use shared credentials instead of loading them
+    :type credentials: tornado_aws.config.Authorization
+    :param bool lazy_region: Request the region from the EC2 Instance
+        Metadata API on first use instead of when created
     :param int max_clients: Max simultaneous HTTP requests (Default: ``100``)
     :param tornado.ioloop.IOLoop io_loop: Specify the IOLoop to use
     :param bool force_instance: Keep an isolated instance of the HTTP client
@@ -535,21 +936,30 @@ class AsyncAWSClient(AWSClient):
 
     """
     ASYNC = True
+    HASH_THRESHOLD = 1048576
+    MAX_ERROR_BODY_SIZE = 65536
+    STREAM_QUEUE_SIZE = 16
 
     def __init__(self, service, profile=None, region=None, access_key=None,
                  secret_key=None, security_token=None, endpoint=None,
                  max_clients=100, use_curl=False, io_loop=None,
-                 force_instance=True):
+                 force_instance=True, unsigned_payload=False, checksum=None,
+                 hash_executor=None, retry_policy=None, rate_limiter=None,
+                 credentials=None, lazy_region=False):
         self._force_instance = force_instance
+        self._hash_executor = hash_executor
         self._ioloop = io_loop or ioloop.IOLoop.current()
+        self._lazy_region = lazy_region
         self._max_clients = max_clients
+        self._streaming_client = None
         self._use_curl = use_curl
         if use_curl and not curl_httpclient:
             raise exceptions.CurlNotInstalledError
 
         super(AsyncAWSClient, self).__init__(
             service, profile, region, access_key, secret_key,
-            security_token, endpoint)
+            security_token, endpoint, unsigned_payload, checksum,
+            retry_policy, rate_limiter, credentials)
 
     def _get_client_adapter(self):
         """Return an asynchronous HTTP client adapter
@@ -563,8 +973,25 @@ class AsyncAWSClient(AWSClient):
         return httpclient.AsyncHTTPClient(
             max_clients=self._max_clients, force_instance=self._force_instance)
 
-    def fetch(self, method, path='/', query_args=None, headers=None, body=None,
-              recursed=False):
+    def _get_streaming_client_adapter(self):
+        """Return the HTTP client adapter for streaming responses. When the
+        client adapter is Tornado's simple client, a subclass of it that
+        supports backpressure is created on first use.
+
+        :rtype: :py:class:`tornado.httpclient.AsyncHTTPClient`
+
+        """
+        if type(self._client) is not simple_httpclient.SimpleAsyncHTTPClient:
+            return self._client
+        if self._streaming_client is None:
+            self._streaming_client = _StreamingHTTPClient(
+                max_clients=self._max_clients,
+                force_instance=self._force_instance)
+        return self._streaming_client
+
+    async def fetch(self, method, path='/', query_args=None, headers=None,
+                    body=None, recursed=False, unsigned_payload=None,
+                    streaming_callback=None):
         """Executes a request, returning an
         :py:class:`HTTPResponse <tornado.httpclient.HTTPResponse>`.
 
@@ -572,65 +999,482 @@ class AsyncAWSClient(AWSClient):
         :py:class:`HTTPError <tornado.httpclient.HTTPError>` unless the
         ``raise_error`` keyword argument is set to ``False``.
 
+        When ``streaming_callback`` is specified, it is invoked with each
+        chunk of the body of a successful response instead of the body being
+        buffered in the returned response. The body of an error response is
+        still buffered, up to ``MAX_ERROR_BODY_SIZE`` bytes, so the error is
+        raised as usual. A response is not retried once the callback has
+        been invoked.
+
         :param str method: HTTP request method
         :param str path: The request path
         :param dict query_args: Request query arguments
         :param dict headers: Request headers
-        :param bytes body: The request body
+        :param body: The request body
+        :type body: bytes or bytes-like object or file or async iterator or
+            callable
         :param bool recursed: Internal use only
+        :param bool unsigned_payload: Override the client setting for
+            excluding the body from the request signature
+        :param callable streaming_callback: Invoked with each chunk of the
+            response body, optionally returning an awaitable
         :rtype: :class:`~tornado.httpclient.HTTPResponse`
         :raises: :class:`~tornado.httpclient.HTTPError`
         :raises: :class:`~tornado_aws.exceptions.AWSError`
+        :raises: :class:`~tornado_aws.exceptions.ConfigNotFound`
         :raises: :class:`~tornado_aws.exceptions.NoCredentialsError`
+        :raises: :class:`~tornado_aws.exceptions.StreamingBodyError`
 
         """
-        future = concurrent.Future()
-
-        def on_response(response):
-            aws_error, exc = None, response.exception()
-            if exc:
-                if isinstance(exc, httpclient.HTTPError):
-                    need_credentials, aws_error = self._process_error(exc)
-                    if need_credentials and not recursed:
-                        self._auth_config.reset()
-
-                        def on_retry(retry):
-                            if not self._future_exception(retry, future):
-                                future.set_result(retry.result())
-
-                        request = self.fetch(method, path, query_args,
-                                             headers, body, True)
-                        self._ioloop.add_future(request, on_retry)
-                        return
-                    LOGGER.error('Error making request: %s', aws_error or exc)
-                future.set_exception(
-                    aws_error if aws_error else
-                    exceptions.RequestException(error=exc))
+        if self._signer is None:
+            await self.resolve_region()
+        if self._auth_config.needs_credentials():
+            await self._auth_config.refresh()
+
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        digests = None
+        if self._offload_digests(body, unsigned_payload):
+            digests = await self._ioloop.run_in_executor(
+                self._hash_executor, self._payload_digests, body,
+                unsigned_payload)
+
+        attempt = 1
+        while True:
+            # Wait before signing so the signature is not stale when sent
+            delay = self._rate_limit_delay()
+            if delay:
+                await gen.sleep(delay)
+            request = self._create_request(
+                method, path, query_args, headers, body, unsigned_payload,
+                digests)
+            adapter, response = self._client, None
+            if streaming_callback is not None:
+                adapter = self._get_streaming_client_adapter()
+                response = self._stream_response(request, streaming_callback)
+            try:
+                result = await adapter.fetch(request, raise_error=True)
+            except httpclient.HTTPError as error:
+                if response is not None:
+                    error = response.http_error(error)
+                need_credentials, aws_error = self._process_error(error)
+                self._update_rate_limiter(error.code, aws_error)
+                if need_credentials and not recursed and \
+                        not self._is_stream(body):
+                    self._auth_config.reset()
+                    return await self.fetch(method, path, query_args,
+                                            headers, body, True,
+                                            unsigned_payload,
+                                            streaming_callback)
+                LOGGER.error('Error making request: %s', aws_error or error)
+                delay = None
+                if response is None or not response.streamed:
+                    delay = self._retry_delay(
+                        attempt, body, error.code, aws_error)
+                if delay is None:
+                    raise aws_error if aws_error else \
+                        exceptions.RequestException(error=error)
+            except (OSError, socket.error) as error:
+                LOGGER.error('Error making request: %s', error)
+                delay = None
+                if response is None or not response.streamed:
+                    delay = self._retry_delay(
+                        attempt, body, retry.CONNECTION_ERROR)
+                if delay is None:
+                    raise exceptions.RequestException(error=error)
+            except exceptions.StreamingBodyError:
+                raise
+            except Exception as error:
+                raise exceptions.RequestException(error=error)
             else:
-                future.set_result(response.result())
+                self._update_rate_limiter(result.code)
+                self._retry_succeeded(attempt)
+                return result
+            LOGGER.info('Retrying request in %.2f seconds', delay)
+            await gen.sleep(delay)
+            attempt += 1
 
-        def perform_request():
-            self._ioloop.add_future(
-                self._client.fetch(
-                    self._create_request(
-                        method, path, query_args, headers, body),
-                    raise_error=True), on_response)
+    def close(self):
+        """Closes the underlying HTTP clients, freeing any resources used."""
+        super(AsyncAWSClient, self).close()
+        if self._streaming_client is not None:
+            self._streaming_client.close()
+            self._streaming_client = None
+
+    async def fetch_file(self, method, path, file_path, query_args=None,
+                         headers=None, unsigned_payload=None):
+        """Executes a request that uploads the file at ``file_path`` as the
+        request body, returning an
+        :py:class:`HTTPResponse <tornado.httpclient.HTTPResponse>`. The file
+        is memory-mapped, so it is neither read into memory nor copied.
 
-        def on_refreshed(response):
-            if not self._future_exception(response, future):
-                perform_request()
+        :param str method: HTTP request method
+        :param str path: The request path
+        :param str file_path: The path of the file to upload
+        :param dict query_args: Request query arguments
+        :param dict headers: Request headers
+        :param bool unsigned_payload: Override the client setting for
+            excluding the body from the request signature
+        :rtype: :class:`~tornado.httpclient.HTTPResponse`
+        :raises: :class:`~tornado.httpclient.HTTPError`
+        :raises: :class:`~tornado_aws.exceptions.AWSError`
+        :raises: :class:`~tornado_aws.exceptions.NoCredentialsError`
 
-        if self._auth_config.needs_credentials():
-            request_future = self._auth_config.refresh()
-            self._ioloop.add_future(request_future, on_refreshed)
+        """
+        with open(file_path, 'rb') as handle:
+            if not os.fstat(handle.fileno()).st_size:
+                return await self.fetch(
+                    method, path, query_args, headers, b'',
+                    unsigned_payload=unsigned_payload)
+            body = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return await self.fetch(
+                    method, path, query_args, headers, body,
+                    unsigned_payload=unsigned_payload)
+            finally:
+                self._close_mmap(body)
+
+    async def fetch_stream(self, method, path='/', query_args=None,
+                           headers=None, body=None, unsigned_payload=None):
+        """Executes a request, returning an async iterator of the chunks of
+        the response body. At most ``STREAM_QUEUE_SIZE`` chunks are buffered
+        before reading the response waits for them to be consumed. Errors
+        are raised as with :py:meth:`fetch`. Closing the iterator before it
+        is exhausted closes the connection.
+
+        .. code-block:: python
+
+            with open('object', 'wb') as handle:
+                async for chunk in client.fetch_stream('GET', '/bucket/key'):
+                    handle.write(chunk)
+
+        :param str method: HTTP request method
+        :param str path: The request path
+        :param dict query_args: Request query arguments
+        :param dict headers: Request headers
+        :param body: The request body
+        :type body: bytes or bytes-like object or file or async iterator or
+            callable
+        :param bool unsigned_payload: Override the client setting for
+            excluding the body from the request signature
+        :rtype: async iterator of bytes
+        :raises: :class:`~tornado.httpclient.HTTPError`
+        :raises: :class:`~tornado_aws.exceptions.AWSError`
+        :raises: :class:`~tornado_aws.exceptions.NoCredentialsError`
+
+        """
+        chunks = queues.Queue(self.STREAM_QUEUE_SIZE)
+        closed = []
+
+        def on_chunk(chunk):
+            if closed:
+                raise _StreamClosed()
+            return chunks.put(chunk)
+
+        future = gen.convert_yielded(self.fetch(
+            method, path, query_args, headers, body,
+            unsigned_payload=unsigned_payload, streaming_callback=on_chunk))
+        self._ioloop.add_future(future, lambda _future: chunks.put(None))
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+            future.result()
+        finally:
+            if not future.done():
+                closed.append(True)
+                while chunks.qsize():
+                    chunks.get_nowait()
+                try:
+                    await future
+                except Exception as error:
+                    LOGGER.debug('Closed streaming response: %s', error)
+
+    async def resolve_region(self):
+        """Return the AWS region, requesting it from the EC2 Instance
+        Metadata API without blocking the IOLoop if it has not been resolved
+        for a client created with ``lazy_region``.
+
+        :rtype: str
+        :raises: :class:`~tornado_aws.exceptions.ConfigNotFound`
+
+        """
+        if self._signer is None:
+            self._configure_region(await config.get_region_async(
+                self._profile, self._client))
+        return self._region
+
+    def _body_arguments(self, body):
+        """Return the keyword arguments for passing the body to the
+        HTTPRequest. The curl HTTP client does not support a
+        ``body_producer``, so bytes-like objects are copied into
+        :py:class:`bytes` when it is used.
+
+        :param body: The request body
+        :type body: bytes or bytes-like object
+        :rtype: dict
+
+        """
+        if self._use_curl and body is not None:
+            return {'body': bytes(body)}
+        return super(AsyncAWSClient, self)._body_arguments(body)
+
+    def _create_streaming_request(self, method, path, query_args, headers,
+                                  body):
+        """Create the HTTPRequest instance for a request that streams its
+        body, which is not supported by the curl HTTP client.
+
+        :param str method: HTTP request method
+        :param str path: The request path
+        :param dict query_args: Request query arguments
+        :param dict headers: Request headers
+        :param body: The file object, async iterator or body producer
+        :rtype: tornado.httpclient.HTTPRequest
+        :raises: :class:`~tornado_aws.exceptions.StreamingBodyError`
+
+        """
+        if self._use_curl:
+            raise exceptions.StreamingBodyError(
+                reason='not supported with use_curl')
+        return super(AsyncAWSClient, self)._create_streaming_request(
+            method, path, query_args, headers, body)
+
+    def _default_region(self):
+        """Return the region configured for the profile, or ``None`` if it
+        must be requested from the EC2 Instance Metadata API when
+        ``lazy_region`` is set.
+
+        :rtype: str or None
+        :raises: :exc:`tornado_aws.exceptions.ConfigNotFound`
+        :raises: :exc:`tornado_aws.exceptions.NoProfileError`
+
+        """
+        if self._lazy_region:
+            return config.cached_region(self._profile)
+        return super(AsyncAWSClient, self)._default_region()
+
+    def _offload_digests(self, body, unsigned_payload):
+        """Returns ``True`` if the payload digests for the body should be
+        calculated in the hash executor instead of on the IOLoop.
+
+        :param body: The request body
+        :param bool unsigned_payload: Exclude the body from the signature
+        :rtype: bool
+
+        """
+        if not body or self._is_stream(body) or \
+                signer.byte_length(body) < self.HASH_THRESHOLD:
+            return False
+        if unsigned_payload is None:
+            unsigned_payload = self._unsigned_payload
+        return not unsigned_payload or self._checksum is not None
+
+    def _stream_response(self, request, streaming_callback):
+        """Configure the request to pass the body of a successful response
+        to the streaming callback.
+
+        :param tornado.httpclient.HTTPRequest request: The request
+        :param callable streaming_callback: The streaming callback
+        :rtype: _StreamingResponse
+
+        """
+        response = _StreamingResponse(
+            streaming_callback, self.MAX_ERROR_BODY_SIZE)
+        request.header_callback = response.on_header
+        request.streaming_callback = response.on_chunk
+        request.request_timeout = self.STREAMING_REQUEST_TIMEOUT
+        return response
+
+
+class _BufferBody(object):
+    """Tornado ``body_producer`` that writes a bytes-like object, such as a
+    :py:class:`bytearray`, :py:class:`memoryview` or :py:class:`mmap.mmap`,
+    without copying it.
+
+    :param body: The bytes-like object to write
+
+    """
+    def __init__(self, body):
+        self._body = body
+
+    def __call__(self, write):
+        with memoryview(self._body) as view:
+            return write(view.cast('B'))
+
+
+class _AWSChunkedBody(object):
+    """Tornado ``body_producer`` that reads the request body from a file
+    object, async iterator or another body producer and writes it in
+    fixed size, individually signed ``aws-chunked`` chunks. At most one
+    chunk is buffered at a time.
+
+    :param body: The file object, async iterator or body producer
+    :param tornado_aws.signer.ChunkSigner chunk_signer: The chunk signer
+    :param int content_length: The expected length of the body
+    :param int chunk_size: The size of each chunk
+
+    """
+    def __init__(self, body, chunk_signer, content_length, chunk_size):
+        self._body = body
+        self._buffer = bytearray()
+        self._chunk_signer = chunk_signer
+        self._chunk_size = chunk_size
+        self._content_length = content_length
+        self._sent = 0
+        self._write = None
+
+    async def __call__(self, write):
+        self._write = write
+        if hasattr(self._body, 'read'):
+            while True:
+                data = self._body.read(self._chunk_size)
+                if not data:
+                    break
+                await self.write(data)
+        elif hasattr(self._body, '__aiter__'):
+            async for data in self._body:
+                await self.write(data)
         else:
-            perform_request()
+            result = self._body(self.write)
+            if result is not None:
+                await result
+        if self._buffer:
+            await self._send(bytes(self._buffer))
+            del self._buffer[:]
+        if self._sent != self._content_length:
+            raise exceptions.StreamingBodyError(
+                reason='sent {} of {} bytes'.format(
+                    self._sent, self._content_length))
+        await self._send(b'')
+
+    def write(self, data):
+        """Buffer the data, sending each complete chunk. Returns a future
+        that resolves when the last chunk sent has been written.
+
+        :param bytes data: The data to write
+        :rtype: tornado.concurrent.Future
 
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._buffer += data
+        future = None
+        while len(self._buffer) >= self._chunk_size:
+            future = self._send(bytes(self._buffer[:self._chunk_size]))
+            del self._buffer[:self._chunk_size]
+        if future is None:
+            future = concurrent.Future()
+            future.set_result(None)
         return future
 
-    @staticmethod
-    def _future_exception(inner, outer):
-        exception = inner.exception()
-        if exception:
-            outer.set_exception(exception)
-        return bool(exception)
+    def _send(self, chunk):
+        """Sign and write the chunk.
+
+        :param bytes chunk: The chunk to write
+        :rtype: tornado.concurrent.Future
+
+        """
+        self._sent += len(chunk)
+        if self._sent > self._content_length:
+            raise exceptions.StreamingBodyError(
+                reason='body is longer than {} bytes'.format(
+                    self._content_length))
+        self._write(self._chunk_signer.header(chunk))
+        self._write(chunk)
+        return self._write(b'\r\n')
+
+
+class _StreamClosed(Exception):
+    """Raised from the streaming callback to close the connection when the
+    consumer of a streaming response stops reading it."""
+
+
+class _StreamingResponse(object):
+    """Pass the body of a successful response to the streaming callback,
+    buffering the body of an error response so that the error can be
+    parsed.
+
+    :param callable callback: The streaming callback
+    :param int max_error_size: The maximum error body size to buffer
+
+    """
+    def __init__(self, callback, max_error_size):
+        self._callback = callback
+        self._error_body = bytearray()
+        self._max_error_size = max_error_size
+        self.code = None
+        self.streamed = False
+
+    def http_error(self, error):
+        """Return the HTTP error with the buffered error response body.
+
+        :param tornado.httpclient.HTTPError error: The HTTP error
+        :rtype: tornado.httpclient.HTTPError
+
+        """
+        if error.response is None:
+            return error
+        response = error.response
+        return httpclient.HTTPError(error.code, error.message,
+                                    httpclient.HTTPResponse(
+                                        response.request, response.code,
+                                        headers=response.headers,
+                                        buffer=io.BytesIO(
+                                            bytes(self._error_body)),
+                                        effective_url=response.effective_url,
+                                        reason=response.reason))
+
+    def on_chunk(self, chunk):
+        """Invoked with each chunk of the response body.
+
+        :param bytes chunk: The chunk of the response body
+        :rtype: tornado.concurrent.Future or None
+
+        """
+        if self.code is not None and 200 <= self.code < 300:
+            self.streamed = True
+            return self._callback(chunk)
+        self._error_body += chunk[:self._max_error_size -
+                                  len(self._error_body)]
+
+    def on_header(self, line):
+        """Invoked with each line of the response headers, recording the
+        status code of the response.
+
+        :param str line: The header line
+
+        """
+        if line.startswith('HTTP/'):
+            self.code = httputil.parse_response_start_line(line.strip()).code
+            del self._error_body[:]
+
+
+class _StreamingHTTPClient(simple_httpclient.SimpleAsyncHTTPClient):
+    """Tornado's simple HTTP client, with backpressure for streaming
+    responses.
+
+    """
+    def _connection_class(self):
+        return _StreamingHTTPConnection
+
+
+class _StreamingHTTPConnection(simple_httpclient._HTTPConnection):
+    """Waits for the awaitable returned by the streaming callback before
+    reading more of the response, and does not limit the size of streamed
+    response bodies.
+
+    """
+    def __init__(self, *args, **kwargs):
+        super(_StreamingHTTPConnection, self).__init__(*args, **kwargs)
+        if self.request.streaming_callback is not None:
+            self.max_body_size = sys.maxsize
+
+    def data_received(self, chunk):
+        if self._should_follow_redirect():
+            return None
+        if self.request.streaming_callback is not None:
+            return self.request.streaming_callback(chunk)
+        self.chunks.append(chunk)
+        return None
@@ -2,60 +2,149 @@
 AWS Credentials Loader
 
 """
+import calendar
+import collections
 import configparser
+import datetime
+import hashlib
 import http.client
+import ipaddress
 import json
 import logging
 import os
 from os import path
 import socket
+import tempfile
+import time
+from urllib import parse
 
-from tornado import concurrent, httpclient, ioloop
+from tornado import gen, httpclient, ioloop
 try:
     from tornado import curl_httpclient
 except ImportError:  # pragma: no cover
     curl_httpclient = httpclient
     curl_httpclient.CurlAsyncHTTPClient = httpclient.AsyncHTTPClient
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
 
 from tornado_aws import exceptions
 
 LOGGER = logging.getLogger(__name__)
 
+CONTAINER_ENDPOINT = 'http://169.254.170.2'
+CONTAINER_HOSTS = {'169.254.170.2', '169.254.170.23', 'fd00:ec2::23'}
 DEFAULT_CREDENTIALS_PATH = '~/.aws/credentials'
 DEFAULT_REGION = 'us-east-1'
 INSTANCE_HOST = '169.254.169.254'
 INSTANCE_ENDPOINT = 'http://169.254.169.254/latest/{}'
 INSTANCE_ROLE_PATH = '/meta-data/iam/security-credentials/'
 INSTANCE_CREDENTIALS_PATH = '/meta-data/iam/security-credentials/{}'
+INSTANCE_TOKEN_PATH = '/api/token'
+INSTANCE_TOKEN_TTL = 21600
+INSTANCE_TOKEN_MARGIN = 60
+TOKEN_HEADER = 'X-aws-ec2-metadata-token'
+TOKEN_TTL_HEADER = 'X-aws-ec2-metadata-token-ttl-seconds'
 REGION_PATH = '/dynamic/instance-identity/document'
 
 HTTP_TIMEOUT = 0.25
+CONTAINER_TIMEOUT = 2
+REGION_TIMEOUT = 3
+
+REFRESH_MARGIN = 300
+REFRESH_MIN_INTERVAL = 15
+
+PREFORK_POLL_INTERVAL = 0.1
+PREFORK_WAIT = 10
+
+# Errors that a background refresh is retried after
+_REFRESH_AHEAD_RETRY_EXCEPTIONS = (
+    exceptions.AWSError, exceptions.NoCredentialsError,
+    exceptions.RequestException, httpclient.HTTPError, OSError)
+
+SIGNING_KEY_CACHE_SIZE = 32
+
+CACHED_CREDENTIAL_KEYS = (
+    'AccessKeyId', 'SecretAccessKey', 'Token', 'Expiration')
+
+_instance_region = None
+_instance_token = None, 0
+_parsed_files = {}
+_region_request = None
+_shared_authorizations = {}
 
 
 def get_region(profile):
     """Return the credentials from the configured ~/.aws/credentials file
     following a similar behavior implemented by awscli and botocore.
 
+    The region returned by the EC2 Instance Metadata API is cached for the
+    life of the process.
+
     :param str profile: Use the optional profile for getting settings
     :return: region
     :rtype: str
     :raises: exceptions.ConfigNotFound
 
+    """
+    region = cached_region(profile)
+    if region:
+        return region
+    try:
+        return _cache_instance_region(_request_region_from_instance())
+    except (socket.error, socket.timeout, OSError) as error:
+        LOGGER.error('Error fetching from EC2 Instance Metadata (%s)', error)
+        raise exceptions.ConfigNotFound(path=_config_file_path())
+
+
+async def get_region_async(profile, client=None):
+    """Return the region like :py:func:`get_region`, requesting it from the
+    EC2 Instance Metadata API with the asynchronous HTTP client so that the
+    IOLoop is not blocked. Concurrent calls share a single request.
+
+    :param str profile: Use the optional profile for getting settings
+    :param client: The HTTP client to request the region with
+    :type client: tornado.httpclient.AsyncHTTPClient
+    :rtype: str
+    :raises: exceptions.ConfigNotFound
+
+    """
+    global _region_request
+    region = cached_region(profile)
+    if region:
+        return region
+    if _region_request is None:
+        _region_request = gen.convert_yielded(
+            _request_region_from_instance_async(
+                client or httpclient.AsyncHTTPClient()))
+    try:
+        return await _region_request
+    except (httpclient.HTTPError, OSError) as error:
+        LOGGER.error('Error fetching from EC2 Instance Metadata (%s)', error)
+        raise exceptions.ConfigNotFound(path=_config_file_path())
+
+
+def cached_region(profile):
+    """Return the region from the ``AWS_DEFAULT_REGION`` environment
+    variable, the AWS CLI configuration file or the cached EC2 Instance
+    Metadata API region, without making any requests. ``None`` is returned
+    if the region must be requested from the EC2 Instance Metadata API.
+
+    :param str profile: Use the optional profile for getting settings
+    :rtype: str or None
+    :raises: exceptions.NoProfileError
+
     """
     region = os.getenv('AWS_DEFAULT_REGION', None)
     if region:
         return region
 
-    file_path = os.getenv('AWS_CONFIG_FILE', '~/.aws/config')
+    file_path = _config_file_path()
     try:
         config = _parse_file(file_path)
     except exceptions.ConfigNotFound:
-        try:
-            return _request_region_from_instance()
-        except (socket.error, socket.timeout, OSError) as error:
-            LOGGER.error('Error fetching from EC2 Instance Metadata (%s)',
-                         error)
-            raise exceptions.ConfigNotFound(path=file_path)
+        return _instance_region
 
     key = 'profile {0}'.format(profile)
     if key not in config and 'default' not in config:
@@ -65,6 +154,40 @@ def get_region(profile):
             'default', {}).get('region') or DEFAULT_REGION
 
 
+def _cache_instance_region(region):
+    """Cache the region returned by the EC2 Instance Metadata API for the
+    life of the process, returning it.
+
+    :param str region: The region
+    :rtype: str
+
+    """
+    global _instance_region
+    _instance_region = region
+    return region
+
+
+def _config_file_path():
+    """Return the path of the AWS CLI configuration file.
+
+    :rtype: str
+
+    """
+    return os.getenv('AWS_CONFIG_FILE', '~/.aws/config')
+
+
+def _instance_token_request():
+    """Return the keyword arguments for requesting an IMDSv2 session token.
+
+    :rtype: dict
+
+    """
+    return {'method': 'PUT', 'body': b'',
+            'headers': {TOKEN_TTL_HEADER: str(INSTANCE_TOKEN_TTL)},
+            'connect_timeout': HTTP_TIMEOUT,
+            'request_timeout': HTTP_TIMEOUT}
+
+
 def _is_async_client(client):
     """Returns ``True`` if the client that is passed in is asynchronous.
 
@@ -83,15 +206,27 @@ def _parse_file(file_path):
     """Parse the specified configuration file, returning a nested dict
     of key/value pairs by section.
 
+    The parsed file is cached until its modification time or size changes,
+    so the returned dict is shared and must not be modified.
+
     :param str file_path: The path of the file to read.
     :rtype: dict
 
     """
     file_path = path.abspath(path.expanduser(path.expandvars(file_path)))
-    LOGGER.debug('Attempting to load credentials from %s', file_path)
-    if not path.exists(file_path):
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        LOGGER.debug('Credentials file %s not found', file_path)
+        _parsed_files.pop(file_path, None)
         raise exceptions.ConfigNotFound(path=file_path)
 
+    key = stat.st_mtime_ns, stat.st_size
+    cached = _parsed_files.get(file_path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    LOGGER.debug('Attempting to load credentials from %s', file_path)
     parser = configparser.RawConfigParser()
     try:
         parser.read(file_path)
@@ -104,29 +239,263 @@ def _parse_file(file_path):
         config[section] = {}
         for option in parser.options(section):
             config[section][option] = parser.get(section, option)
+    _parsed_files[file_path] = key, config
     return config
 
 
+def shared_authorization(profile=None, asynchronous=True):
+    """Return the process-wide :py:class:`Authorization` for the profile,
+    creating it on first use. Passing it as the ``credentials`` argument to
+    each :py:class:`~tornado_aws.client.AWSClient` or
+    :py:class:`~tornado_aws.client.AsyncAWSClient` shares one set of
+    credentials, one refresh schedule and one set of metadata API requests
+    between the clients of all services.
+
+    The shared instance uses its own HTTP client for the metadata APIs, so
+    it is not affected by clients being closed.
+
+    :param str profile: The configuration profile to use
+    :param bool asynchronous: Return the instance for asynchronous clients
+    :rtype: Authorization
+
+    """
+    profile = profile or os.getenv('AWS_DEFAULT_PROFILE', 'default')
+    key = profile, asynchronous
+    if key not in _shared_authorizations:
+        client = httpclient.AsyncHTTPClient(force_instance=True) \
+            if asynchronous else httpclient.HTTPClient()
+        _shared_authorizations[key] = Authorization(profile, client=client)
+    return _shared_authorizations[key]
+
+
+def _cache_instance_token(token):
+    """Cache the IMDSv2 session token until shortly before it expires,
+    returning it.
+
+    :param str token: The session token
+    :rtype: str
+
+    """
+    global _instance_token
+    _instance_token = token, \
+        time.time() + INSTANCE_TOKEN_TTL - INSTANCE_TOKEN_MARGIN
+    return token
+
+
+def _cached_instance_token():
+    """Return the cached IMDSv2 session token, if it has not expired.
+
+    :rtype: str or None
+
+    """
+    token, expires_at = _instance_token
+    return token if expires_at > time.time() else None
+
+
+def _clear_instance_token():
+    """Clear the cached IMDSv2 session token, such as when it is rejected."""
+    global _instance_token
+    _instance_token = None, 0
+
+
+def _container_credentials_request():
+    """Return the URL and headers for requesting credentials from the ECS or
+    EKS container credentials endpoint, if configured with the
+    ``AWS_CONTAINER_CREDENTIALS_RELATIVE_URI`` or
+    ``AWS_CONTAINER_CREDENTIALS_FULL_URI`` environment variables.
+
+    The authorization token is read from the file in the
+    ``AWS_CONTAINER_AUTHORIZATION_TOKEN_FILE`` environment variable for each
+    request, as it may be rotated, or from the
+    ``AWS_CONTAINER_AUTHORIZATION_TOKEN`` environment variable.
+
+    :rtype: (str, dict) or None
+    :raises: tornado_aws.exceptions.NoCredentialsError
+
+    """
+    relative_uri = os.getenv('AWS_CONTAINER_CREDENTIALS_RELATIVE_URI')
+    if relative_uri:
+        url = '{}{}'.format(CONTAINER_ENDPOINT, relative_uri)
+    else:
+        url = os.getenv('AWS_CONTAINER_CREDENTIALS_FULL_URI')
+        if not url:
+            return None
+        parsed = parse.urlsplit(url)
+        if parsed.scheme != 'https' and not (
+                parsed.hostname in CONTAINER_HOSTS or
+                _is_loopback(parsed.hostname)):
+            LOGGER.error('Unsupported container credentials URI: %s', url)
+            raise exceptions.NoCredentialsError()
+
+    headers = {}
+    token_file = os.getenv('AWS_CONTAINER_AUTHORIZATION_TOKEN_FILE')
+    if token_file:
+        with open(token_file, 'r') as handle:
+            headers['Authorization'] = handle.read().strip()
+    elif os.getenv('AWS_CONTAINER_AUTHORIZATION_TOKEN'):
+        headers['Authorization'] = \
+            os.environ['AWS_CONTAINER_AUTHORIZATION_TOKEN']
+    return url, headers
+
+
+def _instance_headers(token):
+    """Return the headers for an EC2 Instance Metadata request.
+
+    :param str token: The IMDSv2 session token, ``None`` for IMDSv1
+    :rtype: dict
+
+    """
+    return {TOKEN_HEADER: token} if token else {}
+
+
+def _is_loopback(hostname):
+    """Returns ``True`` if the hostname is a loopback address.
+
+    :param str hostname: The hostname to check
+    :rtype: bool
+
+    """
+    try:
+        return ipaddress.ip_address(hostname).is_loopback
+    except ValueError:
+        return hostname == 'localhost'
+
+
+def _parse_expiration(value):
+    """Return the UTC timestamp for the ``Expiration`` value returned with
+    temporary credentials, such as ``2019-11-17T18:30:15Z``.
+
+    :param str value: The ISO 8601 expiration time
+    :rtype: int or None
+
+    """
+    try:
+        expiration = datetime.datetime.strptime(
+            value[:19], '%Y-%m-%dT%H:%M:%S')
+    except (TypeError, ValueError):
+        LOGGER.warning('Could not parse credential expiration: %r', value)
+        return None
+    return calendar.timegm(expiration.timetuple())
+
+
 def _request_region_from_instance():
     """Attempt to get the region from the instance metadata
 
     :rtype: str
 
     """
-    conn = http.client.HTTPConnection(INSTANCE_HOST, timeout=3)
+    conn = http.client.HTTPConnection(INSTANCE_HOST, timeout=REGION_TIMEOUT)
+    headers = _instance_headers(_request_instance_token(conn))
+    headers['Accept'] = 'application/json'
     conn.request('GET', INSTANCE_ENDPOINT.format(REGION_PATH),
-                 headers={'Accept': 'application/json'})
+                 headers=headers)
     response = conn.getresponse()
     return json.loads(response.read().decode('utf-8'))['region']
 
 
+async def _request_region_from_instance_async(client):
+    """Attempt to get the region from the instance metadata using the
+    asynchronous HTTP client, caching it for the life of the process.
+
+    :param tornado.httpclient.AsyncHTTPClient client: The HTTP client
+    :rtype: str
+    :raises: tornado.httpclient.HTTPError
+
+    """
+    global _region_request
+    try:
+        headers = _instance_headers(await _request_instance_token_async(
+            client))
+        headers['Accept'] = 'application/json'
+        response = await client.fetch(
+            INSTANCE_ENDPOINT.format(REGION_PATH), headers=headers,
+            connect_timeout=REGION_TIMEOUT, request_timeout=REGION_TIMEOUT)
+        return _cache_instance_region(
+            json.loads(response.body.decode('utf-8'))['region'])
+    finally:
+        _region_request = None
+
+
+def _request_instance_token(conn):
+    """Return the cached IMDSv2 session token or request a new one, returning
+    ``None`` to fall back to IMDSv1 if it can not be retrieved.
+
+    :param http.client.HTTPConnection conn: The metadata API connection
+    :rtype: str or None
+
+    """
+    token = _cached_instance_token()
+    if token:
+        return token
+    try:
+        conn.request('PUT', INSTANCE_ENDPOINT.format(INSTANCE_TOKEN_PATH),
+                     headers={TOKEN_TTL_HEADER: str(INSTANCE_TOKEN_TTL)})
+        response = conn.getresponse()
+        body = response.read()
+    except (socket.error, socket.timeout, OSError) as error:
+        LOGGER.debug('Falling back to IMDSv1: %s', error)
+        conn.close()
+        return None
+    if response.status != 200:
+        LOGGER.debug('Falling back to IMDSv1: %s', response.status)
+        return None
+    return _cache_instance_token(body.decode('utf-8'))
+
+
+async def _request_instance_token_async(client):
+    """Return the cached IMDSv2 session token or request a new one with the
+    asynchronous HTTP client, returning ``None`` to fall back to IMDSv1 if it
+    can not be retrieved.
+
+    :param tornado.httpclient.AsyncHTTPClient client: The HTTP client
+    :rtype: str or None
+
+    """
+    token = _cached_instance_token()
+    if token:
+        return token
+    try:
+        response = await client.fetch(
+            INSTANCE_ENDPOINT.format(INSTANCE_TOKEN_PATH),
+            **_instance_token_request())
+    except (httpclient.HTTPError, OSError) as error:
+        LOGGER.debug('Falling back to IMDSv1: %s', error)
+        return None
+    return _cache_instance_token(response.body.decode('utf-8'))
+
+
 class Authorization(object):
     """Object used to hold configuration information."""
 
     def __init__(self, profile, access_key=None, secret_key=None,
-                 security_token=None, client=None):
+                 security_token=None, client=None, refresh_margin=None,
+                 provider=None, cache_dir=None, prefork=False):
         """Create a new instance of the ``_AuthConfig`` class.
 
+        When used with an asynchronous client, temporary credentials are
+        refreshed in the background ``refresh_margin`` seconds before they
+        expire, defaulting to ``REFRESH_MARGIN``.
+
+        When a ``provider``, such as
+        :py:class:`~tornado_aws.sts.AssumeRoleProvider`, is specified,
+        credentials are only fetched from it instead of being loaded from
+        the environment, configuration files or metadata APIs.
+
+        When ``cache_dir`` is specified, temporary credentials are written to
+        a file in the directory that only the current user can read, named
+        for the profile or the role of the provider. A new process loads
+        them from the file if they have not expired, so it can sign requests
+        without first fetching credentials from a metadata API or STS.
+
+        When ``prefork`` is ``True``, processes sharing the ``cache_dir``,
+        such as those started with
+        :py:func:`tornado.process.fork_processes`, share temporary
+        credentials instead of each fetching them. The process that takes a
+        lock on the cache file fetches the credentials and writes them to
+        the cache, while the others wait up to ``PREFORK_WAIT`` seconds to
+        read them from it. A process that finds the lock free after the
+        credentials were not refreshed takes over fetching them.
+
         :param str profile: The configuration profile to use
         :param str access_key: Optional configured access key
         :param str secret_key: Optional configured secret key
@@ -134,19 +503,44 @@ class Authorization(object):
         :param client: The HTTP client to use for EC2 API
         :type client: tornado.httpclient.HTTPClient or
             tornado.httpclient.AsyncHTTPClient
+        :param int refresh_margin: Seconds before expiration to refresh
+        :param provider: Fetch temporary credentials from the provider
+        :type provider: tornado_aws.sts.AssumeRoleProvider or
+            tornado_aws.sts.WebIdentityProvider
+        :param str cache_dir: Cache temporary credentials in the directory
+        :param bool prefork: Share credentials between processes using the
+            ``cache_dir``
+        :raises: ValueError
 
         """
+        if prefork and (not cache_dir or fcntl is None):
+            raise ValueError('prefork requires cache_dir and fcntl')
+        self._cache_dir = path.expanduser(cache_dir) if cache_dir else None
+        self._prefork = prefork
         self._client = client
         self._profile = profile
+        self._provider = provider
         self._local_credentials = False
         self._access_key = None
         self._secret_key = None
         self._security_token = None
         self._expiration = None
-        self._resolve_credentials(access_key, secret_key, security_token)
-        self._is_async = _is_async_client(client)
+        self._expires_at = None
+        self._refresh_margin = (REFRESH_MARGIN if refresh_margin is None
+                                else refresh_margin)
+        self._closed = False
+        self._refresh_timeout = None
+        self._refreshing = None
+        self._signing_keys = collections.OrderedDict()
+        if provider is None:
+            self._resolve_credentials(access_key, secret_key, security_token)
+            self._is_async = _is_async_client(client)
+        else:
+            self._is_async = provider.is_async
         LOGGER.info('Authorization for async client: %s', self._is_async)
         self._ioloop = ioloop.IOLoop.current() if self._is_async else None
+        if self._cache_dir and not self._local_credentials:
+            self._load_cached_credentials()
 
     @property
     def access_key(self):
@@ -157,6 +551,17 @@ class Authorization(object):
         """
         return self._access_key
 
+    @property
+    def is_async(self):
+        """Indicates if the credentials are fetched with an asynchronous
+        HTTP client, for use with
+        :py:class:`~tornado_aws.client.AsyncAWSClient`.
+
+        :rtype: bool
+
+        """
+        return self._is_async
+
     @property
     def local_credentials(self):
         """Indicates if the credentials are loaded dynamically or if they
@@ -185,53 +590,75 @@ class Authorization(object):
         """
         return self._security_token
 
+    def cache_signing_key(self, date_stamp, region, service, signing_key):
+        """Store a derived SigV4 signing key for the current secret key. The
+        cache is bounded to ``SIGNING_KEY_CACHE_SIZE`` entries, evicting the
+        oldest entry first.
+
+        :param str date_stamp: Date in %Y%m%d format for signing
+        :param str region: The AWS region the key is scoped to
+        :param str service: The AWS service the key is scoped to
+        :param bytes signing_key: The derived signing key
+
+        """
+        key = self._secret_key, date_stamp, region, service
+        self._signing_keys[key] = signing_key
+        while len(self._signing_keys) > SIGNING_KEY_CACHE_SIZE:
+            self._signing_keys.popitem(last=False)
+
+    def cached_signing_key(self, date_stamp, region, service):
+        """Return the previously derived SigV4 signing key for the current
+        secret key, date, region and service if it is cached.
+
+        :param str date_stamp: Date in %Y%m%d format for signing
+        :param str region: The AWS region the key is scoped to
+        :param str service: The AWS service the key is scoped to
+        :rtype: bytes or None
+
+        """
+        return self._signing_keys.get(
+            (self._secret_key, date_stamp, region, service))
+
     def needs_credentials(self):
-        """Returns True if the client needs fetch/refresh credentials
+        """Returns True if the client needs fetch/refresh credentials, either
+        because they are not set or because temporary credentials expired.
 
         :rtype: bool
 
         """
-        return not self._access_key or not self._secret_key
+        return (not self._access_key or not self._secret_key or
+                (self._expires_at is not None and
+                 self._expires_at <= time.time()))
 
     def refresh(self):
         """Load dynamic credentials from the AWS Instance Metadata and user
-        data HTTP API.
+        data HTTP API. When used with an asynchronous client, a
+        :class:`~tornado.concurrent.Future` is returned. Concurrent calls
+        share the Future of the refresh that is already in progress, so
+        credentials are only fetched once.
 
         :raises: tornado_aws.exceptions.NoCredentialsError
 
         """
-        future = concurrent.Future() if self._is_async else None
+        if self._is_async:
+            if self._refreshing is None:
+                self._refreshing = gen.convert_yielded(self._refresh_async())
+            return self._refreshing
 
         # Refresh config file credentials
         if self._local_credentials:
-            future.set_result(self._resolve_credentials())
-            return future
+            return self._resolve_credentials()
+        if self._prefork:
+            return self._refresh_prefork()
+        self._update_credentials()
 
-        LOGGER.debug('Refreshing EC2 IAM Credentials')
-        try:
-            result = self._fetch_credentials()
-            if concurrent.is_future(result):
-
-                def on_complete(response):
-                    exception = response.exception()
-                    if exception:
-                        if isinstance(exception, httpclient.HTTPError) and \
-                                exception.code == 599:
-                            future.set_exception(
-                                exceptions.NoCredentialsError())
-                        else:
-                            future.set_exception(exception)
-                        return
-                    self._assign_credentials(response.result())
-                    future.set_result(True)
-
-                self._ioloop.add_future(result, on_complete)
-            else:
-                self._assign_credentials(result)
-        except (httpclient.HTTPError, OSError) as error:
-            LOGGER.error('Error Fetching Credentials: %s', error)
-            raise exceptions.NoCredentialsError
-        return future
+    def close(self):
+        """Stop refreshing the credentials in the background, for when the
+        client they are used by is closed.
+
+        """
+        self._closed = True
+        self._cancel_refresh_ahead()
 
     def reset(self):
         """Reset the security credentials.
@@ -242,7 +669,32 @@ class Authorization(object):
         self._access_key = None
         self._secret_key = None
         self._expiration = None
+        self._expires_at = None
         self._security_token = None
+        self._signing_keys.clear()
+        self._cancel_refresh_ahead()
+
+    def _acquire_refresh_lock(self):
+        """Take the lock for refreshing the cached credentials without
+        blocking, returning the locked file descriptor or ``None`` if another
+        process holds it. Closing the file descriptor releases the lock.
+
+        :rtype: int or None
+
+        """
+        try:
+            os.makedirs(self._cache_dir, mode=0o700, exist_ok=True)
+            lock = os.open('{}.lock'.format(self._cache_path()),
+                           os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError as error:
+            LOGGER.warning('Error opening the credentials lock: %s', error)
+            return None
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(lock)
+            return None
+        return lock
 
     def _assign_credentials(self, data):
         """Assign the values returned by the EC2 Metadata and user data API to
@@ -254,50 +706,119 @@ class Authorization(object):
         self._access_key = data['AccessKeyId']
         self._secret_key = data['SecretAccessKey']
         self._expiration = data['Expiration']
+        self._expires_at = _parse_expiration(self._expiration)
         self._security_token = data['Token']
+        self._signing_keys.clear()
+        self._schedule_refresh_ahead()
+
+    def _cache_credentials(self, data):
+        """Write the temporary credentials to the cache file, if enabled,
+        replacing the file atomically so that other processes never read a
+        partially written file.
+
+        :param dict data: The credentials to cache
+
+        """
+        if not self._cache_dir:
+            return
+        try:
+            os.makedirs(self._cache_dir, mode=0o700, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(
+                dir=self._cache_dir, prefix='.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as handle:
+                    json.dump({key: data[key]
+                               for key in CACHED_CREDENTIAL_KEYS}, handle)
+                os.replace(temp_path, self._cache_path())
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except (KeyError, OSError, TypeError) as error:
+            LOGGER.warning('Error caching credentials: %s', error)
+
+    def _cache_path(self):
+        """Return the path of the credentials cache file, named for the
+        role of the provider or the profile.
+
+        :rtype: str
+
+        """
+        key = getattr(self._provider, 'cache_key', None) or self._profile
+        return path.join(self._cache_dir, '{}.json'.format(
+            hashlib.sha1(key.encode('utf-8')).hexdigest()))
+
+    def _cancel_refresh_ahead(self):
+        """Cancel the scheduled background refresh, if any."""
+        if self._refresh_timeout is not None:
+            self._ioloop.remove_timeout(self._refresh_timeout)
+            self._refresh_timeout = None
 
     def _fetch_credentials(self):
-        """Fetch credential information from the local EC2 Metadata and user
-        data API.
+        """Fetch credential information from the provider, the container
+        credentials endpoint, if configured, or the local EC2 Metadata and
+        user data API.
 
         :rtype: dict
 
         """
         if self._is_async:
             return self._fetch_credentials_async()
+        if self._provider is not None:
+            return self._provider.fetch_credentials()
+        container_request = _container_credentials_request()
+        if container_request:
+            return self._get_container_credentials(*container_request)
         role = self._get_role()
         credentials = self._get_instance_credentials(role)
         return credentials
 
-    def _fetch_credentials_async(self):
-        """Return the credentials from the EC2 Instance Metadata and user data
-        API using an Async adapter.
+    async def _fetch_credentials_async(self):
+        """Return the credentials from the provider, the container
+        credentials endpoint or the EC2 Instance Metadata and user data API
+        using an Async adapter.
 
-        :return: :class:`~concurrent.Future`
+        :rtype: dict
+        :raises: tornado.httpclient.HTTPError
 
         """
-        future = concurrent.Future()
+        if self._provider is not None:
+            return await self._provider.fetch_credentials()
+        container_request = _container_credentials_request()
+        if container_request:
+            return await self._get_container_credentials_async(
+                *container_request)
+        role = await self._get_role_async()
+        return await self._get_instance_credentials_async(role)
+
+    def _get_container_credentials(self, url, headers):
+        """Get temporary credentials from the ECS or EKS container
+        credentials endpoint.
+
+        :param str url: The container credentials URL
+        :param dict headers: The request headers
+        :rtype: dict
+        :raises: tornado.httpclient.HTTPError
 
-        def on_credentials(response):
-            if not self._future_exception(response, future):
-                result = response.result()
-                future.set_result(result)
+        """
+        response = self._client.fetch(url, headers=headers,
+                                      connect_timeout=HTTP_TIMEOUT,
+                                      request_timeout=CONTAINER_TIMEOUT)
+        return json.loads(response.body.decode('utf-8'))
 
-        def on_role(response):
-            if not self._future_exception(response, future):
-                req = self._get_instance_credentials_async(response.result())
-                self._ioloop.add_future(req, on_credentials)
+    async def _get_container_credentials_async(self, url, headers):
+        """Get temporary credentials from the ECS or EKS container
+        credentials endpoint.
 
-        request = self._get_role_async()
-        self._ioloop.add_future(request, on_role)
-        return future
+        :param str url: The container credentials URL
+        :param dict headers: The request headers
+        :rtype: dict
+        :raises: tornado.httpclient.HTTPError
 
-    @staticmethod
-    def _future_exception(inner, outer):
-        exception = inner.exception()
-        if exception:
-            outer.set_exception(exception)
-        return bool(exception)
+        """
+        response = await self._client.fetch(
+            url, headers=headers, connect_timeout=HTTP_TIMEOUT,
+            request_timeout=CONTAINER_TIMEOUT)
+        return json.loads(response.body.decode('utf-8'))
 
     def _get_config_value(self, config, key):
         """Return the config value for the key, if it exists, checking both
@@ -322,34 +843,57 @@ class Authorization(object):
 
         """
         url_path = INSTANCE_CREDENTIALS_PATH.format(role)
-        response = self._client.fetch(INSTANCE_ENDPOINT.format(url_path),
-                                      connect_timeout=HTTP_TIMEOUT,
-                                      request_timeout=HTTP_TIMEOUT)
+        response = self._client.fetch(
+            INSTANCE_ENDPOINT.format(url_path),
+            headers=_instance_headers(self._get_instance_token()),
+            connect_timeout=HTTP_TIMEOUT, request_timeout=HTTP_TIMEOUT)
         return json.loads(response.body.decode('utf-8'))
 
-    def _get_instance_credentials_async(self, role):
+    async def _get_instance_credentials_async(self, role):
         """Attempt to get temporary credentials for the specified role from the
         EC2 Instance Metadata and user data API
 
         :param str role: The role to get temporary credentials for
 
-        :rtype: :class:`~tornado.concurrent.Future`
+        :rtype: dict
         :raises: tornado.httpclient.HTTPError
 
         """
-        future = concurrent.Future()
+        url_path = INSTANCE_CREDENTIALS_PATH.format(role)
+        token = await self._get_instance_token_async()
+        response = await self._client.fetch(
+            INSTANCE_ENDPOINT.format(url_path),
+            headers=_instance_headers(token),
+            connect_timeout=HTTP_TIMEOUT, request_timeout=HTTP_TIMEOUT)
+        return json.loads(response.body.decode('utf-8'))
 
-        def on_response(response):
-            if not self._future_exception(response, future):
-                body = response.result().body
-                future.set_result(json.loads(body.decode('utf-8')))
+    def _get_instance_token(self):
+        """Return the cached IMDSv2 session token or request a new one,
+        returning ``None`` to fall back to IMDSv1 if it can not be retrieved.
 
-        url_path = INSTANCE_CREDENTIALS_PATH.format(role)
-        result = self._client.fetch(INSTANCE_ENDPOINT.format(url_path),
-                                    connect_timeout=HTTP_TIMEOUT,
-                                    request_timeout=HTTP_TIMEOUT)
-        self._ioloop.add_future(result, on_response)
-        return future
+        :rtype: str or None
+
+        """
+        token = _cached_instance_token()
+        if token:
+            return token
+        try:
+            response = self._client.fetch(
+                INSTANCE_ENDPOINT.format(INSTANCE_TOKEN_PATH),
+                **_instance_token_request())
+        except (httpclient.HTTPError, OSError) as error:
+            LOGGER.debug('Falling back to IMDSv1: %s', error)
+            return None
+        return _cache_instance_token(response.body.decode('utf-8'))
+
+    async def _get_instance_token_async(self):
+        """Return the cached IMDSv2 session token or request a new one,
+        returning ``None`` to fall back to IMDSv1 if it can not be retrieved.
+
+        :rtype: str or None
+
+        """
+        return await _request_instance_token_async(self._client)
 
     def _get_role(self):
         """Fetch the IAM role from the ECS Metadata and user data API
@@ -359,31 +903,162 @@ class Authorization(object):
 
         """
         url = INSTANCE_ENDPOINT.format(INSTANCE_ROLE_PATH)
-        response = self._client.fetch(url,
-                                      connect_timeout=HTTP_TIMEOUT,
-                                      request_timeout=HTTP_TIMEOUT)
+        response = self._client.fetch(
+            url, headers=_instance_headers(self._get_instance_token()),
+            connect_timeout=HTTP_TIMEOUT, request_timeout=HTTP_TIMEOUT)
         return response.body.decode('utf-8')
 
-    def _get_role_async(self):
+    async def _get_role_async(self):
         """Fetch the IAM role from the ECS Metadata and user data API
 
-        :rtype: :class:`~tornado.concurrent.Future`
+        :rtype: str
         :raises: tornado.httpclient.HTTPError
 
         """
-        future = concurrent.Future()
+        url = INSTANCE_ENDPOINT.format(INSTANCE_ROLE_PATH)
+        token = await self._get_instance_token_async()
+        response = await self._client.fetch(
+            url, headers=_instance_headers(token),
+            connect_timeout=HTTP_TIMEOUT, request_timeout=HTTP_TIMEOUT)
+        return response.body.decode('utf-8')
 
-        def on_response(response):
-            if not self._future_exception(response, future):
-                role = response.result()
-                future.set_result(role.body.decode('utf-8'))
+    def _load_cached_credentials(self, started=None):
+        """Assign the credentials in the cache file if they have not expired.
 
-        url = INSTANCE_ENDPOINT.format(INSTANCE_ROLE_PATH)
-        request = self._client.fetch(url,
-                                     connect_timeout=HTTP_TIMEOUT,
-                                     request_timeout=HTTP_TIMEOUT)
-        self._ioloop.add_future(request, on_response)
-        return future
+        When ``started`` is specified, credentials that were cached before
+        then are only assigned if they differ from the current credentials
+        or the current credentials have expired.
+
+        :param float started: When the refresh started
+        :rtype: bool
+
+        """
+        try:
+            with open(self._cache_path(), 'r') as handle:
+                modified = os.fstat(handle.fileno()).st_mtime
+                cached = json.load(handle)
+            data = {key: cached[key] for key in CACHED_CREDENTIAL_KEYS}
+            expires_at = _parse_expiration(data['Expiration'])
+        except FileNotFoundError:
+            return False
+        except (KeyError, OSError, TypeError, ValueError) as error:
+            LOGGER.warning('Error loading cached credentials: %s', error)
+            return False
+        if expires_at is None or expires_at <= time.time():
+            LOGGER.debug('Cached credentials have expired')
+            return False
+        if started is not None and modified < started and \
+                not self.needs_credentials() and \
+                data['SecretAccessKey'] == self._secret_key:
+            LOGGER.debug('Cached credentials have not been refreshed')
+            return False
+        LOGGER.debug('Using cached credentials that expire at %s',
+                     data['Expiration'])
+        self._assign_credentials(data)
+        return True
+
+    def _on_refreshed_ahead(self, future):
+        """Invoked when a background refresh completes, scheduling another
+        attempt if it failed with a transient error. A successful refresh
+        schedules the next refresh when the new credentials are assigned.
+
+        :param tornado.concurrent.Future future: The refresh future
+
+        """
+        exception = future.exception()
+        if not exception:
+            return
+        if self._closed or not isinstance(
+                exception, _REFRESH_AHEAD_RETRY_EXCEPTIONS):
+            LOGGER.error('Error refreshing credentials before they '
+                         'expire, not retrying: %s', exception)
+            return
+        LOGGER.warning('Error refreshing credentials before they '
+                       'expire: %s', exception)
+        self._refresh_timeout = self._ioloop.call_later(
+            REFRESH_MIN_INTERVAL, self._refresh_ahead)
+
+    def _refresh_ahead(self):
+        """Refresh the credentials in the background, swapping in the new
+        credentials once they have been fetched while requests continue to
+        use the current credentials.
+
+        """
+        self._refresh_timeout = None
+        LOGGER.debug('Refreshing credentials before they expire')
+        self._ioloop.add_future(self.refresh(), self._on_refreshed_ahead)
+
+    async def _refresh_async(self):
+        """Load dynamic credentials using the asynchronous client.
+
+        :rtype: bool
+        :raises: tornado_aws.exceptions.NoCredentialsError
+
+        """
+        try:
+            # Refresh config file credentials
+            if self._local_credentials:
+                return self._resolve_credentials()
+            if self._prefork:
+                return await self._refresh_prefork_async()
+            await self._update_credentials_async()
+            return True
+        finally:
+            self._refreshing = None
+
+    def _refresh_prefork(self):
+        """Load the credentials from the cache once they have been refreshed
+        by another process, or fetch them if this process takes the refresh
+        lock.
+
+        :rtype: bool
+        :raises: tornado_aws.exceptions.NoCredentialsError
+
+        """
+        started = time.time()
+        while True:
+            if self._load_cached_credentials(started):
+                return True
+            lock = self._acquire_refresh_lock()
+            if lock is not None:
+                try:
+                    if not self._load_cached_credentials(started):
+                        self._update_credentials()
+                    return True
+                finally:
+                    os.close(lock)
+            if time.time() - started >= PREFORK_WAIT:
+                LOGGER.error('Credentials were not refreshed by another '
+                             'process within %i seconds', PREFORK_WAIT)
+                raise exceptions.NoCredentialsError
+            time.sleep(PREFORK_POLL_INTERVAL)
+
+    async def _refresh_prefork_async(self):
+        """Load the credentials from the cache once they have been refreshed
+        by another process, or fetch them if this process takes the refresh
+        lock.
+
+        :rtype: bool
+        :raises: tornado_aws.exceptions.NoCredentialsError
+
+        """
+        started = time.time()
+        while True:
+            if self._load_cached_credentials(started):
+                return True
+            lock = self._acquire_refresh_lock()
+            if lock is not None:
+                try:
+                    if not self._load_cached_credentials(started):
+                        await self._update_credentials_async()
+                    return True
+                finally:
+                    os.close(lock)
+            if time.time() - started >= PREFORK_WAIT:
+                LOGGER.error('Credentials were not refreshed by another '
+                             'process within %i seconds', PREFORK_WAIT)
+                raise exceptions.NoCredentialsError
+            await gen.sleep(PREFORK_POLL_INTERVAL)
 
     def _resolve_credentials(self, access_key=None, secret_key=None,
                              security_token=None):
@@ -399,6 +1074,7 @@ class Authorization(object):
 
         """
         self._local_credentials = False
+        self._signing_keys.clear()
         self._access_key = os.getenv('AWS_ACCESS_KEY_ID', access_key)
         self._secret_key = os.getenv('AWS_SECRET_ACCESS_KEY', secret_key)
         self._security_token = os.getenv(
@@ -443,3 +1119,59 @@ class Authorization(object):
         self._local_credentials = \
             self._access_key is not None and self._secret_key is not None
         return self._local_credentials
+
+    def _schedule_refresh_ahead(self):
+        """Schedule the background refresh of temporary credentials
+        ``refresh_margin`` seconds before they expire, for asynchronous
+        clients.
+
+        """
+        self._cancel_refresh_ahead()
+        if self._closed or not self._is_async or self._expires_at is None:
+            return
+        delay = max(self._expires_at - self._refresh_margin - time.time(),
+                    REFRESH_MIN_INTERVAL)
+        LOGGER.debug('Refreshing credentials in %i seconds', delay)
+        self._refresh_timeout = self._ioloop.call_later(
+            delay, self._refresh_ahead)
+
+    def _update_credentials(self):
+        """Fetch, assign and cache new credentials.
+
+        :raises: tornado_aws.exceptions.NoCredentialsError
+
+        """
+        LOGGER.debug('Refreshing EC2 IAM Credentials')
+        try:
+            credentials = self._fetch_credentials()
+        except (httpclient.HTTPError, OSError) as error:
+            LOGGER.error('Error Fetching Credentials: %s', error)
+            if getattr(error, 'code', None) == 401:
+                _clear_instance_token()
+            raise exceptions.NoCredentialsError
+        self._assign_credentials(credentials)
+        self._cache_credentials(credentials)
+
+    async def _update_credentials_async(self):
+        """Fetch, assign and cache new credentials using the asynchronous
+        client.
+
+        :raises: tornado_aws.exceptions.NoCredentialsError
+        :raises: tornado.httpclient.HTTPError
+
+        """
+        LOGGER.debug('Refreshing EC2 IAM Credentials')
+        try:
+            credentials = await self._fetch_credentials_async()
+        except httpclient.HTTPError as error:
+            if error.code == 401:
+                _clear_instance_token()
+            if error.code == 599:
+                LOGGER.error('Error Fetching Credentials: %s', error)
+                raise exceptions.NoCredentialsError
+            raise
+        except OSError as error:
+            LOGGER.error('Error Fetching Credentials: %s', error)
+            raise exceptions.NoCredentialsError
+        self._assign_credentials(credentials)
+        self._cache_credentials(credentials)
@@ -71,6 +71,12 @@ class NoProfileError(AWSClientException):
     fmt = 'Profile ({profile}) not found ({path})'
 
 
+class RegionNotResolvedError(AWSClientException):
+    """Raised when signing without I/O before the region of a client created
+    with ``lazy_region`` has been resolved."""
+    fmt = 'The region has not been resolved'
+
+
 class RequestException(AWSClientException):
     """Raised when a request failed due to a network issue.
 
@@ -78,3 +84,12 @@ class RequestException(AWSClientException):
 
     """
     fmt = 'An error occured making a request {error}'
+
+
+class StreamingBodyError(AWSClientException):
+    """Raised when a streaming request body can not be sent.
+
+    :ivar reason: Why the body could not be sent
+
+    """
+    fmt = 'Unable to stream the request body: {reason}'
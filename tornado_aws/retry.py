@@ -0,0 +1,328 @@
+"""
+The :py:class:`RetryPolicy` is used by
+:py:class:`~tornado_aws.client.AWSClient` and
+:py:class:`~tornado_aws.client.AsyncAWSClient` to retry requests that failed
+due to throttling or a transient error, waiting between attempts using
+exponential backoff with full jitter.
+
+The :py:class:`AdaptiveRateLimiter` limits the rate that a client sends
+requests at once AWS starts throttling them, like the "adaptive" retry mode
+of the AWS SDKs.
+
+"""
+import logging
+import math
+import random
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+THROTTLING_ERRORS = {
+    'BandwidthLimitExceeded',
+    'EC2ThrottledException',
+    'LimitExceededException',
+    'PriorRequestNotComplete',
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'SlowDown',
+    'ThrottledException',
+    'Throttling',
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'TransactionInProgressException'
+}
+
+TRANSIENT_ERRORS = {
+    'InternalError',
+    'InternalFailure',
+    'InternalServerError',
+    'RequestTimeout',
+    'RequestTimeoutException',
+    'ServiceUnavailable'
+}
+
+THROTTLING_STATUS_CODES = {429}
+
+TRANSIENT_STATUS_CODES = {500, 502, 503, 504}
+
+CONNECTION_ERROR = 599
+
+
+def is_throttling_error(error_type, status_code=None):
+    """Returns ``True`` if the AWS error type or HTTP status code indicates
+    the request was throttled.
+
+    :param str error_type: The AWS error type or code
+    :param int status_code: The HTTP status code of the response, if known
+    :rtype: bool
+
+    """
+    return (error_type in THROTTLING_ERRORS or
+            status_code in THROTTLING_STATUS_CODES)
+
+
+class RetryPolicy(object):
+    """Decides if a failed request should be retried and how long to wait
+    before retrying it.
+
+    Requests are attempted at most ``max_attempts`` times, waiting a random
+    amount of time between zero and ``base_delay * 2 ** attempt`` seconds,
+    capped at ``max_delay``, between attempts.
+
+    Each retry is paid for from a retry budget of ``budget`` tokens, costing
+    ``retry_cost`` tokens or ``connection_error_cost`` tokens when the request
+    could not be sent or timed out. Once the budget is exhausted, failed
+    requests are no longer retried until successful requests have refilled
+    it, preventing retries from amplifying an outage. A successful request
+    returns the cost of its retry to the budget, or ``success_increment``
+    tokens if it was not retried.
+
+    A policy holds the budget for the client it is passed to, so each client
+    should be given its own instance.
+
+    :param int max_attempts: The maximum number of attempts per request
+    :param float base_delay: The base delay in seconds for backing off
+    :param float max_delay: The maximum delay in seconds between attempts
+    :param int budget: The size of the retry budget
+    :param int retry_cost: The budget cost of retrying an error response
+    :param int connection_error_cost: The budget cost of retrying a
+        connection error or timeout
+    :param int success_increment: The budget returned by a successful
+        request that was not retried
+
+    """
+    def __init__(self, max_attempts=3, base_delay=0.1, max_delay=20.0,
+                 budget=500, retry_cost=5, connection_error_cost=10,
+                 success_increment=1):
+        if max_attempts < 1:
+            raise ValueError('max_attempts must be at least 1')
+        self._base_delay = base_delay
+        self._budget = budget
+        self._connection_error_cost = connection_error_cost
+        self._max_attempts = max_attempts
+        self._max_delay = max_delay
+        self._retry_cost = retry_cost
+        self._success_increment = success_increment
+        self._tokens = budget
+
+    @property
+    def available(self):
+        """Return the number of tokens remaining in the retry budget.
+
+        :rtype: int
+
+        """
+        return self._tokens
+
+    @property
+    def max_attempts(self):
+        """Return the maximum number of attempts per request.
+
+        :rtype: int
+
+        """
+        return self._max_attempts
+
+    def backoff(self, attempt):
+        """Return the full jitter delay in seconds to wait after the
+        specified attempt.
+
+        :param int attempt: The attempt that failed, starting at 1
+        :rtype: float
+
+        """
+        return random.uniform(
+            0, min(self._max_delay, self._base_delay * 2 ** attempt))
+
+    @staticmethod
+    def is_retryable(status_code, error_type=None):
+        """Returns ``True`` if a request that failed with the HTTP status code
+        and AWS error type may succeed if retried.
+
+        :param int status_code: The HTTP status code of the response
+        :param str error_type: The AWS error type or code, if known
+        :rtype: bool
+
+        """
+        return (status_code == CONNECTION_ERROR or
+                status_code in TRANSIENT_STATUS_CODES or
+                is_throttling_error(error_type, status_code) or
+                error_type in TRANSIENT_ERRORS)
+
+    def retry_delay(self, attempt, status_code, error_type=None):
+        """Returns the number of seconds to wait before retrying a request
+        that failed on the specified attempt, deducting the cost of the retry
+        from the budget, or ``None`` if it should not be retried.
+
+        :param int attempt: The attempt that failed, starting at 1
+        :param int status_code: The HTTP status code of the response
+        :param str error_type: The AWS error type or code, if known
+        :rtype: float or None
+
+        """
+        if attempt >= self._max_attempts or \
+                not self.is_retryable(status_code, error_type):
+            return None
+        cost = (self._connection_error_cost
+                if status_code == CONNECTION_ERROR else self._retry_cost)
+        if cost > self._tokens:
+            LOGGER.warning('Retry budget exhausted, not retrying %s (%s)',
+                           status_code, error_type)
+            return None
+        self._tokens -= cost
+        return self.backoff(attempt)
+
+    def succeeded(self, retried=False):
+        """Return tokens to the retry budget after a successful request.
+
+        :param bool retried: The request succeeded after being retried
+
+        """
+        self._tokens = min(
+            self._budget, self._tokens +
+            (self._retry_cost if retried else self._success_increment))
+
+
+class AdaptiveRateLimiter(object):
+    """Client side token bucket rate limiter that is driven by throttling
+    responses.
+
+    The limiter does not delay requests until the first throttling error
+    is received. From then on, requests are sent at most at the current
+    rate, which is reduced by a factor of ``beta`` for each throttling error
+    and recovers following a cubic curve as requests succeed, as in the
+    CUBIC congestion control algorithm. The rate is also kept to at most
+    twice the measured rate that responses are being received at.
+
+    :param float beta: The factor to reduce the rate by when throttled
+    :param float scale_constant: Scales how quickly the rate recovers
+    :param float smoothing: The weight of the most recent measurement of
+        the response rate
+    :param float min_rate: The minimum rate in requests per second
+
+    """
+    def __init__(self, beta=0.7, scale_constant=0.4, smoothing=0.8,
+                 min_rate=0.5):
+        self._beta = beta
+        self._capacity = 1.0
+        self._enabled = False
+        self._inflection = 0.0
+        self._last_max_rate = 0.0
+        self._last_refill = None
+        self._last_throttle = time.monotonic()
+        self._measured_rate = 0.0
+        self._measurement_start = self._measurement_bucket(
+            self._last_throttle)
+        self._min_rate = min_rate
+        self._rate = None
+        self._responses = 0
+        self._scale_constant = scale_constant
+        self._smoothing = smoothing
+        self._tokens = 0.0
+
+    @property
+    def state(self):
+        """Return the current state of the rate limiter, for reporting.
+
+        - ``enabled``: Requests are being rate limited
+        - ``rate``: The allowed rate in requests per second
+        - ``measured_rate``: The measured response rate per second
+        - ``last_max_rate``: The rate when last throttled
+        - ``tokens``: The tokens in the bucket, negative when requests are
+          waiting for tokens
+
+        :rtype: dict
+
+        """
+        return {
+            'enabled': self._enabled,
+            'rate': self._rate,
+            'measured_rate': self._measured_rate,
+            'last_max_rate': self._last_max_rate,
+            'tokens': self._tokens
+        }
+
+    def delay(self):
+        """Take a token for sending a request, returning the number of
+        seconds to wait before sending it.
+
+        :rtype: float
+
+        """
+        if not self._enabled:
+            return 0.0
+        self._refill(time.monotonic())
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self._rate
+
+    def update(self, throttled):
+        """Update the allowed rate after a response is received.
+
+        :param bool throttled: The request was throttled
+
+        """
+        now = time.monotonic()
+        self._measure(now)
+        if throttled:
+            rate = self._measured_rate
+            if self._enabled:
+                rate = min(rate, self._rate)
+            self._last_max_rate = rate
+            self._inflection = (
+                rate * (1 - self._beta) / self._scale_constant) ** (1 / 3)
+            self._last_throttle = now
+            self._enabled = True
+            rate *= self._beta
+        elif self._enabled:
+            rate = (self._scale_constant *
+                    (now - self._last_throttle - self._inflection) ** 3 +
+                    self._last_max_rate)
+        else:
+            return
+        self._refill(now)
+        self._rate = max(min(rate, 2 * self._measured_rate), self._min_rate)
+        self._capacity = max(self._rate, 1.0)
+        self._tokens = min(self._tokens, self._capacity)
+
+    def _measure(self, now):
+        """Update the smoothed response rate, measured in half second
+        intervals.
+
+        :param float now: The current monotonic time
+
+        """
+        self._responses += 1
+        bucket = self._measurement_bucket(now)
+        if bucket > self._measurement_start:
+            rate = self._responses / (bucket - self._measurement_start)
+            self._measured_rate = (rate * self._smoothing +
+                                   self._measured_rate *
+                                   (1 - self._smoothing))
+            self._measurement_start = bucket
+            self._responses = 0
+
+    @staticmethod
+    def _measurement_bucket(now):
+        """Return the start of the half second interval for the time.
+
+        :param float now: The current monotonic time
+        :rtype: float
+
+        """
+        return math.floor(now * 2) / 2
+
+    def _refill(self, now):
+        """Add the tokens accumulated since the last refill to the bucket.
+
+        :param float now: The current monotonic time
+
+        """
+        if self._last_refill is not None and self._rate is not None:
+            self._tokens = min(
+                self._capacity,
+                self._tokens + (now - self._last_refill) * self._rate)
+        self._last_refill = now
@@ -0,0 +1,806 @@
+"""
+Higher level Amazon S3 operations that are built on top of
+:py:class:`~tornado_aws.client.AsyncAWSClient`, using its request signing,
+error handling and retry policy:
+
+.. code-block:: python
+
+    s3 = tornado_aws.AsyncAWSClient('s3')
+    uploader = tornado_aws.s3.MultipartUploader(s3, concurrency=8)
+    with open('artifact.tar.gz', 'rb') as handle:
+        etag = await uploader.upload('bucket', 'artifact.tar.gz', handle)
+
+    downloader = tornado_aws.s3.RangedDownloader(s3, concurrency=8)
+    with open('artifact.tar.gz', 'wb') as handle:
+        await downloader.download('bucket', 'artifact.tar.gz', handle)
+
+    async for entry in tornado_aws.s3.list_objects(s3, 'bucket', 'logs/'):
+        print(entry['Key'], entry['Size'])
+
+Objects are addressed using path-style ``/bucket/key`` requests.
+
+"""
+import logging
+import math
+import os
+from urllib import parse
+from xml.etree import ElementTree
+from xml.sax import saxutils
+
+from tornado import gen, ioloop, locks, queues
+
+from tornado_aws import exceptions, retry
+
+LOGGER = logging.getLogger(__name__)
+
+
+class _Transfer(object):
+    """Base class for transferring objects in parts of ``part_size`` bytes,
+    transferring up to ``concurrency`` parts at a time.
+
+    When the client has a retry policy, the client owns retrying the
+    requests for each part. A part is only transferred again for failures
+    that the client can not retry, such as a response that fails after part
+    of its body was received, and the client's policy decides if it is, so
+    that each failure is retried once from a single retry budget. Without a
+    retry policy, a failed part is retried up to ``part_attempts`` times.
+
+    :param client: The S3 client
+    :type client: tornado_aws.client.AsyncAWSClient
+    :param int part_size: The size of each part in bytes
+    :param int concurrency: The maximum number of parts to transfer at once
+    :param int part_attempts: The maximum number of attempts per part when
+        the client does not have a retry policy
+    :raises: ValueError
+
+    """
+    MIN_PART_SIZE = 1
+
+    def __init__(self, client, part_size=8388608, concurrency=4,
+                 part_attempts=3):
+        if part_size < self.MIN_PART_SIZE:
+            raise ValueError('part_size must be at least {} bytes'.format(
+                self.MIN_PART_SIZE))
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+        self._client = client
+        self._concurrency = concurrency
+        self._part_size = part_size
+        self._client_retries = client.retry_policy is not None
+        self._retry_policy = client.retry_policy or retry.RetryPolicy(
+            max_attempts=part_attempts)
+
+    async def _retry(self, description, transfer):
+        """Transfer a part, retrying it if it fails with a retryable error
+        that the client did not already retry, and return the result of the
+        transfer. The transfer raises :class:`_PartError` for failures that
+        the client can not retry.
+
+        :param str description: The part, for logging
+        :param callable transfer: Returns a coroutine that transfers the part
+        :raises: :class:`~tornado_aws.exceptions.AWSError`
+        :raises: :class:`~tornado_aws.exceptions.RequestException`
+
+        """
+        attempt = 1
+        while True:
+            try:
+                result = await transfer()
+            except (exceptions.AWSError, exceptions.RequestException,
+                    _PartError) as error:
+                if isinstance(error, _PartError):
+                    error = error.error
+                elif self._client_retries:
+                    raise
+                delay = self._retry_policy.retry_delay(
+                    attempt, *_retry_status(error))
+                if delay is None:
+                    raise error from None
+                LOGGER.warning('Retrying %s in %.2f seconds: %s',
+                               description, delay, error)
+                await gen.sleep(delay)
+                attempt += 1
+            else:
+                # The client has already returned the budget for the request
+                if attempt > 1 or not self._client_retries:
+                    self._retry_policy.succeeded(attempt > 1)
+                return result
+
+
+class _PartError(Exception):
+    """Raised when transferring a part fails in a way that the client can
+    not retry.
+
+    :param error: The error for the failed part
+    :type error: tornado_aws.exceptions.AWSError or
+        tornado_aws.exceptions.RequestException
+
+    """
+    def __init__(self, error):
+        super(_PartError, self).__init__(error)
+        self.error = error
+
+
+class MultipartUploader(_Transfer):
+    """Upload objects using the S3 multipart upload API, uploading up to
+    ``concurrency`` parts of ``part_size`` bytes at a time.
+
+    The body is read one part at a time as parts are uploaded, so at most
+    ``concurrency`` parts are held in memory regardless of the size of the
+    object. A part that fails due to a connection error, throttling or a
+    transient error is retried by the client's retry policy, or up to
+    ``part_attempts`` times if the client does not have one. If the upload
+    fails, it is aborted so that the uploaded parts are not stored.
+
+    The part size is increased if needed to upload a body of known size in
+    at most ``MAX_PARTS`` parts.
+
+    :param client: The S3 client
+    :type client: tornado_aws.client.AsyncAWSClient
+    :param int part_size: The size of each part in bytes
+    :param int concurrency: The maximum number of parts to upload at once
+    :param int part_attempts: The maximum number of attempts per part when
+        the client does not have a retry policy
+    :raises: ValueError
+
+    """
+    MAX_PARTS = 10000
+    MIN_PART_SIZE = 5242880
+
+    async def upload(self, bucket, key, body, headers=None):
+        """Upload the body to the object, returning the ETag of the object.
+
+        The ``headers`` are sent when creating the multipart upload, for
+        example to set the ``Content-Type`` or ``x-amz-storage-class`` of
+        the object.
+
+        :param str bucket: The bucket to upload to
+        :param str key: The key of the object
+        :param body: The object body
+        :type body: bytes or bytes-like object or file or async iterator
+        :param dict headers: The headers for creating the upload
+        :rtype: str
+        :raises: :class:`~tornado_aws.exceptions.AWSError`
+        :raises: :class:`~tornado_aws.exceptions.RequestException`
+        :raises: ValueError
+
+        """
+        path = _object_path(bucket, key)
+        response = await self._client.fetch(
+            'POST', path, {'uploads': ''}, headers, b'')
+        upload_id = _find_text(response.body, 'UploadId')
+        LOGGER.debug('Created multipart upload %s for %s', upload_id, path)
+        try:
+            parts = await self._upload_parts(path, upload_id, body)
+            response = await self._client.fetch(
+                'POST', path, {'uploadId': upload_id},
+                {'Content-Type': 'application/xml'},
+                _complete_body(parts))
+            # S3 may report errors completing the upload in a 200 response
+            if _root_tag(response.body) == 'Error':
+                raise self._client.xml_error(response.body)
+        except Exception:
+            await self._abort(path, upload_id)
+            raise
+        return _find_text(response.body, 'ETag')
+
+    async def _abort(self, path, upload_id):
+        """Abort the multipart upload, logging any error.
+
+        :param str path: The object path
+        :param str upload_id: The multipart upload ID
+
+        """
+        LOGGER.info('Aborting multipart upload %s for %s', upload_id, path)
+        try:
+            await self._client.fetch(
+                'DELETE', path, {'uploadId': upload_id})
+        except (exceptions.AWSClientException, OSError) as error:
+            LOGGER.error('Error aborting multipart upload %s: %s',
+                         upload_id, error)
+
+    def _part_size_for(self, body):
+        """Return the part size for the body, increased if needed to upload
+        a body of known size in at most ``MAX_PARTS`` parts.
+
+        :param body: The object body
+        :rtype: int
+
+        """
+        if hasattr(body, 'fileno'):
+            try:
+                size = os.fstat(body.fileno()).st_size - body.tell()
+            except (OSError, ValueError):
+                return self._part_size
+        elif hasattr(body, 'read') or hasattr(body, '__aiter__'):
+            return self._part_size
+        else:
+            size = memoryview(body).nbytes
+        return max(self._part_size, math.ceil(size / self.MAX_PARTS))
+
+    async def _read_parts(self, body):
+        """Read the body in parts, yielding the part number and data of
+        each part. At least one part is always yielded.
+
+        :param body: The object body
+        :type body: bytes or bytes-like object or file or async iterator
+        :rtype: async iterator of (int, bytes)
+        :raises: ValueError
+
+        """
+        part_size, number = self._part_size_for(body), 0
+        if hasattr(body, 'read'):
+            parts = iter(lambda: body.read(part_size), b'')
+        elif hasattr(body, '__aiter__'):
+            parts = None
+        else:
+            view = memoryview(body).cast('B')
+            parts = (view[offset:offset + part_size]
+                     for offset in range(0, len(view), part_size))
+        if parts is None:
+            buffer = bytearray()
+            async for data in body:
+                buffer += data
+                while len(buffer) >= part_size:
+                    number += 1
+                    yield number, bytes(buffer[:part_size])
+                    del buffer[:part_size]
+            parts = [bytes(buffer)] if buffer else []
+        for data in parts:
+            number += 1
+            yield number, data
+        if not number:
+            yield 1, b''
+
+    async def _upload_part(self, path, upload_id, number, data, semaphore):
+        """Upload the part, retrying it if it fails with a retryable error,
+        and release the semaphore once done. Returns the ETag of the part.
+
+        :param str path: The object path
+        :param str upload_id: The multipart upload ID
+        :param int number: The part number
+        :param bytes data: The part data
+        :param tornado.locks.Semaphore semaphore: The concurrency semaphore
+        :rtype: str
+
+        """
+        try:
+            response = await self._retry(
+                'part {} of {}'.format(number, path),
+                lambda: self._client.fetch(
+                    'PUT', path,
+                    {'partNumber': str(number), 'uploadId': upload_id},
+                    body=data))
+            return response.headers['ETag']
+        finally:
+            semaphore.release()
+
+    async def _upload_parts(self, path, upload_id, body):
+        """Upload the parts of the body with bounded concurrency, returning
+        the part numbers and ETags of the uploaded parts.
+
+        :param str path: The object path
+        :param str upload_id: The multipart upload ID
+        :param body: The object body
+        :rtype: list of (int, str)
+        :raises: ValueError
+
+        """
+        semaphore = locks.Semaphore(self._concurrency)
+        futures = []
+        try:
+            async for number, data in self._read_parts(body):
+                if number > self.MAX_PARTS:
+                    raise ValueError(
+                        'Body exceeds {} parts of {} bytes'.format(
+                            self.MAX_PARTS, self._part_size))
+                await semaphore.acquire()
+                if any(future.done() and future.exception()
+                       for future in futures):
+                    semaphore.release()
+                    break
+                futures.append(gen.convert_yielded(self._upload_part(
+                    path, upload_id, number, data, semaphore)))
+        except Exception:
+            # Wait for the parts being uploaded before aborting the upload
+            try:
+                await _gather(futures)
+            except Exception as error:
+                LOGGER.debug('Part upload failed: %s', error)
+            raise
+        etags = await _gather(futures)
+        return list(zip(range(1, len(etags) + 1), etags))
+
+
+class RangedDownloader(_Transfer):
+    """Download objects using concurrent ``Range`` requests for up to
+    ``concurrency`` parts of ``part_size`` bytes at a time, writing each
+    part to its offset in the target as it is received.
+
+    The object is requested with ``If-Match`` set to the ETag returned when
+    the download started, so the download fails with a ``PreconditionFailed``
+    :class:`~tornado_aws.exceptions.AWSError` if the object changes while it
+    is downloaded. A part that fails due to a connection error, throttling
+    or a transient error is retried by the client's retry policy, or up to
+    ``part_attempts`` times if the client does not have one. A part that
+    fails once its body has started to be received, which the client can
+    not retry, is downloaded again if the client's retry policy allows it.
+
+    :param client: The S3 client
+    :type client: tornado_aws.client.AsyncAWSClient
+    :param int part_size: The size of each part in bytes
+    :param int concurrency: The maximum number of parts to download at once
+    :param int part_attempts: The maximum number of attempts per part when
+        the client does not have a retry policy
+    :raises: ValueError
+
+    """
+    async def download(self, bucket, key, target, headers=None):
+        """Download the object into the target, returning the size of the
+        object.
+
+        A file is written from its current position and truncated to the
+        end of the object. A buffer, such as a :py:class:`bytearray` or
+        :py:class:`mmap.mmap`, must be writable and at least the size of
+        the object. The ``headers`` are sent with each request, for example
+        to specify server-side encryption customer keys.
+
+        :param str bucket: The bucket to download from
+        :param str key: The key of the object
+        :param target: The file or buffer to write the object to
+        :type target: file or writable bytes-like object
+        :param dict headers: Additional request headers
+        :rtype: int
+        :raises: :class:`~tornado_aws.exceptions.AWSError`
+        :raises: :class:`~tornado_aws.exceptions.RequestException`
+        :raises: ValueError
+
+        """
+        path = _object_path(bucket, key)
+        response = await self._client.fetch('HEAD', path, headers=headers)
+        etag = response.headers['ETag']
+        size = int(response.headers['Content-Length'])
+        writer = _OffsetWriter(target, size)
+        semaphore = locks.Semaphore(self._concurrency)
+        futures = []
+        for offset in range(0, size, self._part_size):
+            await semaphore.acquire()
+            if any(future.done() and future.exception()
+                   for future in futures):
+                semaphore.release()
+                break
+            futures.append(gen.convert_yielded(self._download_part(
+                path, etag, offset, min(self._part_size, size - offset),
+                writer, headers, semaphore)))
+        await _gather(futures)
+        writer.finish()
+        return size
+
+    async def _download_part(self, path, etag, offset, length, writer,
+                             headers, semaphore):
+        """Download the part, retrying it if it fails with a retryable
+        error, and release the semaphore once done.
+
+        :param str path: The object path
+        :param str etag: The ETag of the object
+        :param int offset: The offset of the part in the object
+        :param int length: The length of the part
+        :param _OffsetWriter writer: Writes the part to the target
+        :param dict headers: Additional request headers
+        :param tornado.locks.Semaphore semaphore: The concurrency semaphore
+
+        """
+        headers = dict(headers or {})
+        headers.update({'If-Match': etag, 'Range': 'bytes={}-{}'.format(
+            offset, offset + length - 1)})
+
+        async def transfer():
+            received = 0
+
+            def on_chunk(chunk):
+                nonlocal received
+                if received < length:
+                    writer.write(offset + received, chunk[:length - received])
+                received += len(chunk)
+
+            try:
+                response = await self._client.fetch(
+                    'GET', path, headers=headers, streaming_callback=on_chunk)
+            except (exceptions.AWSError,
+                    exceptions.RequestException) as error:
+                # Responses are not retried once their body is streamed
+                if received:
+                    raise _PartError(error)
+                raise
+            if response.headers.get('ETag') != etag:
+                raise _PartError(exceptions.AWSError(
+                    type='PreconditionFailed',
+                    message='{} changed during the download'.format(path)))
+            if received != length:
+                raise _PartError(exceptions.RequestException(error=ValueError(
+                    'Received {} of {} bytes for bytes {}'.format(
+                        received, length, headers['Range'][6:]))))
+
+        try:
+            await self._retry('bytes {}-{} of {}'.format(
+                offset, offset + length - 1, path), transfer)
+        finally:
+            semaphore.release()
+
+
+class _OffsetWriter(object):
+    """Write data at offsets in the file or buffer that an object of
+    ``size`` bytes is downloaded into. Files are written using
+    :py:func:`os.pwrite` when possible, extending them to the end of the
+    object first.
+
+    :param target: The file or buffer to write to
+    :type target: file or writable bytes-like object
+    :param int size: The size of the object
+    :raises: ValueError
+
+    """
+    def __init__(self, target, size):
+        self._fd, self._size, self._target = None, size, target
+        try:
+            self._view = memoryview(target).cast('B')
+        except TypeError:
+            self._view = None
+        if self._view is not None:
+            if self._view.readonly:
+                raise ValueError('The buffer is read-only')
+            if self._view.nbytes < size:
+                raise ValueError('The buffer is smaller than the object '
+                                 '({} bytes)'.format(size))
+            return
+        self._base = target.tell()
+        if hasattr(os, 'pwrite'):
+            try:
+                self._fd = target.fileno()
+            except (OSError, ValueError):
+                return
+            target.flush()
+            os.ftruncate(self._fd, self._base + size)
+
+    def finish(self):
+        """Move the position of a file to the end of the object, truncating
+        it if it was not extended before it was written to.
+
+        """
+        if self._view is None:
+            if self._fd is None:
+                self._target.truncate(self._base + self._size)
+            self._target.seek(self._base + self._size)
+
+    def write(self, offset, data):
+        """Write the data at the offset in the object.
+
+        :param int offset: The offset in the object
+        :param bytes data: The data to write
+
+        """
+        if self._view is not None:
+            self._view[offset:offset + len(data)] = data
+        elif self._fd is not None:
+            view, position = memoryview(data), self._base + offset
+            while view:
+                written = os.pwrite(self._fd, view, position)
+                view, position = view[written:], position + written
+        else:
+            self._target.seek(self._base + offset)
+            self._target.write(data)
+
+
+class _ListingPage(object):
+    """Request a page of a ``ListObjectsV2`` listing, parsing the objects
+    and common prefixes in the response incrementally as it is received and
+    adding them to the ``entries`` queue, which ends with ``None``. Once
+    :py:meth:`prefetch` is invoked, the next page is requested as soon as
+    its continuation token is parsed, as ``following``.
+
+    :param client: The S3 client
+    :type client: tornado_aws.client.AsyncAWSClient
+    :param str path: The bucket path
+    :param dict query_args: The request query arguments
+
+    """
+    def __init__(self, client, path, query_args):
+        self.entries = queues.Queue()
+        self.following = None
+        self.token = None
+        self._client = client
+        self._closed = False
+        self._depth = 0
+        self._prefetch = False
+        self._parser = ElementTree.XMLPullParser(('start', 'end'))
+        self._path = path
+        self._query_args = query_args
+        self._root = None
+        self._future = gen.convert_yielded(client.fetch(
+            'GET', path, query_args, streaming_callback=self._on_chunk))
+        ioloop.IOLoop.current().add_future(
+            self._future, lambda _future: self.entries.put_nowait(None))
+
+    async def close(self):
+        """Stop reading the response if the request is in progress."""
+        self._closed = True
+        try:
+            await self._future
+        except Exception as error:
+            LOGGER.debug('Closed listing response: %s', error)
+
+    def prefetch(self):
+        """Request the next page as soon as its continuation token has been
+        parsed.
+
+        """
+        self._prefetch = True
+        self._request_following()
+
+    def result(self):
+        """Raise the error if the request failed, or if the response is not
+        a complete XML document.
+
+        :raises: :class:`~tornado_aws.exceptions.AWSError`
+        :raises: :class:`~tornado_aws.exceptions.RequestException`
+        :raises: ValueError
+
+        """
+        self._future.result()
+        try:
+            self._parser.close()
+        except ElementTree.ParseError as error:
+            raise ValueError(str(error))
+        self._read_events()
+
+    def _on_chunk(self, chunk):
+        """Parse the chunk of the response body.
+
+        :param bytes chunk: The chunk of the response body
+        :raises: _ListingClosed
+
+        """
+        if self._closed:
+            raise _ListingClosed()
+        self._parser.feed(chunk)
+        self._read_events()
+
+    def _read_events(self):
+        """Add each object or common prefix that has been parsed to the
+        entries, removing it from the document so that it is not retained.
+
+        """
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                self._depth += 1
+                if self._root is None:
+                    self._root = element
+                continue
+            self._depth -= 1
+            if self._depth != 1:
+                continue
+            name = _local_name(element.tag)
+            if name == 'Contents':
+                self.entries.put_nowait(_object_entry(element))
+            elif name == 'CommonPrefixes':
+                self.entries.put_nowait({'Prefix': parse.unquote_plus(
+                    _child_text(element, 'Prefix'))})
+            elif name == 'NextContinuationToken':
+                self.token = element.text
+                self._request_following()
+                continue
+            else:
+                continue
+            self._root.remove(element)
+
+    def _request_following(self):
+        """Request the next page if it should be prefetched and the
+        continuation token has been parsed.
+
+        """
+        if self._prefetch and self.token and self.following is None:
+            self.following = _ListingPage(
+                self._client, self._path,
+                dict(self._query_args, **{'continuation-token': self.token}))
+
+
+class _ListingClosed(Exception):
+    """Raised from the streaming callback to close the connection when the
+    listing is closed before the page has been read."""
+
+
+async def list_objects(client, bucket, prefix=None, delimiter=None,
+                       start_after=None, max_keys=1000):
+    """List the objects in the bucket using ``ListObjectsV2``, yielding
+    each object as it is parsed from the response.
+
+    Each object is a :py:class:`dict` of the child elements of its
+    ``Contents`` element, such as ``Key``, ``LastModified``, ``ETag``,
+    ``Size`` and ``StorageClass``, with ``Size`` as an :py:class:`int`.
+    When ``delimiter`` is specified, common prefixes are yielded as a
+    :py:class:`dict` with only a ``Prefix``.
+
+    Responses are parsed incrementally, so objects are yielded before the
+    rest of the page has been received, and the next page is requested as
+    soon as its continuation token has been parsed. At most two pages are
+    held in memory.
+
+    :param client: The S3 client
+    :type client: tornado_aws.client.AsyncAWSClient
+    :param str bucket: The bucket to list
+    :param str prefix: Only list keys that begin with the prefix
+    :param str delimiter: Group keys containing the delimiter after the
+        prefix into common prefixes
+    :param str start_after: Only list keys after the key
+    :param int max_keys: The maximum number of keys per page
+    :rtype: async iterator of dict
+    :raises: :class:`~tornado_aws.exceptions.AWSError`
+    :raises: :class:`~tornado_aws.exceptions.RequestException`
+    :raises: ValueError
+
+    """
+    query_args = {'encoding-type': 'url', 'list-type': '2',
+                  'max-keys': str(max_keys)}
+    for name, value in [('delimiter', delimiter), ('prefix', prefix),
+                        ('start-after', start_after)]:
+        if value is not None:
+            query_args[name] = value
+    page = _ListingPage(client, '/{}'.format(bucket), query_args)
+    try:
+        while page is not None:
+            page.prefetch()
+            while True:
+                entry = await page.entries.get()
+                if entry is None:
+                    break
+                yield entry
+            page.result()
+            page = page.following
+    finally:
+        if page is not None:
+            await page.close()
+            if page.following is not None:
+                await page.following.close()
+
+
+def _child_text(element, name):
+    """Return the text of the child of the element with the name, ignoring
+    the XML namespace.
+
+    :param xml.etree.ElementTree.Element element: The element
+    :param str name: The name of the child
+    :rtype: str
+
+    """
+    for child in element:
+        if _local_name(child.tag) == name:
+            return child.text or ''
+    return ''
+
+
+def _complete_body(parts):
+    """Return the ``CompleteMultipartUpload`` request body for the parts.
+
+    :param list parts: The part numbers and ETags of the parts
+    :rtype: bytes
+
+    """
+    return ''.join(
+        ['<CompleteMultipartUpload>'] +
+        ['<Part><PartNumber>{}</PartNumber><ETag>{}</ETag></Part>'.format(
+            number, saxutils.escape(etag)) for number, etag in parts] +
+        ['</CompleteMultipartUpload>']).encode('utf-8')
+
+
+def _find_text(content, name):
+    """Return the text of the first element with the name in the XML
+    document, ignoring the XML namespace.
+
+    :param bytes content: The XML document
+    :param str name: The element name
+    :rtype: str
+    :raises: ValueError
+
+    """
+    try:
+        root = ElementTree.XML(content)
+    except ElementTree.ParseError as error:
+        raise ValueError(str(error))
+    for element in root.iter():
+        if _local_name(element.tag) == name:
+            return element.text or ''
+    raise ValueError('Missing {} in S3 response'.format(name))
+
+
+async def _gather(futures):
+    """Wait for all of the futures, returning their results, or raising the
+    first error once all of them are done.
+
+    :param list futures: The futures to wait for
+    :rtype: list
+
+    """
+    results, failure = [], None
+    for future in futures:
+        try:
+            results.append(await future)
+        except Exception as error:
+            if failure is None:
+                failure = error
+            else:
+                LOGGER.debug('Additional part failure: %s', error)
+    if failure is not None:
+        raise failure
+    return results
+
+
+def _local_name(tag):
+    """Return the tag without its XML namespace.
+
+    :param str tag: The element tag
+    :rtype: str
+
+    """
+    return tag.rpartition('}')[2]
+
+
+def _object_entry(element):
+    """Return the object in the ``Contents`` element of a listing.
+
+    :param xml.etree.ElementTree.Element element: The element
+    :rtype: dict
+
+    """
+    entry = {}
+    for child in element:
+        name = _local_name(child.tag)
+        if len(child):
+            entry[name] = {_local_name(value.tag): value.text or ''
+                           for value in child}
+        else:
+            entry[name] = child.text or ''
+    entry['Key'] = parse.unquote_plus(entry.get('Key', ''))
+    if 'Size' in entry:
+        entry['Size'] = int(entry['Size'])
+    return entry
+
+
+def _object_path(bucket, key):
+    """Return the path-style request path for the object.
+
+    :param str bucket: The bucket
+    :param str key: The object key
+    :rtype: str
+
+    """
+    return '/{}/{}'.format(bucket, parse.quote(key, safe='/~'))
+
+
+def _retry_status(error):
+    """Return the HTTP status code and AWS error type of a failed request
+    for the retry policy.
+
+    :param error: The error raised by the client
+    :type error: tornado_aws.exceptions.AWSError or
+        tornado_aws.exceptions.RequestException
+    :rtype: (int, str or None)
+
+    """
+    if isinstance(error, exceptions.AWSError):
+        return None, error.args[1].get('type')
+    return getattr(error.args[1].get('error'), 'code',
+                   retry.CONNECTION_ERROR), None
+
+
+def _root_tag(content):
+    """Return the name of the root element of the XML document, or ``None``
+    if it is not an XML document.
+
+    :param bytes content: The response body
+    :rtype: str or None
+
+    """
+    try:
+        return _local_name(ElementTree.XML(content).tag)
+    except ElementTree.ParseError:
+        return None
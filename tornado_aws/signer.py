@@ -0,0 +1,365 @@
+"""
+The :py:class:`Signer` implements `AWS Signature Version 4
+<https://docs.aws.amazon.com/general/latest/gr/signature-version-4.html>`_
+request signing. A signer is created by each client and is exposed as
+:py:attr:`AWSClient.signer <tornado_aws.client.AWSClient.signer>` so that
+service specific implementations can sign requests without going through
+``fetch``.
+
+"""
+import hashlib
+import hmac
+import time
+from urllib import parse
+
+ALGORITHM = 'AWS4-HMAC-SHA256'
+
+_AMZ_DATE_FORMAT = '%Y%m%dT%H%M%SZ'
+_HEADER_FORMAT = '%s Credential=%s/%s, SignedHeaders=%s, Signature=%s'
+
+_CONTENT_LENGTH = 'content-length'
+_CONTENT_SHA256 = 'x-amz-content-sha256'
+_DATE = 'date'
+_HOST = 'host'
+_SECURITY_TOKEN = 'x-amz-security-token'
+
+STREAMING_PAYLOAD = 'STREAMING-AWS4-HMAC-SHA256-PAYLOAD'
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+
+_CHUNK_ALGORITHM_LINE = 'AWS4-HMAC-SHA256-PAYLOAD\n'
+_CHUNK_HEADER_FORMAT = '%x;chunk-signature=%s\r\n'
+_EMPTY_SHA256 = hashlib.sha256(b'').hexdigest()
+
+
+class Signer(object):
+    """Sign AWS API requests for a specific host, region and service.
+
+    The values that are static for the lifetime of a client, such as the
+    credential scope suffix and the algorithm line of the string to sign,
+    are computed once when the signer is created. Credentials are read from
+    the :py:class:`~tornado_aws.config.Authorization` instance for every
+    request so that refreshed credentials are used automatically.
+
+    :param tornado_aws.config.Authorization auth_config: The credentials
+    :param str region: The AWS region to sign requests for
+    :param str service: The AWS service to sign requests for
+    :param str host: The default value for the ``Host`` header
+
+    """
+    __slots__ = ['_algorithm_line', '_auth_config', '_host', '_region',
+                 '_region_bytes', '_scope_suffix', '_service',
+                 '_service_bytes']
+
+    def __init__(self, auth_config, region, service, host):
+        self._auth_config = auth_config
+        self._host = host
+        self._region = region
+        self._region_bytes = region.encode('utf-8')
+        self._service = service
+        self._service_bytes = service.encode('utf-8')
+        self._algorithm_line = ALGORITHM + '\n'
+        self._scope_suffix = '/{}/{}/aws4_request'.format(region, service)
+
+    @property
+    def host(self):
+        """Return the default ``Host`` header value for signed requests.
+
+        :rtype: str
+
+        """
+        return self._host
+
+    @property
+    def region(self):
+        """Return the region requests are signed for.
+
+        :rtype: str
+
+        """
+        return self._region
+
+    @property
+    def service(self):
+        """Return the service requests are signed for.
+
+        :rtype: str
+
+        """
+        return self._service
+
+    def sign(self, method, path, query_args, headers, body=b'',
+             payload_hash=None):
+        """Sign the request, adding the ``Authorization`` header and the
+        other headers that are part of the signature to ``headers`` in place.
+        Returns the headers and the canonical query string to use in the
+        request URL.
+
+        :param str method: HTTP request method
+        :param str path: The request path
+        :param dict query_args: Query string args
+        :param dict headers: Request headers
+        :param body: The request body
+        :type body: bytes or bytes-like object
+        :param str payload_hash: Use the hex encoded value instead of hashing
+            the body
+        :rtype: (dict, str)
+
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        if payload_hash is None:
+            payload_hash = hashlib.sha256(body).hexdigest()
+        query_string, _amz_date, _signature = self._sign(
+            method, path, query_args, headers, str(byte_length(body)),
+            payload_hash)
+        return headers, query_string
+
+    def sign_streaming(self, method, path, query_args, headers,
+                       content_length, chunk_size):
+        """Sign a request that sends its body using the ``aws-chunked``
+        content encoding, where each chunk of the body is signed as it is
+        sent. Returns the headers, the canonical query string and the
+        :py:class:`ChunkSigner` used to sign the body chunks.
+
+        :param str method: HTTP request method
+        :param str path: The request path
+        :param dict query_args: Query string args
+        :param dict headers: Request headers
+        :param int content_length: The length of the unencoded body
+        :param int chunk_size: The size of each body chunk
+        :rtype: (dict, str, ChunkSigner)
+
+        """
+        encoding = headers.pop('Content-Encoding', None)
+        headers['Content-Encoding'] = \
+            'aws-chunked,' + encoding if encoding else 'aws-chunked'
+        headers['X-Amz-Decoded-Content-Length'] = str(content_length)
+        query_string, amz_date, signature = self._sign(
+            method, path, query_args, headers,
+            str(ChunkSigner.encoded_length(content_length, chunk_size)),
+            STREAMING_PAYLOAD)
+        date_stamp = amz_date[:8]
+        return headers, query_string, ChunkSigner(
+            self.signing_key(date_stamp), amz_date,
+            date_stamp + self._scope_suffix, signature)
+
+    def presign(self, method, path, query_args, expires_in, host=None):
+        """Return the query string for a presigned URL, carrying the
+        signature and its parameters in the query string instead of the
+        ``Authorization`` header. Only the ``Host`` header is signed and the
+        payload is not part of the signature.
+
+        :param str method: HTTP request method
+        :param str path: The request path
+        :param dict query_args: Query string args
+        :param int expires_in: The number of seconds the URL is valid for
+        :param str host: Override the signed ``Host`` header value
+        :rtype: str
+
+        """
+        amz_date = time.strftime(_AMZ_DATE_FORMAT, time.gmtime())
+        scope = amz_date[:8] + self._scope_suffix
+        query_args = dict(query_args)
+        query_args.update({
+            'X-Amz-Algorithm': ALGORITHM,
+            'X-Amz-Credential': '{}/{}'.format(
+                self._auth_config.access_key, scope),
+            'X-Amz-Date': amz_date,
+            'X-Amz-Expires': str(expires_in),
+            'X-Amz-SignedHeaders': _HOST})
+        security_token = self._auth_config.security_token
+        if security_token:
+            query_args['X-Amz-Security-Token'] = security_token
+        query_string = self.query_string(query_args)
+        request = '\n'.join([
+            method, path, query_string,
+            _HOST + ':' + (host or self._host) + '\n', _HOST,
+            UNSIGNED_PAYLOAD])
+        _scope, signature = self._signature(
+            amz_date, hashlib.sha256(request.encode('utf-8')).hexdigest())
+        return query_string + '&X-Amz-Signature=' + signature
+
+    def signing_key(self, date_stamp):
+        """Return the signing key for the date, deriving it only when it is
+        not already cached by the authorization config.
+
+        :param str date_stamp: Date in %Y%m%d format for signing
+        :rtype: bytes
+
+        """
+        signing_key = self._auth_config.cached_signing_key(
+            date_stamp, self._region, self._service)
+        if signing_key is None:
+            key = 'AWS4{0}'.format(self._auth_config.secret_key)
+            date = _sign(key.encode('utf-8'), date_stamp.encode('utf-8'))
+            region = _sign(date, self._region_bytes)
+            service = _sign(region, self._service_bytes)
+            signing_key = _sign(service, b'aws4_request')
+            self._auth_config.cache_signing_key(
+                date_stamp, self._region, self._service, signing_key)
+        return signing_key
+
+    @staticmethod
+    def query_string(query_args):
+        """Return the canonical, sorted query string for the query args.
+
+        :param dict query_args: The dict of query arguments
+        :rtype: str
+
+        """
+        return '&'.join([_quote(key) + '=' + _quote(query_args[key])
+                         for key in sorted(query_args)])
+
+    def _sign(self, method, path, query_args, headers, content_length,
+              payload_hash):
+        """Add the ``Authorization`` header and the other headers that are
+        part of the signature to ``headers``, returning the canonical query
+        string, the request date and the request signature.
+
+        :param str method: HTTP request method
+        :param str path: The request path
+        :param dict query_args: Query string args
+        :param dict headers: Request headers
+        :param str content_length: The ``Content-Length`` header value
+        :param str payload_hash: The ``X-Amz-Content-sha256`` header value
+        :rtype: (str, str, str)
+
+        """
+        amz_date = time.strftime(_AMZ_DATE_FORMAT, time.gmtime())
+
+        canonical = {key.lower(): value for key, value in headers.items()}
+        headers['Content-Length'] = canonical[_CONTENT_LENGTH] = \
+            content_length
+        headers['Date'] = canonical[_DATE] = amz_date
+        headers['X-Amz-Content-sha256'] = canonical[_CONTENT_SHA256] = \
+            payload_hash
+        if _HOST not in canonical:
+            headers['Host'] = canonical[_HOST] = self._host
+
+        # Temporary auth security token
+        security_token = self._auth_config.security_token
+        if security_token:
+            headers['X-Amz-Security-Token'] = canonical[_SECURITY_TOKEN] = \
+                security_token
+
+        query_string = self.query_string(query_args)
+        names = sorted(canonical)
+        signed_headers = ';'.join(names)
+        request = '\n'.join([
+            method, path, query_string,
+            ''.join([name + ':' + canonical[name] + '\n' for name in names]),
+            signed_headers, payload_hash])
+        scope, signature = self._signature(
+            amz_date, hashlib.sha256(request.encode('utf-8')).hexdigest())
+        headers['Authorization'] = _HEADER_FORMAT % (
+            ALGORITHM, self._auth_config.access_key, scope, signed_headers,
+            signature)
+        return query_string, amz_date, signature
+
+    def _signature(self, amz_date, request_hash):
+        """Return the credential scope and signature for the hashed
+        canonical request.
+
+        :param str amz_date: The x-amz-date header value
+        :param str request_hash: The canonical request signature hash
+        :rtype: (str, str)
+
+        """
+        date_stamp = amz_date[:8]
+        scope = date_stamp + self._scope_suffix
+        to_sign = self._algorithm_line + amz_date + '\n' + scope + '\n' + \
+            request_hash
+        return scope, hmac.new(self.signing_key(date_stamp),
+                               to_sign.encode('utf-8'),
+                               hashlib.sha256).hexdigest()
+
+
+class ChunkSigner(object):
+    """Sign the chunks of an ``aws-chunked`` encoded request body. Each
+    chunk signature is chained from the signature of the previous chunk,
+    starting with the signature of the request headers.
+
+    :param bytes signing_key: The signing key for the request date
+    :param str amz_date: The x-amz-date header value of the request
+    :param str scope: The credential scope of the request
+    :param str seed_signature: The signature of the request headers
+
+    """
+    __slots__ = ['_prefix', '_signature', '_signing_key']
+
+    def __init__(self, signing_key, amz_date, scope, seed_signature):
+        self._prefix = _CHUNK_ALGORITHM_LINE + amz_date + '\n' + scope + '\n'
+        self._signature = seed_signature
+        self._signing_key = signing_key
+
+    def header(self, chunk):
+        """Sign the chunk, returning the chunk header that is sent before
+        it. The chunk itself is followed by ``\\r\\n``. The body is
+        terminated by the header for an empty chunk followed by ``\\r\\n``.
+
+        :param bytes chunk: The chunk to sign
+        :rtype: bytes
+
+        """
+        to_sign = self._prefix + self._signature + '\n' + _EMPTY_SHA256 + \
+            '\n' + hashlib.sha256(chunk).hexdigest()
+        self._signature = hmac.new(self._signing_key,
+                                   to_sign.encode('utf-8'),
+                                   hashlib.sha256).hexdigest()
+        return (_CHUNK_HEADER_FORMAT % (
+            len(chunk), self._signature)).encode('ascii')
+
+    @staticmethod
+    def encoded_length(content_length, chunk_size):
+        """Return the length of the ``aws-chunked`` encoded body.
+
+        :param int content_length: The length of the unencoded body
+        :param int chunk_size: The size of each body chunk
+        :rtype: int
+
+        """
+        def framed(size):
+            # hex size + ';chunk-signature=' + 64 + CRLF + data + CRLF
+            return len('%x' % size) + 17 + 64 + 2 + size + 2
+
+        full, partial = divmod(content_length, chunk_size)
+        length = full * framed(chunk_size) + framed(0)
+        if partial:
+            length += framed(partial)
+        return length
+
+
+def byte_length(body):
+    """Return the length in bytes of a bytes-like object without copying it.
+
+    :param body: The value to return the length of
+    :type body: bytes or bytes-like object
+    :rtype: int
+
+    """
+    if isinstance(body, bytes):
+        return len(body)
+    with memoryview(body) as view:
+        return view.nbytes
+
+
+def _quote(value):
+    """Return the percent encoded value, ensuring there are no skipped
+    characters.
+
+    :param str value: The value to quote
+    :rtype: str
+
+    """
+    return parse.quote(value, safe='').replace('%7E', '~')
+
+
+def _sign(key, msg):
+    """Sign the msg with the key
+
+    :param bytes key: The signing key
+    :param bytes msg: The value to sign
+    :return: bytes
+
+    """
+    return hmac.new(key, msg, hashlib.sha256).digest()
@@ -0,0 +1,276 @@
+"""
+Credential providers that use the AWS Security Token Service to get temporary
+credentials for an IAM role, for use with
+:py:class:`~tornado_aws.config.Authorization`:
+
+.. code-block:: python
+
+    credentials = config.Authorization(
+        'default', provider=sts.AssumeRoleProvider(
+            'arn:aws:iam::123456789012:role/example'))
+    client = tornado_aws.AsyncAWSClient('dynamodb', credentials=credentials)
+
+The credentials are cached by the
+:py:class:`~tornado_aws.config.Authorization` until they expire and are
+refreshed in the background before they do when used with
+:py:class:`~tornado_aws.client.AsyncAWSClient`, so assuming the role does not
+happen when making requests.
+
+"""
+import logging
+import os
+import time
+
+from tornado import httpclient
+
+from tornado_aws import client, config, signer, txml
+
+LOGGER = logging.getLogger(__name__)
+
+STS_VERSION = '2011-06-15'
+
+
+class AssumeRoleProvider(object):
+    """Get temporary credentials for an IAM role using the STS
+    ``AssumeRole`` action, signed with the credentials of the ``source``
+    client.
+
+    If ``source`` is not specified, an STS client that uses the default
+    credentials for the region is created.
+
+    :param str role_arn: The ARN of the role to assume
+    :param str session_name: The role session name, defaulting to the
+        ``AWS_ROLE_SESSION_NAME`` environment variable or a generated name
+    :param int duration: The number of seconds the credentials are valid
+    :param str external_id: The external ID required to assume the role
+    :param source: The STS client used to assume the role
+    :type source: tornado_aws.client.AWSClient or
+        tornado_aws.client.AsyncAWSClient
+    :param str region: The AWS region of the STS endpoint
+    :param bool asynchronous: Create an asynchronous STS client, used when
+        ``source`` is not specified
+
+    """
+    def __init__(self, role_arn, session_name=None, duration=3600,
+                 external_id=None, source=None, region=None,
+                 asynchronous=True):
+        self._client = source or (
+            client.AsyncAWSClient if asynchronous else client.AWSClient)(
+                'sts', region=region)
+        self._duration = duration
+        self._external_id = external_id
+        self._role_arn = role_arn
+        self._session_name = _session_name(session_name)
+
+    @property
+    def cache_key(self):
+        """Return the key for caching the credentials of the role.
+
+        :rtype: str
+
+        """
+        return self._role_arn
+
+    @property
+    def is_async(self):
+        """Indicates if credentials are fetched asynchronously.
+
+        :rtype: bool
+
+        """
+        return self._client.ASYNC
+
+    def fetch_credentials(self):
+        """Assume the role, returning the temporary credentials, or a
+        coroutine returning the credentials for asynchronous providers.
+
+        :rtype: dict
+        :raises: :class:`~tornado_aws.exceptions.AWSError`
+
+        """
+        if self.is_async:
+            return self._fetch_credentials_async()
+        response = self._client.fetch(
+            'GET', '/', query_args=self._query_args())
+        return _parse_credentials(response.body, 'AssumeRole')
+
+    async def _fetch_credentials_async(self):
+        """Assume the role using the asynchronous STS client.
+
+        :rtype: dict
+        :raises: :class:`~tornado_aws.exceptions.AWSError`
+
+        """
+        response = await self._client.fetch(
+            'GET', '/', query_args=self._query_args())
+        return _parse_credentials(response.body, 'AssumeRole')
+
+    def _query_args(self):
+        """Return the query arguments for the ``AssumeRole`` request.
+
+        :rtype: dict
+
+        """
+        query_args = {'Action': 'AssumeRole',
+                      'DurationSeconds': str(self._duration),
+                      'RoleArn': self._role_arn,
+                      'RoleSessionName': self._session_name,
+                      'Version': STS_VERSION}
+        if self._external_id:
+            query_args['ExternalId'] = self._external_id
+        return query_args
+
+
+class WebIdentityProvider(object):
+    """Get temporary credentials for an IAM role using the STS
+    ``AssumeRoleWithWebIdentity`` action with an OIDC token, such as the
+    service account token of an EKS pod using IAM roles for service accounts.
+
+    The role and token file default to the ``AWS_ROLE_ARN`` and
+    ``AWS_WEB_IDENTITY_TOKEN_FILE`` environment variables. The token file is
+    read each time credentials are fetched, as the token is rotated.
+    ``AssumeRoleWithWebIdentity`` requests are not signed, so no credentials
+    are required to use the provider.
+
+    :param str role_arn: The ARN of the role to assume
+    :param str token_file: The path to the web identity token file
+    :param str session_name: The role session name, defaulting to the
+        ``AWS_ROLE_SESSION_NAME`` environment variable or a generated name
+    :param int duration: The number of seconds the credentials are valid
+    :param str region: The AWS region of the STS endpoint
+    :param str endpoint: Override the STS endpoint URL
+    :param bool asynchronous: Fetch credentials asynchronously
+    :raises: ValueError
+
+    """
+    def __init__(self, role_arn=None, token_file=None, session_name=None,
+                 duration=3600, region=None, endpoint=None,
+                 asynchronous=True):
+        self._role_arn = role_arn or os.getenv('AWS_ROLE_ARN')
+        self._token_file = token_file or os.getenv(
+            'AWS_WEB_IDENTITY_TOKEN_FILE')
+        if not self._role_arn or not self._token_file:
+            raise ValueError('role_arn and token_file are required')
+        self._client = httpclient.AsyncHTTPClient(force_instance=True) \
+            if asynchronous else httpclient.HTTPClient()
+        self._duration = duration
+        self._endpoint = endpoint or 'https://sts.{}.amazonaws.com'.format(
+            region or config.get_region(
+                os.getenv('AWS_DEFAULT_PROFILE', 'default')))
+        self._is_async = asynchronous
+        self._session_name = _session_name(session_name)
+
+    @property
+    def cache_key(self):
+        """Return the key for caching the credentials of the role.
+
+        :rtype: str
+
+        """
+        return self._role_arn
+
+    @property
+    def is_async(self):
+        """Indicates if credentials are fetched asynchronously.
+
+        :rtype: bool
+
+        """
+        return self._is_async
+
+    def fetch_credentials(self):
+        """Assume the role, returning the temporary credentials, or a
+        coroutine returning the credentials for asynchronous providers.
+
+        :rtype: dict
+        :raises: tornado.httpclient.HTTPError
+
+        """
+        if self._is_async:
+            return self._fetch_credentials_async()
+        response = self._client.fetch(self._url(), **self._request_args())
+        return _parse_credentials(response.body, 'AssumeRoleWithWebIdentity')
+
+    async def _fetch_credentials_async(self):
+        """Assume the role using the asynchronous HTTP client.
+
+        :rtype: dict
+        :raises: tornado.httpclient.HTTPError
+
+        """
+        response = await self._client.fetch(
+            self._url(), **self._request_args())
+        return _parse_credentials(response.body, 'AssumeRoleWithWebIdentity')
+
+    @staticmethod
+    def _request_args():
+        """Return the keyword arguments for the HTTP request.
+
+        :rtype: dict
+
+        """
+        return {'connect_timeout': client.AWSClient.CONNECT_TIMEOUT,
+                'request_timeout': client.AWSClient.REQUEST_TIMEOUT}
+
+    def _url(self):
+        """Return the ``AssumeRoleWithWebIdentity`` request URL, reading the
+        current token from the token file.
+
+        :rtype: str
+
+        """
+        with open(self._token_file, 'r') as handle:
+            token = handle.read().strip()
+        return '{}/?{}'.format(self._endpoint, signer.Signer.query_string({
+            'Action': 'AssumeRoleWithWebIdentity',
+            'DurationSeconds': str(self._duration),
+            'RoleArn': self._role_arn,
+            'RoleSessionName': self._session_name,
+            'Version': STS_VERSION,
+            'WebIdentityToken': token}))
+
+
+def _child(node, name):
+    """Return the child of the parsed XML node with the name, ignoring the
+    XML namespace.
+
+    :param dict node: The parsed XML node
+    :param str name: The name of the child
+    :rtype: dict or str
+    :raises: ValueError
+
+    """
+    for key, value in (node or {}).items():
+        if key.rpartition('}')[2] == name:
+            return value
+    raise ValueError('Missing {} in STS response'.format(name))
+
+
+def _parse_credentials(content, action):
+    """Return the credentials in the STS response in the same format as the
+    EC2 Instance Metadata API returns them.
+
+    :param bytes content: The response body
+    :param str action: The STS action
+    :rtype: dict
+    :raises: ValueError
+
+    """
+    credentials = _child(_child(_child(
+        txml.loads(content.decode('utf-8')), '{}Response'.format(action)),
+        '{}Result'.format(action)), 'Credentials')
+    return {'AccessKeyId': _child(credentials, 'AccessKeyId'),
+            'SecretAccessKey': _child(credentials, 'SecretAccessKey'),
+            'Token': _child(credentials, 'SessionToken'),
+            'Expiration': _child(credentials, 'Expiration')}
+
+
+def _session_name(session_name):
+    """Return the role session name to use.
+
+    :param str session_name: The specified session name
+    :rtype: str
+
+    """
+    return session_name or os.getenv(
+        'AWS_ROLE_SESSION_NAME', 'tornado-aws-{}'.format(int(time.time())))
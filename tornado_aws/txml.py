@@ -4,15 +4,39 @@ XML Deserialization
 
 Parse XML return content and return it as a dict.
 
+Documents are parsed with the parser named by ``PARSER``. When the C
+accelerated :py:mod:`xml.etree.ElementTree` is available, it is ``lxml``
+if :py:mod:`lxml` is installed and ``etree`` if not. Otherwise, such as on
+PyPy, it is ``expat``, which builds the dict directly from the
+:py:mod:`xml.parsers.expat` events instead of building an element tree in
+Python. Each parser returns the same dict.
+
 """
-import collections
+import threading
 from xml.etree import ElementTree
+from xml.parsers import expat
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # pragma: no cover
+    lxml_etree = None
 
 
-def loads(content):
+def loads(content, parser=None):
     """Return the XML document returned from AWS as a dict
 
     :param str content: Response content from AWS
+    :param str parser: The parser to use, defaulting to ``PARSER``
+    :rtype: dict
+    :raises: ValueError
+
+    """
+    return PARSERS[parser or PARSER](content)
+
+
+def _etree_loads(content):
+    """Parse the document with :py:mod:`xml.etree.ElementTree`.
+
+    :param str content: The XML document
     :rtype: dict
     :raises: ValueError
 
@@ -23,27 +47,144 @@ def loads(content):
         raise ValueError(str(error))
 
 
-def _xml_to_dict(t):
-    """Process child nodes, initially taken from
-    https://stackoverflow.com/a/10076823/13203
+def _expat_loads(content):
+    """Parse the document with :py:mod:`xml.parsers.expat`, building the
+    dict from the parser events. Like :py:mod:`xml.etree.ElementTree`, the
+    text of an element is the text before its first child.
 
-    :param xml.etree.ElementTree.Element t: The XML node to process
+    :param str content: The XML document
+    :rtype: dict
+    :raises: ValueError
 
     """
-    d = {t.tag: {} if t.attrib else None}
-    children = list(t)
-    if children:
-        dd = collections.defaultdict(list)
-        for dc in map(_xml_to_dict, children):
-            for k, v in dc.items():
-                dd[k].append(v)
-        d = {t.tag: {k: v[0] if len(v) == 1 else v for k, v in dd.items()}}
-    if t.attrib:
-        d[t.tag].update(('@' + k, v) for k, v in t.attrib.items())
-    if t.text:
-        text = t.text.strip()
-        if (children or t.attrib) and text:
-            d[t.tag]['#text'] = text
+    document, names = {}, {}
+    # Each element is a list of its tag, attributes, children and text
+    stack = [[None, None, document, None]]
+
+    def fix_name(name):
+        try:
+            return names[name]
+        except KeyError:
+            names[name] = '{' + name if '}' in name else name
+            return names[name]
+
+    def on_start(name, attributes):
+        parent = stack[-1]
+        if parent[2] is None:
+            parent[2] = {}
+        stack.append([fix_name(name), attributes, None, []])
+
+    def on_data(data):
+        element = stack[-1]
+        if element[2] is None:
+            element[3].append(data)
+
+    def on_end(_name):
+        tag, attributes, node, text = stack.pop()
+        text = ''.join(text)
+        if node is None and not attributes:
+            node = text.strip() if text else None
+        else:
+            if node is None:
+                node = {}
+            for key, value in attributes.items():
+                node['@' + fix_name(key)] = value
+            text = text.strip()
+            if text:
+                node['#text'] = text
+        parent = stack[-1][2]
+        if tag not in parent:
+            parent[tag] = node
+        elif type(parent[tag]) is list:
+            parent[tag].append(node)
         else:
-            d[t.tag] = t.text.strip()
-    return dict(d)
+            parent[tag] = [parent[tag], node]
+
+    parser = expat.ParserCreate(None, '}')
+    parser.buffer_text = True
+    parser.StartElementHandler = on_start
+    parser.CharacterDataHandler = on_data
+    parser.EndElementHandler = on_end
+    try:
+        parser.Parse(content, True)
+    except expat.ExpatError as error:
+        raise ValueError(str(error))
+    return document
+
+
+def _lxml_loads(content):
+    """Parse the document with :py:mod:`lxml.etree`.
+
+    :param str content: The XML document
+    :rtype: dict
+    :raises: ValueError
+
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    # lxml parsers can not be shared between threads
+    parser = getattr(_lxml_parsers, 'parser', None)
+    if parser is None:
+        parser = _lxml_parsers.parser = lxml_etree.XMLParser(
+            no_network=True, remove_comments=True, remove_pis=True,
+            resolve_entities=False)
+    try:
+        return _xml_to_dict(lxml_etree.fromstring(content, parser))
+    except lxml_etree.XMLSyntaxError as error:
+        raise ValueError(str(error))
+
+
+def _xml_to_dict(root):
+    """Return the dict for the element tree, converting each element
+    iteratively to avoid recursing on every element. The dict for an
+    element is added to its parent before its children are converted, so
+    that the order of the children is retained.
+
+    :param xml.etree.ElementTree.Element root: The root element
+    :rtype: dict
+
+    """
+    stack = []
+    if len(root) or root.attrib:
+        node = {}
+        stack.append((root, node))
+    else:
+        node = root.text.strip() if root.text else None
+    document = {root.tag: node}
+    while stack:
+        element, parent = stack.pop()
+        for child in element:
+            if len(child) or child.attrib:
+                node = {}
+                stack.append((child, node))
+            else:
+                text = child.text
+                node = text.strip() if text else None
+            tag = child.tag
+            # Values are never lists, so a list holds repeated elements
+            if tag not in parent:
+                parent[tag] = node
+            elif type(parent[tag]) is list:
+                parent[tag].append(node)
+            else:
+                parent[tag] = [parent[tag], node]
+        for key, value in element.attrib.items():
+            parent['@' + key] = value
+        if element.text:
+            text = element.text.strip()
+            if text:
+                parent['#text'] = text
+    return document
+
+
+_lxml_parsers = threading.local()
+
+PARSERS = {'etree': _etree_loads, 'expat': _expat_loads}
+if lxml_etree is not None:  # pragma: no branch
+    PARSERS['lxml'] = _lxml_loads
+
+# Without the C accelerator, ElementTree builds the element tree in Python
+if ElementTree.Element is getattr(ElementTree, '_Element_Py', None):
+    PARSER = 'expat'  # pragma: no cover
+else:
+    PARSER = 'lxml' if 'lxml' in PARSERS else 'etree'